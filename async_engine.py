@@ -0,0 +1,296 @@
+"""Asyncio engine for the course search scrape, built on playwright.async_api.
+
+Runs the navigation steps shared with ``main.py``, awaiting each Playwright
+call. While page N+1 loads, page N's rows are turned into dicts and appended
+to a ``ScrapeCheckpoint``, and several logged-in sessions can be scraped on
+one event loop with ``run_sessions`` (``--session`` on the command line).
+``main.main(engine="async")`` runs the whole pipeline through this module.
+"""
+
+import asyncio
+import contextlib
+import inspect
+from pathlib import Path
+
+from playwright.async_api import async_playwright
+
+import main
+
+# The shared steps catch main's Playwright error classes. Everything else is
+# looked up on ``main`` at call time, so a reloaded main (benchmark.py points
+# it at the stand-in server) is honoured here too.
+main.load_browser()
+
+
+async def prompt(message: str, lock: asyncio.Lock | None = None) -> None:
+    """Print ``message`` and wait for Enter; ``lock`` keeps concurrent
+    sessions from prompting at the same time. Locks belong to one event
+    loop, so each run creates its own."""
+    async with lock or contextlib.nullcontext():
+        print(message)
+        await asyncio.to_thread(input)
+
+
+async def run_steps(steps, on_rows=None, prompt_lock: asyncio.Lock | None = None):
+    """Async counterpart of ``main.run_steps``: awaits every yielded call.
+
+    A failed call is thrown back into the steps, where it meets the same
+    ``except`` clauses as on the sync API. ``on_rows`` is a coroutine function.
+    """
+    try:
+        request = next(steps)
+        while True:
+            if isinstance(request, main.Ask):
+                await prompt(request.message, prompt_lock)
+                request = steps.send(None)
+            elif isinstance(request, main.PageRows):
+                request = steps.send(True if on_rows is None else await on_rows(request))
+            elif inspect.isawaitable(request):
+                try:
+                    value = await request
+                except Exception as exc:
+                    request = steps.throw(exc)
+                else:
+                    request = steps.send(value)
+            else:
+                request = steps.send(request)
+    except StopIteration as stop:
+        return stop.value
+
+
+async def wait_for_login(page, session_name: str = "", prompt_lock=None) -> None:
+    await run_steps(main.wait_for_login_steps(page, session_name), prompt_lock=prompt_lock)
+
+
+async def open_lean_session(
+    playwright, browser, context, page, blocker: main.ResourceBlocker
+):
+    return await run_steps(
+        main.open_lean_session_steps(playwright, browser, context, page, blocker)
+    )
+
+
+async def wait_for_results(page, prompt_lock=None) -> None:
+    await run_steps(main.wait_for_results_steps(page), prompt_lock=prompt_lock)
+
+
+async def scrape_all_pages(
+    page,
+    wait_mode: str = "event",
+    known_pages: set[str] | None = None,
+    checkpoint=None,
+    on_page=None,
+    prompt_lock: asyncio.Lock | None = None,
+) -> list[dict]:
+    """Walk the result pages, handing each page to a consumer task.
+
+    The consumer converts rows to dicts and calls ``on_page(page_info, rows)``
+    (sync callables run in a worker thread) or appends them to
+    ``checkpoint`` while the browser is already loading the next page; only
+    without either are the rows kept and returned. A resumed checkpoint skips its
+    pages and jumps to the first missing one, as in ``main.scrape_all_pages``.
+    """
+    collected_rows: list[dict] = []
+    pending: asyncio.Queue = asyncio.Queue()
+
+    async def consume() -> None:
+        while True:
+            found = await pending.get()
+            if found is None:
+                return
+            rows = main.rows_as_dicts(found.extracted)
+            if on_page is not None:
+                if inspect.iscoroutinefunction(on_page):
+                    await on_page(found.page_info, rows)
+                else:
+                    await asyncio.to_thread(on_page, found.page_info, rows)
+                continue
+            if checkpoint is not None:
+                await asyncio.to_thread(checkpoint.append, found.page_info, rows)
+                total_rows = checkpoint.row_count
+            else:
+                collected_rows.extend(rows)
+                total_rows = len(collected_rows)
+            print(
+                f"Collected rows: {total_rows} "
+                f"(page {found.number} ready in {found.latency * 1000:.0f} ms)"
+            )
+
+    async def on_rows(found: main.PageRows) -> bool:
+        # Queued only: the walk clicks on to the next page right away.
+        await pending.put(found)
+        return True
+
+    consumer = asyncio.create_task(consume())
+    try:
+        await run_steps(
+            main.scrape_steps(page, wait_mode, known_pages, checkpoint), on_rows, prompt_lock
+        )
+    finally:
+        await pending.put(None)
+        await consumer
+    return collected_rows
+
+
+async def scrape_session(
+    browser,
+    name: str = "default",
+    storage_state=None,
+    wait_mode: str = "event",
+    output_dir: Path | None = None,
+    resume: bool = False,
+    prompt_lock: asyncio.Lock | None = None,
+) -> list[dict]:
+    """Log in (unless ``storage_state`` is given) and scrape one session
+    into ``scrape_<name>.jsonl``."""
+    context = await browser.new_context(storage_state=storage_state)
+    page = await context.new_page()
+    try:
+        if storage_state is None:
+            await wait_for_login(page, name, prompt_lock)
+        await wait_for_results(page, prompt_lock)
+        checkpoint = main.ScrapeCheckpoint(
+            (output_dir or main.OUTPUT_DIR) / f"scrape_{name}.jsonl", resume=resume
+        )
+        try:
+            await scrape_all_pages(
+                page, wait_mode=wait_mode, checkpoint=checkpoint, prompt_lock=prompt_lock
+            )
+            return main.dedupe_rows(checkpoint.iter_rows())
+        finally:
+            checkpoint.close()
+    finally:
+        await context.close()
+
+
+async def run_sessions(
+    sessions: list[dict],
+    wait_mode: str = "event",
+    resume: bool = False,
+    prompt_lock: asyncio.Lock | None = None,
+) -> dict:
+    """Scrape several sessions concurrently on one browser and event loop.
+
+    Each entry holds ``scrape_session`` keyword arguments, at least ``name``.
+    Returns the rows per session name.
+    """
+    prompt_lock = prompt_lock or asyncio.Lock()
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(
+            channel=main.BROWSER_CHANNEL or None, headless=main.HEADLESS
+        )
+        try:
+            results = await asyncio.gather(
+                *(
+                    scrape_session(
+                        browser,
+                        wait_mode=wait_mode,
+                        resume=resume,
+                        prompt_lock=prompt_lock,
+                        **session,
+                    )
+                    for session in sessions
+                )
+            )
+        finally:
+            await browser.close()
+    return {session["name"]: rows for session, rows in zip(sessions, results)}
+
+
+async def export_rows(
+    rows: list[dict],
+    sources: str,
+    export: bool,
+    force_outputs: bool,
+    pdf_workers: int | None,
+    pdf_layout: str,
+    excel: bool,
+    report_specs: list[dict] | None,
+) -> None:
+    if export:
+        excel_file, result = await asyncio.to_thread(
+            main.export_outputs,
+            rows,
+            force_outputs,
+            pdf_workers,
+            pdf_layout,
+            excel,
+            report_specs,
+        )
+        main.print_export_summary(len(rows), excel_file, result)
+    else:
+        print(f"\nDone. Scraped {len(rows)} rows into {sources}")
+
+
+async def main_async(
+    wait_mode: str = "event",
+    resume: bool = False,
+    force_outputs: bool = False,
+    pdf_workers: int | None = None,
+    pdf_layout: str = "planned",
+    export: bool = True,
+    excel: bool = True,
+    report_specs: list[dict] | None = None,
+    lean: bool = False,
+    sessions: list[dict] | None = None,
+) -> None:
+    """The async pipeline; with ``sessions`` every session is scraped
+    concurrently (see ``run_sessions``) and their rows are exported together."""
+    print(f"Starting {main.PROJECT_NAME} (async engine)...")
+    prompt_lock = asyncio.Lock()
+    outputs = (force_outputs, pdf_workers, pdf_layout, excel, report_specs)
+    if sessions:
+        main.WAIT_STATS.reset()
+        results = await run_sessions(sessions, wait_mode, resume, prompt_lock)
+        for name, session_rows in results.items():
+            print(f"Session {name}: {len(session_rows)} rows")
+        print(main.WAIT_STATS.summary())
+        rows = main.dedupe_rows(
+            row for session_rows in results.values() for row in session_rows
+        )
+        sources = ", ".join(f"scrape_{name}.jsonl" for name in results)
+        await export_rows(rows, sources, export, *outputs)
+        return
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(
+            channel=main.BROWSER_CHANNEL or None, headless=main.HEADLESS
+        )
+        context = await browser.new_context()
+        page = await context.new_page()
+
+        await wait_for_login(page, prompt_lock=prompt_lock)
+        blocker = None
+        if lean:
+            blocker = main.ResourceBlocker()
+            browser, context, page = await open_lean_session(
+                p, browser, context, page, blocker
+            )
+        main.WAIT_STATS.reset()
+        await wait_for_results(page, prompt_lock)
+        checkpoint = main.ScrapeCheckpoint(
+            main.OUTPUT_DIR / main.CHECKPOINT_NAME, resume=resume
+        )
+        try:
+            await scrape_all_pages(
+                page, wait_mode=wait_mode, checkpoint=checkpoint, prompt_lock=prompt_lock
+            )
+            if checkpoint.first_missing_page() is not None:
+                print(
+                    "Scrape is incomplete; exporting what was collected. "
+                    "Run again with --resume to fetch the missing pages."
+                )
+            rows = main.dedupe_rows(checkpoint.iter_rows())
+        finally:
+            checkpoint.close()
+        print(main.WAIT_STATS.summary())
+        if blocker is not None:
+            print(blocker.summary())
+        await export_rows(rows, str(checkpoint.path), export, *outputs)
+        if not export:
+            print("Build the outputs with: python main.py postprocess")
+        if not lean:
+            await prompt("Browser stays open for review. Press Enter to close.", prompt_lock)
+
+        await context.close()
+        await browser.close()
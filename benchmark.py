@@ -0,0 +1,926 @@
+"""Benchmarks for the extractor, run against the offline stand-in server.
+
+    python benchmark.py pipeline --rows 2500 --latency-ms 50
+    python benchmark.py pipeline --rows 2500 --latency-ms 50 --wait-mode poll
+    python benchmark.py extract --rows 5000
+    python benchmark.py collate --rows 100000
+    python benchmark.py pdf-table --rows 1000 10000 50000
+    python benchmark.py pdf-layout --rows 5000
+    python benchmark.py importtime
+    python benchmark.py dataset --rows 50000
+    python benchmark.py excel --rows 50000
+    python benchmark.py schedule --rows 50000
+    python benchmark.py schedule --dataset
+    python benchmark.py planner --rows 3000 --courses 10
+    python benchmark.py reports --rows 50000
+    python benchmark.py fanout --rows 20000 --units 10 --groups 8
+    python benchmark.py lean --rows 2500 --latency-ms 50
+
+The pipeline benchmark runs the full ``main()`` flow (login, search,
+pagination, Excel/PDF export) headless against ``standin_server`` and
+writes its outputs to a temporary folder.
+"""
+
+import argparse
+import builtins
+import importlib
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from standin_server import (
+    COURSE_NAMES,
+    StandInServer,
+    generate_rows,
+    render_search_page,
+)
+
+
+# EXTRACT_TABLE_JS as it was before the cached-layout rewrite, kept as the
+# baseline for the extract benchmark.
+LEGACY_EXTRACT_TABLE_JS = r"""
+() => {
+    const clean = (txt) => (txt || '').replace(/\u00a0/g, ' ').replace(/\s+/g, ' ').trim();
+    const norm = (s) => clean(s).replace(/ي/g, 'ی').replace(/ك/g, 'ک');
+
+    const meaningful = [
+        'كد درس','نام درس','نوع درس','تعداد واحد نظري','تعداد واحد عملي','كد ارائه کلاس درس',
+        'نام كلاس درس','زمانبندي تشکيل کلاس','استاد','ساير اساتيد','حداكثر ظرفيت','تعداد ثبت نامي تاکنون',
+        'زمان امتحان','مكان برگزاري','مقطع ارائه درس','نوع ارائه','سطح ارائه','دانشجويان مجاز به اخذ کلاس',
+        'گروه آموزشی','دانشکده','واحد','استان'
+    ];
+    const meaningfulNorm = meaningful.map(norm);
+
+    let best = null;
+    const tables = [...document.querySelectorAll('table')];
+    for (const table of tables) {
+        const rows = [...table.querySelectorAll('tr')];
+        for (const row of rows) {
+            const cells = [...row.querySelectorAll('th,td')].map((c) => norm(c.innerText || c.textContent || ''));
+            if (cells.length < 12) continue;
+            const matchCount = meaningfulNorm.filter((h) => cells.includes(h)).length;
+            if (matchCount < 10) continue;
+            const score = matchCount * 100 - Math.abs(cells.length - 23);
+            if (!best || score > best.score) {
+                best = { table, row, cells, score };
+            }
+        }
+    }
+
+    if (!best) return { headers: [], rows: [], pageInfo: '' };
+
+    const rawHeadersNorm = best.cells;
+    const rawHeadersText = [...best.row.querySelectorAll('th,td')].map((c) => clean(c.innerText || c.textContent || ''));
+    const indexMap = new Map();
+    for (let i = 0; i < rawHeadersNorm.length; i++) {
+        if (!indexMap.has(rawHeadersNorm[i])) indexMap.set(rawHeadersNorm[i], i);
+    }
+
+    const headers = [];
+    const headerIndexes = [];
+    for (let i = 0; i < meaningfulNorm.length; i++) {
+        const n = meaningfulNorm[i];
+        if (indexMap.has(n)) {
+            headerIndexes.push(indexMap.get(n));
+            headers.push(rawHeadersText[indexMap.get(n)] || meaningful[i]);
+        }
+    }
+
+    if (headers.length < 10) return { headers: [], rows: [], pageInfo: '' };
+
+    const dataRows = [];
+    const allRows = [...best.table.querySelectorAll('tr')];
+    const headerPos = allRows.indexOf(best.row);
+
+    for (let i = headerPos + 1; i < allRows.length; i++) {
+        const tr = allRows[i];
+        const cellsRaw = [...tr.querySelectorAll('td')].map((c) => clean(c.innerText || c.textContent || ''));
+        if (cellsRaw.some((v) => /نتايج\s*جستجو|کلیه\s*حقوق/i.test(v))) continue;
+
+        const obj = {};
+        let nonEmpty = 0;
+        for (let c = 0; c < headerIndexes.length; c++) {
+            const idx = headerIndexes[c];
+            const key = headers[c];
+            const value = idx < cellsRaw.length ? (cellsRaw[idx] || '') : '';
+            obj[key] = value;
+            if (value) nonEmpty += 1;
+        }
+        if (nonEmpty >= 4) dataRows.push(obj);
+    }
+
+	const bodyText = clean(document.body ? document.body.innerText : '');
+	const pageInfoMatch = bodyText.match(/نتايج\s*جستجو\s*\(\s*ركورد\s*\d+\s*تا\s*\d+\s*از\s*\d+\s*ركورد\s*\)/);
+	const pageInfo = pageInfoMatch ? pageInfoMatch[0] : '';
+
+	return { headers, rows: dataRows, pageInfo };
+}
+"""
+
+
+# normalize_persian_for_sort / persian_sort_key as they were before the
+# translation-table rewrite, kept as the baseline for the collate benchmark.
+LEGACY_SORT_REPLACEMENTS = {
+    "ي": "ی", "ى": "ی", "ئ": "ی", "ك": "ک", "ة": "ه", "ۀ": "ه", "ؤ": "و",
+    "أ": "ا", "إ": "ا", "ٱ": "ا", "آ": "ا",
+    "۰": "0", "۱": "1", "۲": "2", "۳": "3", "۴": "4",
+    "۵": "5", "۶": "6", "۷": "7", "۸": "8", "۹": "9",
+    "٠": "0", "١": "1", "٢": "2", "٣": "3", "٤": "4",
+    "٥": "5", "٦": "6", "٧": "7", "٨": "8", "٩": "9",
+    "\u200c": " ", "\u200f": "", "\u200e": "",
+}
+
+
+def legacy_normalize_persian_for_sort(module, value) -> str:
+    text = module.normalize_text(value)
+    if not text:
+        return ""
+    for src, dst in LEGACY_SORT_REPLACEMENTS.items():
+        text = text.replace(src, dst)
+    text = re.sub(r"[\u064B-\u065F\u0670\u06D6-\u06ED]", "", text)
+    text = re.sub(r"\s+", " ", text).strip()
+    return text
+
+
+def legacy_persian_sort_key(module, value) -> str:
+    text = legacy_normalize_persian_for_sort(module, value)
+    if not text:
+        return ""
+    chunks = []
+    for char in text:
+        if char.isdigit():
+            chunks.append(f"0{int(char):03d}")
+            continue
+        rank = module.PERSIAN_ALPHA_ORDER.get(char)
+        if rank is not None:
+            chunks.append(f"1{rank:03d}")
+        else:
+            chunks.append(f"9{ord(char):04d}")
+    return "".join(chunks)
+
+
+def load_main_against(base_url: str, output_dir: Path, channel: str):
+    os.environ["AMOOZESHYAR_BASE_URL"] = base_url
+    os.environ["AMOOZESHYAR_OUTPUT_DIR"] = str(output_dir)
+    os.environ["AMOOZESHYAR_BROWSER_CHANNEL"] = channel
+    os.environ["AMOOZESHYAR_HEADLESS"] = "1"
+    if "main" in sys.modules:
+        return importlib.reload(sys.modules["main"])
+    return importlib.import_module("main")
+
+
+def timed_stages(module, names: list[str]) -> dict[str, float]:
+    timings: dict[str, float] = {}
+
+    def wrap(name, func):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+
+        return wrapper
+
+    for name in names:
+        setattr(module, name, wrap(name, getattr(module, name)))
+    return timings
+
+
+def bench_pipeline(args) -> None:
+    with StandInServer(
+        rows=args.rows, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms
+    ) as server, tempfile.TemporaryDirectory() as tmp:
+        module = load_main_against(server.base_url, Path(tmp), args.channel)
+        timings = timed_stages(
+            module,
+            [
+                "wait_for_login",
+                "wait_for_results",
+                "scrape_all_pages",
+                "save_excel",
+                "postprocess_dataframe_to_pdfs",
+            ],
+        )
+
+        original_input = builtins.input
+        builtins.input = lambda *_: ""
+        try:
+            start = time.perf_counter()
+            module.main(
+                wait_mode=args.wait_mode,
+                fetch_mode=args.fetch_mode,
+                workers=args.workers,
+                engine=args.engine,
+            )
+            wall = time.perf_counter() - start
+        finally:
+            builtins.input = original_input
+
+        stats = server.stats
+
+    pages = stats["result_pages"]
+    rows = args.rows
+    scrape = timings.get("scrape_all_pages", 0.0)
+    print("\n=== pipeline benchmark ===")
+    print(
+        f"rows={rows} latency_ms={args.latency_ms} jitter_ms={args.jitter_ms} "
+        f"wait_mode={args.wait_mode} fetch_mode={args.fetch_mode} "
+        f"workers={args.workers} engine={args.engine}"
+    )
+    print(f"wall time:        {wall:8.2f} s")
+    for name, seconds in timings.items():
+        print(f"  {name:<26}{seconds:8.2f} s")
+    print(f"result pages:     {pages:8d}")
+    print(f"pages/sec:        {pages / wall if wall else 0:8.2f}")
+    print(f"rows/sec:         {rows / wall if wall else 0:8.1f}")
+    if scrape:
+        print(f"scrape rows/sec:  {rows / scrape:8.1f}")
+    print(f"requests served:  {stats['requests']:8d}")
+    print(f"bytes served:     {stats['bytes']:8d}")
+
+
+def time_evaluate(page, script: str, arg, repeat: int) -> tuple[float, dict]:
+    result = page.evaluate(script, arg)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = page.evaluate(script, arg)
+    return (time.perf_counter() - start) / repeat, result
+
+
+def bench_extract(args) -> None:
+    from playwright.sync_api import sync_playwright
+
+    from main import EXTRACT_TABLE_JS, rows_as_dicts
+
+    html = render_search_page(generate_rows(args.rows), args.rows, 0)
+    with sync_playwright() as p:
+        browser = p.chromium.launch(channel=args.channel or None, headless=True)
+        page = browser.new_page()
+        page.set_content(html)
+
+        legacy_s, legacy = time_evaluate(page, LEGACY_EXTRACT_TABLE_JS, None, args.repeat)
+        cold_s, cold = time_evaluate(page, EXTRACT_TABLE_JS, None, args.repeat)
+        warm_s, warm = time_evaluate(page, EXTRACT_TABLE_JS, cold["layout"], args.repeat)
+        browser.close()
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        converted = rows_as_dicts(warm)
+    convert_s = (time.perf_counter() - start) / args.repeat
+
+    if converted != legacy["rows"]:
+        print("WARNING: cached-layout rows differ from the legacy extractor.")
+
+    print("\n=== extract benchmark ===")
+    print(f"rows on page={args.rows} repeat={args.repeat}")
+    for label, seconds, payload in [
+        ("legacy", legacy_s, legacy),
+        ("single-pass", cold_s, cold),
+        ("cached layout", warm_s, warm),
+    ]:
+        size = len(json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+        print(f"  {label:<14}{seconds * 1000:9.1f} ms/page {size:>10d} bytes")
+    print(f"  row dicts in Python: {convert_s * 1000:.1f} ms/page")
+    print(f"speedup (cached vs legacy): {legacy_s / warm_s if warm_s else 0:.1f}x")
+
+
+def course_name_sample(count: int, seed: int = 1403) -> list:
+    """Course names with the spelling noise real exports have."""
+    rng = random.Random(seed)
+    variants = [
+        lambda name: name,
+        lambda name: name.replace("ي", "ی").replace("ك", "ک"),
+        lambda name: name.replace(" ", "\u200c", 1),
+        lambda name: f"{name} ({rng.randint(1, 400)})",
+        lambda name: f"{name} {'۱۲۳۴'[rng.randrange(4)]}",
+        lambda name: f"  {name}  ",
+    ]
+    names = []
+    for _ in range(count):
+        if rng.random() < 0.01:
+            names.append(None)
+            continue
+        names.append(rng.choice(variants)(rng.choice(COURSE_NAMES)))
+    return names
+
+
+def bench_collate(args) -> None:
+    import main
+
+    main.load_reporting()
+
+    pd = main.pd
+    df = pd.DataFrame({"نام درس": course_name_sample(args.rows)})
+    print(f"rows={args.rows} unique names={df['نام درس'].nunique()}")
+
+    def legacy_sort():
+        return df.sort_values(
+            by="نام درس",
+            kind="stable",
+            key=lambda s: s.map(lambda v: legacy_persian_sort_key(main, v)),
+        )
+
+    def batch_sort():
+        return df.sort_values(
+            by="نام درس", kind="stable", key=main.persian_collation_keys
+        )
+
+    results = {}
+    for label, func in [("legacy map", legacy_sort), ("batch keys", batch_sort)]:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            results[label] = func()
+        seconds = (time.perf_counter() - start) / args.repeat
+        results[label + " s"] = seconds
+        print(f"  {label:<12}{seconds * 1000:9.1f} ms")
+
+    if not results["legacy map"].index.equals(results["batch keys"].index):
+        print("WARNING: batch collation order differs from the legacy sort.")
+    legacy_s, batch_s = results["legacy map s"], results["batch keys s"]
+    print(f"speedup: {legacy_s / batch_s if batch_s else 0:.1f}x")
+
+
+def legacy_body_rows(module, df, style, wrap_chars: int, col_widths) -> list[list]:
+    """dataframe_to_pdf's body loop before the column-wise builder."""
+    table_data = []
+    for _, row in df.iterrows():
+        table_data.append(
+            [module.rtl_paragraph(row[col], style, wrap_chars) for col in df.columns]
+        )
+    return table_data
+
+
+def measure(func, reset=None) -> tuple[float, int, object]:
+    """Seconds for one call, then tracemalloc peak bytes of a second call."""
+    if reset:
+        reset()
+    start = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - start
+
+    if reset:
+        reset()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak, result
+
+
+def bench_pdf_table(args) -> None:
+    import main
+
+    main.load_reporting()
+
+    font_name = main.register_font()
+    style = main.ParagraphStyle(
+        "BenchBody",
+        parent=main.getSampleStyleSheet()["BodyText"],
+        fontName=font_name,
+        fontSize=8,
+        leading=10,
+        alignment=main.TA_CENTER,
+        wordWrap="RTL",
+    )
+
+    print("\n=== pdf table benchmark ===")
+    for count in args.rows:
+        df = main.rows_to_dataframe(generate_rows(count))
+        df = main.reverse_dataframe_columns(
+            df[[c for c in main.REPORT_COLUMNS if c in df.columns]]
+        ).fillna("")
+        col_width = (main.landscape(main.A4)[0] - 10 * main.mm) * 0.995 / len(df.columns)
+        col_widths = [col_width] * len(df.columns)
+        wrap_chars = 14 if len(df.columns) >= 10 else 24
+
+        print(f"rows={count}")
+        for label, func in [
+            ("iterrows", lambda: legacy_body_rows(main, df, style, wrap_chars, col_widths)),
+            (
+                "columnar",
+                lambda: main.build_body_rows(df, style, wrap_chars, col_widths)[0],
+            ),
+        ]:
+            seconds, peak, cells = measure(func, main.SHAPING_CACHE.clear)
+            paragraphs = sum(
+                1 for row in cells for cell in row if isinstance(cell, main.Paragraph)
+            )
+            print(
+                f"  {label:<10}{count / seconds if seconds else 0:10.0f} rows/s "
+                f"peak {peak / 2**20:8.1f} MiB  paragraphs {paragraphs}"
+            )
+
+
+def bench_pdf_layout(args) -> None:
+    import main
+
+    main.load_reporting()
+
+    font_name = main.register_font()
+    df = main.rows_to_dataframe(generate_rows(args.rows))
+    df = main.reverse_dataframe_columns(
+        df[[c for c in main.REPORT_COLUMNS if c in df.columns]]
+    ).fillna("")
+    col_widths, wrap_chars = main.plan_column_widths(df, font_name)
+
+    print("\n=== pdf layout benchmark ===")
+    print(f"rows={len(df)}")
+    baseline = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, layout in [
+            ("equal", {}),
+            ("planned", {"col_widths": col_widths, "wrap_chars": wrap_chars}),
+            (
+                "fixed",
+                {
+                    "col_widths": col_widths,
+                    "wrap_chars": wrap_chars,
+                    "fixed_row_heights": True,
+                },
+            ),
+        ]:
+            main.SHAPING_CACHE.clear()
+            start = time.perf_counter()
+            result = main.render_pdf_part(
+                df,
+                Path(tmp) / f"{label}.pdf",
+                "benchmark",
+                main.REPORT_PALETTES["green"],
+                True,
+                layout,
+            )
+            seconds = time.perf_counter() - start
+            baseline = baseline or (seconds, result["pages"])
+            print(
+                f"  {label:<8}{seconds:8.2f} s {result['pages']:6d} pages  "
+                f"time {seconds / baseline[0]:5.2f}x  pages {result['pages'] / baseline[1]:5.2f}x"
+            )
+
+
+def import_profile(code: str) -> list[tuple[int, int, str]]:
+    """(self us, cumulative us, module) for every import made by ``code``."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=Path(__file__).resolve().parent,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    entries = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        entries.append((int(self_us), int(cumulative_us), name.rstrip()))
+    return entries
+
+
+def bench_importtime(args) -> None:
+    print("\n=== import time benchmark ===")
+    for label, code in [
+        ("import main", "import main"),
+        ("postprocess stage", "import main; main.load_reporting()"),
+        ("scrape stage", "import main; main.load_browser()"),
+    ]:
+        runs = [import_profile(code) for _ in range(args.repeat)]
+        totals = sorted(sum(entry[0] for entry in run) for run in runs)
+        print(f"{label:<20}{totals[len(totals) // 2] / 1000:8.1f} ms (median self time)")
+
+    print("\nSlowest top-level imports of 'import main' (cumulative):")
+    top_level = [
+        entry
+        for entry in import_profile("import main")
+        if not entry[2].startswith("  ")
+    ]
+    for _, cumulative_us, name in sorted(top_level, reverse=True, key=lambda e: e[1])[
+        : args.top
+    ]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name.strip()}")
+
+
+def bench_dataset(args) -> None:
+    import main
+
+    main.load_reporting()
+    df = main.rows_to_dataframe(generate_rows(args.rows))
+    print("\n=== dataset benchmark ===")
+    print(f"rows={len(df)}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        main.OUTPUT_DIR = Path(tmp)
+        for label in ("xlsx", "parquet"):
+            if label == "xlsx":
+                path = Path(tmp) / "bench.xlsx"
+                start = time.perf_counter()
+                main.write_excel_view(df, path)
+                write_s = time.perf_counter() - start
+                start = time.perf_counter()
+                back = main.pd.read_excel(path)
+                read_s = time.perf_counter() - start
+            else:
+                start = time.perf_counter()
+                path = main.write_dataset("raw", df)
+                write_s = time.perf_counter() - start
+                start = time.perf_counter()
+                back = main.read_dataset("raw")
+                read_s = time.perf_counter() - start
+            if len(back) != len(df):
+                print(f"WARNING: {label} read back {len(back)} rows.")
+            print(
+                f"  {label:<8} write {write_s:7.2f} s  read {read_s:7.2f} s  "
+                f"{path.stat().st_size / 2**20:8.2f} MiB"
+            )
+
+
+def bench_excel(args) -> None:
+    import main
+
+    main.load_reporting()
+    df = main.rows_to_dataframe(generate_rows(args.rows))
+    print("\n=== excel writer benchmark ===")
+    print(f"rows={len(df)} columns={len(df.columns)}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.xlsx"
+        for label, func in [
+            (
+                "to_excel",
+                lambda: main.reverse_dataframe_columns(df).to_excel(path, index=False),
+            ),
+            ("streaming", lambda: main.write_excel_view(df, path)),
+        ]:
+            seconds, peak, _ = measure(func)
+            print(
+                f"  {label:<10}{seconds:8.2f} s {len(df) / seconds:9.0f} rows/s "
+                f"peak {peak / 2**20:8.1f} MiB"
+            )
+
+
+def legacy_parse_schedule(rows: list[dict]) -> list[tuple]:
+    """Every row's schedule text parsed on its own, as ad-hoc filters did."""
+    import course_schedule
+
+    return [
+        (position, *session)
+        for position, row in enumerate(rows)
+        for session in course_schedule.parse_schedule_text(
+            row.get(course_schedule.SCHEDULE_COLUMN)
+        )
+    ]
+
+
+def bench_schedule(args) -> None:
+    import course_schedule
+    import main
+
+    main.load_reporting()
+    if args.dataset:
+        df = main.read_dataset("raw")
+        rows = df.to_dict("records")
+    else:
+        rows = generate_rows(args.rows)
+        df = main.rows_to_dataframe(rows)
+    print("\n=== schedule parse benchmark ===")
+    print(f"rows={len(df)}")
+
+    seconds, _, legacy = measure(lambda: legacy_parse_schedule(rows))
+    print(f"  row loop     {seconds:7.3f} s {len(df) / seconds:10.0f} rows/s")
+    seconds, _, sessions = measure(lambda: course_schedule.parse_sessions(df))
+    print(f"  vectorized   {seconds:7.3f} s {len(df) / seconds:10.0f} rows/s")
+    if len(sessions) != len(legacy):
+        print(f"WARNING: {len(sessions)} sessions vs {len(legacy)} from the row loop.")
+    seconds, _, _ = measure(lambda: course_schedule.parse_exams(df))
+    print(f"  exams        {seconds:7.3f} s {len(df) / seconds:10.0f} rows/s")
+
+    seconds, _, index = measure(lambda: course_schedule.ScheduleIndex.from_dataframe(df))
+    print(f"  index build  {seconds:7.3f} s ({len(sessions)} sessions)")
+
+    rng = random.Random(7)
+    queries = [
+        (rng.randrange(6), start, start + 120)
+        for start in (rng.randrange(8 * 60, 19 * 60) for _ in range(args.queries))
+    ]
+
+    def scan():
+        return [
+            sorted(
+                {
+                    row
+                    for row, day, start, end, *_ in legacy
+                    if day == q_day and start < q_end and end > q_start
+                }
+            )
+            for q_day, q_start, q_end in queries
+        ]
+
+    def indexed():
+        return [index.overlapping(*query) for query in queries]
+
+    scan_s, _, expected = measure(scan)
+    index_s, _, found = measure(indexed)
+    if found != expected:
+        print("WARNING: index results differ from the linear scan.")
+    print(
+        f"  {len(queries)} overlap queries: scan {scan_s * 1000 / len(queries):.3f} ms/query, "
+        f"index {index_s * 1000 / len(queries):.3f} ms/query "
+        f"({scan_s / index_s:.0f}x)"
+    )
+
+
+def bench_planner(args) -> None:
+    import course_planner
+    import main
+
+    main.load_reporting()
+    df = main.rows_to_dataframe(generate_rows(args.rows))
+    codes = sorted(df[course_planner.COURSE_CODE_COLUMN].unique())[: args.courses]
+    print("\n=== timetable planner benchmark ===")
+
+    start = time.perf_counter()
+    options = list(course_planner.course_options(df, codes).values())
+    encode_s = time.perf_counter() - start
+    print(
+        f"courses={len(options)} sections/course="
+        f"{min(len(o) for o in options)}-{max(len(o) for o in options)} "
+        f"(distinct time masks)"
+    )
+    start = time.perf_counter()
+    best = course_planner.best_timetables(options, args.limit)
+    search_s = time.perf_counter() - start
+    print(f"  encode {encode_s * 1000:8.1f} ms")
+    print(f"  search {search_s * 1000:8.1f} ms (top {len(best)})")
+    if best:
+        print(f"  best: fewest free seats {best[0][0]}, total {best[0][1]}")
+
+
+def legacy_report_frames(module, df, specs: list[dict]) -> list:
+    """One full-table scan, copy and sort per report, as before report specs."""
+    frames = []
+    for spec in specs:
+        part = df
+        for column, condition in spec["filters"].items():
+            for operator, expected in condition.items():
+                alternatives = expected if isinstance(expected, list) else [expected]
+                text = part[column].astype(str).str.strip()
+                if operator == "equals":
+                    part = part[text.isin(alternatives)].copy()
+                else:
+                    part = part[
+                        text.str.contains("|".join(map(re.escape, alternatives)), na=False)
+                    ].copy()
+        part = part[[col for col in spec["columns"] if col in part.columns]].copy()
+        sort = [col for col in spec["sort"] if col in df.columns]
+        if sort:
+            part = part.sort_values(by=sort, kind="stable", key=module.persian_collation_keys)
+        frames.append(part.fillna("").reset_index(drop=True))
+    return frames
+
+
+def bench_reports(args) -> None:
+    import main
+
+    main.load_reporting()
+    df = main.rows_to_dataframe(generate_rows(args.rows))
+    faculties = sorted(df["دانشکده"].unique())
+    levels = sorted(df["سطح ارائه"].unique())
+    specs = [
+        main.normalize_report_spec(
+            {
+                "name": f"r{index}",
+                "filters": {
+                    "دانشکده": {"contains": faculty.split(" ", 1)[0]},
+                    "سطح ارائه": {"equals": level},
+                },
+                "sort": ["نام درس"],
+            }
+        )
+        for index, (faculty, level) in enumerate(
+            (faculty, level) for faculty in faculties for level in levels
+        )
+    ]
+    print("\n=== report spec engine benchmark ===")
+    print(f"rows={len(df)} reports={len(specs)}")
+
+    legacy_s, _, expected = measure(lambda: legacy_report_frames(main, df, specs))
+    engine_s, _, frames = measure(lambda: main.evaluate_report_specs(df, specs))
+    if not all(a.equals(b) for a, b in zip(expected, frames)):
+        print("WARNING: engine output differs from the per-report scans.")
+    print(f"  per-report {legacy_s:8.3f} s")
+    print(f"  one pass   {engine_s:8.3f} s")
+    print(f"  speedup {legacy_s / engine_s:.1f}x")
+
+
+def bench_fanout(args) -> None:
+    import main
+
+    main.load_reporting()
+    df = main.rows_to_dataframe(generate_rows(args.rows))
+    # Spread the stand-in's single unit and four groups over a university.
+    rng = random.Random(11)
+    df["واحد"] = [f"واحد {rng.randrange(args.units) + 1}" for _ in range(len(df))]
+    df["گروه آموزشی"] = [
+        f"{faculty.split(' ', 1)[0]}{rng.randrange(args.groups) + 1} - گروه آموزشي"
+        for faculty in df["دانشکده"]
+    ]
+    print("\n=== report fan-out benchmark ===")
+    print(f"rows={len(df)} units={args.units} groups/faculty={args.groups}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        main.OUTPUT_DIR = Path(tmp)
+        runs = [("first run", df), ("unchanged", df)]
+        changed = df.copy()
+        changed.loc[0, "استاد"] = "استاد جديد"
+        runs.append(("one row changed", changed))
+        results = []
+        for label, frame in runs:
+            result = main.fanout_reports(
+                frame, workers=args.workers, layout=args.layout, excel=args.excel
+            )
+            results.append((label, result))
+        print()
+        for label, result in results:
+            print(
+                f"  {label:<16}{result['seconds']:8.1f} s  {result['rendered']:4d} rendered "
+                f"{result['skipped']:4d} skipped of {result['partitions']}"
+            )
+
+
+def bench_lean(args) -> None:
+    results = []
+    for lean in (False, True):
+        with StandInServer(
+            rows=args.rows,
+            latency_ms=args.latency_ms,
+            asset_max_age=args.asset_max_age,
+        ) as server, tempfile.TemporaryDirectory() as tmp:
+            module = load_main_against(server.base_url, Path(tmp), args.channel)
+            latencies: list[float] = []
+            summarize = module.print_page_latency_summary
+
+            def capture(values, summarize=summarize, latencies=latencies):
+                latencies.extend(values)
+                summarize(values)
+
+            module.print_page_latency_summary = capture
+            original_input = builtins.input
+            builtins.input = lambda *_: ""
+            try:
+                start = time.perf_counter()
+                module.main(command="scrape", engine=args.engine, lean=lean)
+                wall = time.perf_counter() - start
+            finally:
+                builtins.input = original_input
+            results.append((lean, wall, sorted(latencies), server.stats))
+
+    print("\n=== lean mode benchmark ===")
+    print(
+        f"rows={args.rows} latency_ms={args.latency_ms} "
+        f"asset_max_age={args.asset_max_age} engine={args.engine}"
+    )
+    for lean, wall, latencies, stats in results:
+        pages = max(stats["result_pages"], 1)
+        median = latencies[len(latencies) // 2] if latencies else 0.0
+        mean = sum(latencies) / len(latencies) if latencies else 0.0
+        print(
+            f"  {'lean' if lean else 'normal':<7}{wall:7.2f} s wall  "
+            f"page mean {mean * 1000:6.0f} ms median {median * 1000:6.0f} ms  "
+            f"{stats['requests']:5d} requests ({stats['asset_requests']} assets)  "
+            f"{stats['bytes'] / pages / 1024:8.1f} KiB/result page"
+        )
+    (_, normal_wall, _, normal), (_, lean_wall, _, lean_stats) = results
+    if lean_stats["bytes"]:
+        print(f"bytes: {normal['bytes'] / lean_stats['bytes']:.1f}x fewer in lean mode")
+    if lean_wall:
+        print(f"wall:  {normal_wall / lean_wall:.2f}x faster in lean mode")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    pipeline = sub.add_parser("pipeline", help="Full main() run on the stand-in.")
+    pipeline.add_argument("--rows", type=int, default=2500)
+    pipeline.add_argument("--latency-ms", type=int, default=0)
+    pipeline.add_argument("--jitter-ms", type=int, default=0)
+    pipeline.add_argument("--wait-mode", choices=["event", "poll"], default="event")
+    pipeline.add_argument(
+        "--fetch-mode", choices=["dom", "http", "parallel"], default="dom"
+    )
+    pipeline.add_argument("--workers", type=int, default=4)
+    pipeline.add_argument("--engine", choices=["sync", "async"], default="sync")
+    pipeline.add_argument(
+        "--channel",
+        default="",
+        help="Browser channel (empty = Playwright's bundled Chromium).",
+    )
+    pipeline.set_defaults(func=bench_pipeline)
+
+    extract = sub.add_parser(
+        "extract", help="Legacy vs cached-layout EXTRACT_TABLE_JS on one large page."
+    )
+    extract.add_argument("--rows", type=int, default=5000)
+    extract.add_argument("--repeat", type=int, default=5)
+    extract.add_argument("--channel", default="")
+    extract.set_defaults(func=bench_extract)
+
+    collate = sub.add_parser(
+        "collate", help="Sort course names: per-row sort keys vs batch collation."
+    )
+    collate.add_argument("--rows", type=int, default=100000)
+    collate.add_argument("--repeat", type=int, default=3)
+    collate.set_defaults(func=bench_collate)
+
+    pdf_table = sub.add_parser(
+        "pdf-table", help="PDF table cell building: iterrows vs column-wise."
+    )
+    pdf_table.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 50000])
+    pdf_table.set_defaults(func=bench_pdf_table)
+
+    pdf_layout = sub.add_parser(
+        "pdf-layout", help="PDF render time and page count per column layout."
+    )
+    pdf_layout.add_argument("--rows", type=int, default=5000)
+    pdf_layout.set_defaults(func=bench_pdf_layout)
+
+    importtime = sub.add_parser(
+        "importtime", help="Startup cost per stage from python -X importtime."
+    )
+    importtime.add_argument("--repeat", type=int, default=5)
+    importtime.add_argument("--top", type=int, default=10)
+    importtime.set_defaults(func=bench_importtime)
+
+    dataset = sub.add_parser(
+        "dataset", help="Raw dataset write/read time and size: xlsx vs Parquet."
+    )
+    dataset.add_argument("--rows", type=int, default=50000)
+    dataset.set_defaults(func=bench_dataset)
+
+    excel = sub.add_parser(
+        "excel", help="pandas to_excel vs the streaming write-only Excel writer."
+    )
+    excel.add_argument("--rows", type=int, default=50000)
+    excel.set_defaults(func=bench_excel)
+
+    schedule = sub.add_parser(
+        "schedule", help="Schedule/exam parse throughput and interval-index queries."
+    )
+    schedule.add_argument("--rows", type=int, default=50000)
+    schedule.add_argument(
+        "--dataset", action="store_true", help="Use the raw dataset of the last export."
+    )
+    schedule.add_argument("--queries", type=int, default=200)
+    schedule.set_defaults(func=bench_schedule)
+
+    planner = sub.add_parser(
+        "planner", help="Conflict-free timetable search over stand-in sections."
+    )
+    planner.add_argument("--rows", type=int, default=3000)
+    planner.add_argument("--courses", type=int, default=10)
+    planner.add_argument("--limit", type=int, default=10)
+    planner.set_defaults(func=bench_planner)
+
+    reports = sub.add_parser(
+        "reports", help="Many report specs: per-report scans vs the one-pass engine."
+    )
+    reports.add_argument("--rows", type=int, default=50000)
+    reports.set_defaults(func=bench_reports)
+
+    fanout = sub.add_parser(
+        "fanout", help="Per-faculty/per-group fan-out over a synthetic university."
+    )
+    fanout.add_argument("--rows", type=int, default=20000)
+    fanout.add_argument("--units", type=int, default=10)
+    fanout.add_argument("--groups", type=int, default=8)
+    fanout.add_argument("--workers", type=int, default=None)
+    fanout.add_argument("--layout", choices=["equal", "planned", "fixed"], default="planned")
+    fanout.add_argument("--no-excel", dest="excel", action="store_false")
+    fanout.set_defaults(func=bench_fanout)
+
+    lean = sub.add_parser(
+        "lean", help="Scrape with and without --lean resource blocking on the stand-in."
+    )
+    lean.add_argument("--rows", type=int, default=2500)
+    lean.add_argument("--latency-ms", type=int, default=50)
+    lean.add_argument(
+        "--asset-max-age",
+        type=int,
+        default=0,
+        help="Let the browser cache the stand-in's static files (seconds).",
+    )
+    lean.add_argument("--engine", choices=["sync", "async"], default="sync")
+    lean.add_argument("--channel", default="")
+    lean.set_defaults(func=bench_lean)
+    return parser
+
+
+if __name__ == "__main__":
+    parsed = build_parser().parse_args()
+    parsed.func(parsed)
@@ -0,0 +1,253 @@
+"""Local SQLite database of scraped sections with full-text search.
+
+Answers questions like "which sections of X does professor Y teach" from
+the last scrape without a browser or pandas:
+
+    python course_db.py build
+    python course_db.py query --name "ساختمان داده" --instructor "محمدی"
+    python course_db.py query --course-code 1110063 --faculty 143
+
+``main.export_outputs`` rebuilds the database whenever the raw rows change.
+Names, instructors, faculties and groups are matched after
+``normalize_persian_for_sort``, so ي/ی and ك/ک spellings find each other.
+Results are ordered by course name with ``main.persian_sort_key``, the same
+order as the Excel and PDF reports.
+"""
+
+import argparse
+import json
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+import main
+
+
+COURSE_DB_NAME = "courses_index.sqlite"
+
+SCHEMA = """
+CREATE TABLE sections (
+    id INTEGER PRIMARY KEY,
+    course_code TEXT,
+    offering_code TEXT,
+    faculty TEXT,
+    edu_group TEXT,
+    course_name TEXT,
+    instructors TEXT,
+    name_key TEXT,
+    row_json TEXT
+);
+CREATE INDEX sections_course_code ON sections (course_code);
+CREATE INDEX sections_offering_code ON sections (offering_code);
+CREATE INDEX sections_faculty ON sections (faculty);
+CREATE INDEX sections_edu_group ON sections (edu_group);
+CREATE INDEX sections_name_key ON sections (name_key, offering_code);
+"""
+
+# Contentless: the normalized text lives in ``sections``, FTS keeps only the index.
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE sections_fts USING fts5(
+    course_name, instructors, content='', tokenize='unicode61'
+);
+INSERT INTO sections_fts (rowid, course_name, instructors)
+    SELECT id, course_name, instructors FROM sections;
+"""
+
+DISPLAY_COLUMNS = [
+    "كد ارائه کلاس درس",
+    "نام درس",
+    "استاد",
+    "زمانبندي تشکيل کلاس",
+    "حداكثر ظرفيت",
+    "تعداد ثبت نامي تاکنون",
+]
+
+
+def default_db_path() -> Path:
+    return main.OUTPUT_DIR / COURSE_DB_NAME
+
+
+def section_record(index: int, row: dict) -> tuple:
+    normalize = main.normalize_persian_for_sort
+    instructors = f"{row.get('استاد', '')} {row.get('ساير اساتيد', '')}"
+    return (
+        index,
+        str(row.get("كد درس", "")).strip(),
+        str(row.get("كد ارائه کلاس درس", "")).strip(),
+        normalize(row.get("دانشکده", "")),
+        normalize(row.get("گروه آموزشی", "")),
+        normalize(row.get("نام درس", "")),
+        normalize(instructors),
+        # SQLite compares by codepoint; this key sorts like the reports do.
+        main.persian_sort_key(row.get("نام درس", "")),
+        json.dumps(row, ensure_ascii=False),
+    )
+
+
+def build_database(rows, path: Path | None = None) -> Path:
+    """Write ``rows`` to a fresh database file and swap it into place."""
+    path = path or default_db_path()
+    temp_path = path.with_suffix(".tmp")
+    temp_path.unlink(missing_ok=True)
+
+    conn = sqlite3.connect(temp_path)
+    try:
+        conn.executescript(SCHEMA)
+        conn.executemany(
+            "INSERT INTO sections VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                section_record(index, row)
+                for index, row in enumerate(main.canonical_rows(rows))
+            ),
+        )
+        try:
+            conn.executescript(FTS_SCHEMA)
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5; query() falls back to LIKE.
+            pass
+        conn.commit()
+    finally:
+        conn.close()
+    temp_path.replace(path)
+    return path
+
+
+def build_from_checkpoint(path: Path | None = None) -> Path:
+    with main.ScrapeCheckpoint(main.OUTPUT_DIR / main.CHECKPOINT_NAME, resume=True) as checkpoint:
+        rows = main.dedupe_rows(checkpoint.iter_rows())
+    return build_database(rows, path)
+
+
+def has_fts(conn) -> bool:
+    return (
+        conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'sections_fts'"
+        ).fetchone()
+        is not None
+    )
+
+
+def fts_terms(text: str) -> str:
+    tokens = main.normalize_persian_for_sort(text).split()
+    return " ".join('"{}"*'.format(token.replace('"', '""')) for token in tokens)
+
+
+def prefix_range(column: str, value: str, where: list[str], params: list) -> None:
+    """Index-friendly ``column LIKE 'value%'``."""
+    where.append(f"{column} >= ? AND {column} < ?")
+    params.extend([value, value + "\U0010ffff"])
+
+
+def query(
+    conn,
+    name: str = "",
+    instructor: str = "",
+    course_code: str = "",
+    offering_code: str = "",
+    faculty: str = "",
+    group: str = "",
+    limit: int = 50,
+) -> list[dict]:
+    where: list[str] = []
+    params: list = []
+    if course_code:
+        where.append("course_code = ?")
+        params.append(course_code.strip())
+    if offering_code:
+        where.append("offering_code = ?")
+        params.append(offering_code.strip())
+    if faculty:
+        prefix_range("faculty", main.normalize_persian_for_sort(faculty), where, params)
+    if group:
+        prefix_range("edu_group", main.normalize_persian_for_sort(group), where, params)
+
+    text_filters = [("course_name", name), ("instructors", instructor)]
+    if has_fts(conn):
+        match = " AND ".join(
+            f"{column} : ({fts_terms(value)})"
+            for column, value in text_filters
+            if fts_terms(value)
+        )
+        if match:
+            where.append("id IN (SELECT rowid FROM sections_fts WHERE sections_fts MATCH ?)")
+            params.append(match)
+    else:
+        for column, value in text_filters:
+            for token in main.normalize_persian_for_sort(value).split():
+                where.append(f"{column} LIKE ?")
+                params.append(f"%{token}%")
+
+    sql = "SELECT row_json FROM sections"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY name_key, offering_code LIMIT ?"
+    params.append(limit)
+    return [json.loads(row_json) for (row_json,) in conn.execute(sql, params)]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--db",
+        type=Path,
+        default=None,
+        help=f"Database file (default: {COURSE_DB_NAME} in the output folder).",
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("build", help=f"(Re)build the database from {main.CHECKPOINT_NAME}.")
+
+    search = sub.add_parser("query", help="Find sections; filters are combined with AND.")
+    search.add_argument("--name", default="", help="Words of نام درس (prefix match).")
+    search.add_argument(
+        "--instructor", default="", help="Words of استاد / ساير اساتيد (prefix match)."
+    )
+    search.add_argument("--course-code", default="", help="Exact كد درس.")
+    search.add_argument("--offering-code", default="", help="Exact كد ارائه کلاس درس.")
+    search.add_argument("--faculty", default="", help="دانشکده prefix, e.g. 143.")
+    search.add_argument("--group", default="", help="گروه آموزشی prefix.")
+    search.add_argument("--limit", type=int, default=50)
+    search.add_argument("--json", action="store_true", help="Print full rows as JSON lines.")
+    return parser
+
+
+def run(argv: list[str] | None = None) -> None:
+    args = build_parser().parse_args(argv)
+    db_path = args.db or default_db_path()
+
+    if args.command == "build":
+        start = time.perf_counter()
+        build_from_checkpoint(db_path)
+        print(f"Built {db_path} in {(time.perf_counter() - start) * 1000:.0f} ms")
+        return
+
+    if not db_path.exists():
+        sys.exit(f"{db_path} not found; run `python course_db.py build` first.")
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        start = time.perf_counter()
+        rows = query(
+            conn,
+            name=args.name,
+            instructor=args.instructor,
+            course_code=args.course_code,
+            offering_code=args.offering_code,
+            faculty=args.faculty,
+            group=args.group,
+            limit=args.limit,
+        )
+        elapsed_ms = (time.perf_counter() - start) * 1000
+    finally:
+        conn.close()
+
+    for row in rows:
+        if args.json:
+            print(json.dumps(row, ensure_ascii=False))
+        else:
+            print(" | ".join(str(row.get(col, "")) for col in DISPLAY_COLUMNS))
+    print(f"{len(rows)} section(s) in {elapsed_ms:.1f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,285 @@
+"""Conflict-free timetables from the offered sections of chosen courses.
+
+Pick one section of every requested "كد درس" so that no two sections meet
+at the same time (odd/even-week sessions only clash with sessions held in
+the same weeks) and no two exams overlap:
+
+    python course_planner.py 1110000 1110007 1110014 1110021 --limit 5
+    python course_planner.py 1110000 1110007 --all
+
+Each section's sessions and exam are encoded as one bitmask of 5-minute
+slots, so a conflict test is a single ``&``. Sections of a course with the
+same mask are interchangeable and are searched once. Timetables are ranked
+by the fewest free seats among their sections, then by total free seats;
+the search is a backtracking walk, courses with the fewest options first,
+that drops branches which leave a later course without a compatible option
+or cannot beat the timetables already kept. ``--all`` instead streams every
+conflict-free timetable in search order.
+"""
+
+import argparse
+import heapq
+import sys
+import time
+from itertools import count
+
+import main
+from course_schedule import parse_exams, parse_sessions
+from main import free_seats_of
+
+
+COURSE_CODE_COLUMN = "كد درس"
+SLOT_MINUTES = 5
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+WEEK_BITS = 7 * SLOTS_PER_DAY
+# Odd-week sessions, then even-week sessions, then one day of slots per exam date.
+EXAM_OFFSET = 2 * WEEK_BITS
+
+
+class SectionOption:
+    """Sections of one course that share a time/exam mask, best seats first."""
+
+    def __init__(self, mask: int, sections: list[dict]) -> None:
+        self.mask = mask
+        self.sections = sorted(sections, key=lambda row: -row["free_seats"])
+        self.free_seats = self.sections[0]["free_seats"]
+
+
+def slot_run(day_offset: int, start: int, end: int) -> int:
+    first = start // SLOT_MINUTES
+    last = max(-(-end // SLOT_MINUTES), first + 1)
+    return ((1 << (last - first)) - 1) << (day_offset + first)
+
+
+def section_masks(df) -> list[int]:
+    """Class and exam bitmask for every row of ``df``."""
+    masks = [0] * len(df)
+    sessions = parse_sessions(df)
+    for row, weekday, start, end, odd, even in zip(
+        sessions["row"].tolist(),
+        sessions["weekday"].tolist(),
+        sessions["start"].tolist(),
+        sessions["end"].tolist(),
+        sessions["odd_weeks"].tolist(),
+        sessions["even_weeks"].tolist(),
+    ):
+        run = slot_run(weekday * SLOTS_PER_DAY, start, end)
+        if odd:
+            masks[row] |= run
+        if even:
+            masks[row] |= run << WEEK_BITS
+
+    exams = parse_exams(df)
+    date_offsets: dict[int, int] = {}
+    for row, (key, start, end) in enumerate(
+        zip(exams["exam_key"].tolist(), exams["exam_start"].tolist(), exams["exam_end"].tolist())
+    ):
+        if main.is_missing(key):
+            continue
+        day_offset = date_offsets.setdefault(
+            key, EXAM_OFFSET + len(date_offsets) * SLOTS_PER_DAY
+        )
+        if main.is_missing(start):
+            # A date without a time blocks the whole day.
+            start, end = 0, 24 * 60
+        elif main.is_missing(end):
+            end = start + SLOT_MINUTES
+        masks[row] |= slot_run(day_offset, start, end)
+    return masks
+
+
+def course_options(
+    df, course_codes: list[str], include_full: bool = False, unreadable: list | None = None
+) -> dict[str, list[SectionOption]]:
+    """``SectionOption`` lists per requested course code, most free seats first.
+
+    Sections whose capacity or enrolment cannot be parsed count as full; they
+    are also appended to ``unreadable`` when a list is given.
+    """
+    codes = [str(code).strip() for code in course_codes]
+    subset = df[df[COURSE_CODE_COLUMN].astype(str).str.strip().isin(codes)]
+    subset = subset.reset_index(drop=True)
+    records = subset.to_dict("records")
+    grouped: dict[str, dict[int, list[dict]]] = {code: {} for code in codes}
+    for record, mask in zip(records, section_masks(subset)):
+        free = free_seats_of(record)
+        if free is None:
+            free = 0
+            if unreadable is not None:
+                unreadable.append(record)
+        if free <= 0 and not include_full:
+            continue
+        record["free_seats"] = free
+        code = str(record[COURSE_CODE_COLUMN]).strip()
+        grouped[code].setdefault(mask, []).append(record)
+    return {
+        code: sorted(
+            (SectionOption(mask, sections) for mask, sections in by_mask.items()),
+            key=lambda option: -option.free_seats,
+        )
+        for code, by_mask in grouped.items()
+    }
+
+
+def iter_timetables(options: list[list[SectionOption]]):
+    """Every conflict-free choice of one option per course, in search order."""
+    order = sorted(range(len(options)), key=lambda index: len(options[index]))
+
+    def walk(depth: int, used: int, chosen: list):
+        if depth == len(order):
+            by_course = dict(zip(order, chosen))
+            yield [by_course[index] for index in range(len(options))]
+            return
+        for option in options[order[depth]]:
+            if option.mask & used:
+                continue
+            chosen.append(option)
+            yield from walk(depth + 1, used | option.mask, chosen)
+            chosen.pop()
+
+    if options:
+        yield from walk(0, 0, [])
+
+
+def best_timetables(options: list[list[SectionOption]], limit: int = 10) -> list[tuple]:
+    """Top ``limit`` timetables as ``(min_free, total_free, options)``, best first.
+
+    ``options`` lists must be sorted by free seats, as ``course_options``
+    returns them.
+    """
+    order = sorted(range(len(options)), key=lambda index: len(options[index]))
+    ordered = [options[index] for index in order]
+    kept: list[tuple] = []  # min-heap of (min_free, total_free, tiebreak, choice)
+    tiebreak = count()
+
+    def walk(depth: int, used: int, min_free: float, total_free: int, chosen: list):
+        if depth == len(ordered):
+            entry = (min_free, total_free, -next(tiebreak), list(chosen))
+            if len(kept) < limit:
+                heapq.heappush(kept, entry)
+            else:
+                heapq.heappushpop(kept, entry)
+            return
+
+        # Best free seats each remaining course can still offer; also a
+        # forward check that none of them is already blocked.
+        bound_min, bound_total = min_free, total_free
+        for later in ordered[depth:]:
+            best = next((option.free_seats for option in later if not option.mask & used), None)
+            if best is None:
+                return
+            bound_min = min(bound_min, best)
+            bound_total += best
+        if len(kept) == limit and (bound_min, bound_total) <= kept[0][:2]:
+            return
+
+        for option in ordered[depth]:
+            if option.mask & used:
+                continue
+            chosen.append(option)
+            walk(
+                depth + 1,
+                used | option.mask,
+                min(min_free, option.free_seats),
+                total_free + option.free_seats,
+                chosen,
+            )
+            chosen.pop()
+
+    if ordered and limit > 0:
+        walk(0, 0, float("inf"), 0, [])
+
+    results = []
+    for min_free, total_free, _, chosen in sorted(kept, reverse=True):
+        by_course = dict(zip(order, chosen))
+        results.append((min_free, total_free, [by_course[index] for index in range(len(options))]))
+    return results
+
+
+def format_section(row: dict) -> str:
+    return " | ".join(
+        str(row.get(column, ""))
+        for column in (
+            "كد ارائه کلاس درس",
+            "نام درس",
+            "استاد",
+            "زمانبندي تشکيل کلاس",
+            "زمان امتحان",
+        )
+    ) + f" | {row['free_seats']} free"
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("course_codes", nargs="+", help="كد درس values to take.")
+    parser.add_argument("--limit", type=int, default=10, help="Timetables to print.")
+    parser.add_argument(
+        "--include-full",
+        action="store_true",
+        help="Also use sections with no free seats.",
+    )
+    parser.add_argument(
+        "--all",
+        action="store_true",
+        help="Print every conflict-free timetable as it is found, unranked (ignores --limit).",
+    )
+    return parser
+
+
+def print_timetable(heading: str, chosen: list[SectionOption]) -> None:
+    print(f"\n{heading}")
+    for option in chosen:
+        print("  " + format_section(option.sections[0]))
+        if len(option.sections) > 1:
+            others = ", ".join(
+                str(row.get("كد ارائه کلاس درس", "")) for row in option.sections[1:]
+            )
+            print(f"    same times: {others}")
+
+
+def run(argv: list[str] | None = None) -> None:
+    args = build_parser().parse_args(argv)
+    main.load_reporting()
+    try:
+        df = main.read_dataset("raw")
+    except FileNotFoundError as exc:
+        sys.exit(f"{exc} Run `python main.py` first.")
+
+    started = time.perf_counter()
+    unreadable: list[dict] = []
+    by_course = course_options(df, args.course_codes, args.include_full, unreadable)
+    if unreadable:
+        codes = ", ".join(str(row.get("كد ارائه کلاس درس", "")) for row in unreadable)
+        print(
+            f"Warning: {len(unreadable)} section(s) without readable seat counts "
+            f"{'taken as 0 free' if args.include_full else 'skipped'}: {codes}",
+            file=sys.stderr,
+        )
+    missing = [code for code, options in by_course.items() if not options]
+    if missing:
+        sys.exit(f"No {'' if args.include_full else 'open '}sections for: {', '.join(missing)}")
+    if args.all:
+        found = 0
+        for found, chosen in enumerate(iter_timetables(list(by_course.values())), 1):
+            min_free = min(option.free_seats for option in chosen)
+            total_free = sum(option.free_seats for option in chosen)
+            print_timetable(f"{found}.  fewest free seats {min_free}, total {total_free}", chosen)
+        results_count = found
+    else:
+        results = best_timetables(list(by_course.values()), args.limit)
+        for rank, (min_free, total_free, chosen) in enumerate(results, 1):
+            print_timetable(f"#{rank}  fewest free seats {min_free}, total {total_free}", chosen)
+        results_count = len(results)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    if not results_count:
+        print("No conflict-free timetable.")
+    print(
+        f"{results_count} timetable(s) from "
+        f"{sum(len(options) for options in by_course.values())} options in {elapsed_ms:.0f} ms",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,300 @@
+"""Structured class schedules and exam times with an interval index.
+
+"زمانبندي تشکيل کلاس" and "زمان امتحان" arrive as free text such as
+``درس(ت): دوشنبه 10:00-12:00 فرد، درس(ت): چهارشنبه 08:00-10:00`` and
+``تاريخ: 1404/10/15 ساعت: 10:30-12:30``. ``parse_sessions`` and
+``parse_exams`` turn whole columns into records, and ``ScheduleIndex``
+answers time queries on the sessions:
+
+    python course_schedule.py --day دوشنبه --time 10:00-12:00
+    python course_schedule.py --day "سه شنبه" --at 10:30 --room "ساختمان 2 - كلاس 210"
+
+The CLI reads the raw dataset written by the last export.
+"""
+
+import argparse
+import re
+import sys
+import time
+from bisect import bisect_left
+
+import main
+from main import SORT_TRANSLATION, normalize_persian_for_sort
+
+
+SCHEDULE_COLUMN = "زمانبندي تشکيل کلاس"
+EXAM_COLUMN = "زمان امتحان"
+ROOM_COLUMN = "مكان برگزاري"
+
+# Saturday first, as on the site. Keys have spaces and ZWNJ removed.
+WEEKDAYS = ["شنبه", "یکشنبه", "دوشنبه", "سه شنبه", "چهارشنبه", "پنجشنبه", "جمعه"]
+WEEKDAY_INDEX = {name.replace(" ", ""): index for index, name in enumerate(WEEKDAYS)}
+
+# Matched after SORT_TRANSLATION, so ي/ك and Persian digits are already folded.
+SESSION_RE = re.compile(
+    r"(?P<day>(?:یک|دو|سه|چهار|پنج)?[\s\u200c]?شنبه|جمعه)\s+"
+    r"(?P<start_h>\d{1,2}):(?P<start_m>\d{2})\s*-\s*"
+    r"(?P<end_h>\d{1,2}):(?P<end_m>\d{2})"
+    r"(?:\s*(?P<weeks>فرد|زوج))?"
+)
+EXAM_DATE_RE = re.compile(r"(?P<year>\d{4})/(?P<month>\d{1,2})/(?P<day>\d{1,2})")
+EXAM_TIME_RE = re.compile(
+    r"(?P<start_h>\d{1,2}):(?P<start_m>\d{2})"
+    r"(?:\s*-\s*(?P<end_h>\d{1,2}):(?P<end_m>\d{2}))?"
+)
+DAY_SEPARATORS_RE = re.compile(r"[\s\u200c]")
+
+WEEK_CHOICES = {"all": (True, True), "odd": (True, False), "even": (False, True)}
+
+DISPLAY_COLUMNS = [
+    "كد ارائه کلاس درس",
+    "نام درس",
+    "استاد",
+    SCHEDULE_COLUMN,
+    ROOM_COLUMN,
+]
+
+
+def parse_schedule_text(text) -> list[tuple[int, int, int, bool, bool]]:
+    """``(weekday, start, end, odd_weeks, even_weeks)`` for each session."""
+    sessions = []
+    for match in SESSION_RE.finditer(str(text or "").translate(SORT_TRANSLATION)):
+        weeks = match["weeks"]
+        sessions.append(
+            (
+                WEEKDAY_INDEX[DAY_SEPARATORS_RE.sub("", match["day"])],
+                int(match["start_h"]) * 60 + int(match["start_m"]),
+                int(match["end_h"]) * 60 + int(match["end_m"]),
+                weeks != "زوج",
+                weeks != "فرد",
+            )
+        )
+    return sessions
+
+
+def parse_exam_text(text) -> tuple:
+    """``(exam_date, exam_key, exam_start, exam_end)``; ``None`` where missing."""
+    text = str(text or "").translate(SORT_TRANSLATION)
+    exam_date = exam_key = exam_start = exam_end = None
+    date = EXAM_DATE_RE.search(text)
+    if date:
+        year, month, day = int(date["year"]), int(date["month"]), int(date["day"])
+        exam_date = f"{year}/{month:02d}/{day:02d}"
+        exam_key = year * 10000 + month * 100 + day
+        # Search after the date so "1404/10/15" is not read as a time.
+        text = text[: date.start()] + " " + text[date.end() :]
+    clock = EXAM_TIME_RE.search(text)
+    if clock:
+        exam_start = int(clock["start_h"]) * 60 + int(clock["start_m"])
+        if clock["end_h"]:
+            exam_end = int(clock["end_h"]) * 60 + int(clock["end_m"])
+    return exam_date, exam_key, exam_start, exam_end
+
+
+def distinct_values(df, column: str):
+    """``(codes, uniques)`` of a column; the site repeats the same few
+    schedule and exam strings across thousands of sections, so each distinct
+    string is parsed once."""
+    if column not in df.columns:
+        return main.pd.factorize(main.pd.Series("", index=df.index))
+    return main.pd.factorize(df[column].astype(object).fillna(""))
+
+
+def parse_sessions(df):
+    """One row per weekly session: ``row`` (position in ``df``), ``weekday``
+    (0 = شنبه), ``start``/``end`` in minutes after midnight, and
+    ``odd_weeks``/``even_weeks`` (both true unless the session says فرد/زوج).
+    """
+    np = main.np
+    codes, uniques = distinct_values(df, SCHEDULE_COLUMN)
+    parsed = [parse_schedule_text(text) for text in uniques]
+    flat = np.array(
+        [session for sessions in parsed for session in sessions] or [(0, 0, 0, 0, 0)],
+        dtype="int16",
+    )
+    counts = np.array([len(sessions) for sessions in parsed], dtype="int64")
+    offsets = np.cumsum(counts) - counts
+
+    # Expand every row into its code's sessions without a Python loop.
+    row_counts = counts[codes]
+    first = np.cumsum(row_counts) - row_counts
+    within = np.arange(row_counts.sum()) - np.repeat(first, row_counts)
+    sessions = flat[np.repeat(offsets[codes], row_counts) + within]
+    return main.pd.DataFrame(
+        {
+            "row": np.repeat(np.arange(len(codes)), row_counts),
+            "weekday": sessions[:, 0].astype("int8"),
+            "start": sessions[:, 1],
+            "end": sessions[:, 2],
+            "odd_weeks": sessions[:, 3].astype(bool),
+            "even_weeks": sessions[:, 4].astype(bool),
+        }
+    )
+
+
+def parse_exams(df):
+    """Exam date and time for every row of ``df`` (same index).
+
+    ``exam_date`` is ``YYYY/MM/DD`` and ``exam_key`` the same date as a
+    sortable integer; times are minutes after midnight. Unparsed parts are
+    missing.
+    """
+    pd = main.pd
+    codes, uniques = distinct_values(df, EXAM_COLUMN)
+    parsed = [parse_exam_text(text) for text in uniques]
+    columns = list(zip(*parsed)) if parsed else [(), (), (), ()]
+    return pd.DataFrame(
+        {
+            "exam_date": pd.array(columns[0], dtype=object).take(codes),
+            "exam_key": pd.array(columns[1], dtype="Int32").take(codes),
+            "exam_start": pd.array(columns[2], dtype="Int16").take(codes),
+            "exam_end": pd.array(columns[3], dtype="Int16").take(codes),
+        },
+        index=df.index,
+    )
+
+
+class IntervalBucket:
+    """Intervals of one weekday (or one room and weekday), sorted by start.
+
+    Sessions are short, so an overlap lookup only has to look at intervals
+    starting within ``max_length`` before the query window: two bisections
+    and a scan of that narrow slice.
+    """
+
+    def __init__(self, intervals: list[tuple]) -> None:
+        intervals.sort()
+        self.starts = [item[0] for item in intervals]
+        self.ends = [item[1] for item in intervals]
+        self.rows = [item[2] for item in intervals]
+        self.odd = [item[3] for item in intervals]
+        self.even = [item[4] for item in intervals]
+        self.max_length = max((end - start for start, end, *_ in intervals), default=0)
+
+    def overlapping(self, start: int, end: int, odd: bool = True, even: bool = True):
+        low = bisect_left(self.starts, start - self.max_length + 1)
+        high = bisect_left(self.starts, end)
+        for i in range(low, high):
+            if self.ends[i] > start and ((odd and self.odd[i]) or (even and self.even[i])):
+                yield self.rows[i]
+
+
+class ScheduleIndex:
+    """Per-weekday and per-room interval index over ``parse_sessions`` output.
+
+    Results are row positions in the DataFrame the sessions came from.
+    """
+
+    def __init__(self, sessions, rooms=None) -> None:
+        by_day: dict[int, list] = {}
+        by_room: dict[tuple[str, int], list] = {}
+        room_of = list(rooms) if rooms is not None else None
+        for row, weekday, start, end, odd, even in zip(
+            sessions["row"].tolist(),
+            sessions["weekday"].tolist(),
+            sessions["start"].tolist(),
+            sessions["end"].tolist(),
+            sessions["odd_weeks"].tolist(),
+            sessions["even_weeks"].tolist(),
+        ):
+            interval = (start, end, row, odd, even)
+            by_day.setdefault(weekday, []).append(interval)
+            if room_of is not None and room_of[row]:
+                by_room.setdefault((room_of[row], weekday), []).append(interval)
+        self.by_day = {key: IntervalBucket(items) for key, items in by_day.items()}
+        self.by_room = {key: IntervalBucket(items) for key, items in by_room.items()}
+
+    @classmethod
+    def from_dataframe(cls, df) -> "ScheduleIndex":
+        rooms = None
+        if ROOM_COLUMN in df.columns:
+            codes, uniques = distinct_values(df, ROOM_COLUMN)
+            normalized = [normalize_persian_for_sort(room) for room in uniques]
+            rooms = [normalized[code] for code in codes]
+        return cls(parse_sessions(df), rooms)
+
+    def overlapping(
+        self, weekday: int, start: int, end: int, weeks: str = "all", room: str = ""
+    ) -> list[int]:
+        """Rows with a session on ``weekday`` overlapping ``[start, end)``."""
+        if room:
+            bucket = self.by_room.get((normalize_persian_for_sort(room), weekday))
+        else:
+            bucket = self.by_day.get(weekday)
+        if bucket is None:
+            return []
+        return sorted(set(bucket.overlapping(start, end, *WEEK_CHOICES[weeks])))
+
+    def at(self, weekday: int, minute: int, weeks: str = "all", room: str = "") -> list[int]:
+        """Rows in session at ``minute`` on ``weekday``."""
+        return self.overlapping(weekday, minute, minute + 1, weeks, room)
+
+
+def parse_weekday(text: str) -> int:
+    key = normalize_persian_for_sort(text).replace(" ", "").replace("\u200c", "")
+    if key.isdigit() and int(key) < len(WEEKDAYS):
+        return int(key)
+    if key not in WEEKDAY_INDEX:
+        raise ValueError(f"Unknown weekday {text!r}; expected one of {', '.join(WEEKDAYS)}.")
+    return WEEKDAY_INDEX[key]
+
+
+def parse_clock(text: str) -> int:
+    hours, _, mins = normalize_persian_for_sort(text).partition(":")
+    return int(hours) * 60 + int(mins or 0)
+
+
+def parse_time_range(text: str) -> tuple[int, int]:
+    start, _, end = text.partition("-")
+    return parse_clock(start), parse_clock(end)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--day", required=True, help="Weekday name (شنبه ... جمعه) or 0-6.")
+    when = parser.add_mutually_exclusive_group(required=True)
+    when.add_argument("--time", help="Window HH:MM-HH:MM; sessions overlapping it match.")
+    when.add_argument("--at", help="Time HH:MM; sessions running at it match.")
+    parser.add_argument("--room", default="", help=f"Exact {ROOM_COLUMN}.")
+    parser.add_argument("--weeks", choices=list(WEEK_CHOICES), default="all")
+    parser.add_argument("--limit", type=int, default=50)
+    return parser
+
+
+def run(argv: list[str] | None = None) -> None:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        weekday = parse_weekday(args.day)
+        if args.time:
+            start, end = parse_time_range(args.time)
+        else:
+            start = parse_clock(args.at)
+            end = start + 1
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    main.load_reporting()
+    try:
+        df = main.read_dataset("raw")
+    except FileNotFoundError as exc:
+        sys.exit(f"{exc} Run `python main.py` first.")
+
+    started = time.perf_counter()
+    index = ScheduleIndex.from_dataframe(df)
+    built = time.perf_counter()
+    rows = index.overlapping(weekday, start, end, args.weeks, args.room)
+    queried = time.perf_counter()
+
+    for row in rows[: args.limit]:
+        record = df.iloc[row]
+        print(" | ".join(str(record.get(col, "")) for col in DISPLAY_COLUMNS))
+    print(
+        f"{len(rows)} section(s); index built in {(built - started) * 1000:.0f} ms, "
+        f"query {(queried - built) * 1000:.2f} ms",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    run()
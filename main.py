@@ -1,76 +1,178 @@
+import argparse
+import functools
+import hashlib
+import http.client
 import importlib.util
+import io
+import json
+import math
+import multiprocessing
+import os
+import queue
 import re
 import subprocess
 import sys
+import threading
 import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from html.parser import HTMLParser
 from pathlib import Path
+from urllib.parse import urlsplit
 
 
 SCRIPT_DIR = Path(__file__).resolve().parent
 PROJECT_NAME = "Amoozeshyar Offered Courses Extractor"
 
+# Overridable so the pipeline can run against the offline stand-in server.
+BASE_URL = os.environ.get("AMOOZESHYAR_BASE_URL", "https://eserv.iau.ir").rstrip("/")
+OUTPUT_DIR = Path(os.environ.get("AMOOZESHYAR_OUTPUT_DIR") or SCRIPT_DIR)
+BROWSER_CHANNEL = os.environ.get("AMOOZESHYAR_BROWSER_CHANNEL", "chrome")
+HEADLESS = os.environ.get("AMOOZESHYAR_HEADLESS", "") == "1"
+
 RAW_EXCEL_NAME = "لیست دروس ارائه شده آموزشیار.xlsx"
-SPECIALIZED_EXCEL_NAME = "لیست دروس تخصصی.xlsx"
-GENERAL_EXCEL_NAME = "لیست دروس عمومی.xlsx"
+CHECKPOINT_NAME = "scrape_checkpoint.jsonl"
+SNAPSHOT_NAME = "courses_snapshot.json"
+DELTA_REPORT_NAME = "تغییرات دروس.xlsx"
+MANIFEST_NAME = "outputs_manifest.json"
+SEAT_EVENTS_NAME = "seat_events.jsonl"
+# Primary datasets: courses_<name>.parquet.
+DATASET_PREFIX = "courses"
+# Optional report definitions (JSON, or YAML with PyYAML); see DEFAULT_REPORT_SPECS.
+REPORT_SPEC_NAME = "reports.json"
+# `fanout` writes one report per faculty / group of every unit under this folder.
+FANOUT_DIR_NAME = "fanout"
+FANOUT_MANIFEST_NAME = "fanout_manifest.json"
+FANOUT_LEVELS = {"faculty": "دانشکده", "group": "گروه آموزشی"}
+MIN_MONITOR_INTERVAL_S = 60
+# Playwright errors (e.g. navigations) a condition wait re-arms after.
+CONDITION_RETRY_LIMIT = 20
+
+
+# pip name -> import name, per stage.
+BROWSER_PACKAGES = {"playwright": "playwright"}
+REPORT_PACKAGES = {
+    "pandas": "pandas",
+    "openpyxl": "openpyxl",
+    "reportlab": "reportlab",
+    "arabic-reshaper": "arabic_reshaper",
+    "python-bidi": "bidi",
+    "pypdf": "pypdf",
+    "pyarrow": "pyarrow",
+}
+REQUIRED_PACKAGES = [*BROWSER_PACKAGES, *REPORT_PACKAGES]
+DEPENDENCY_STAMP = SCRIPT_DIR / ".dependencies_checked.json"
 
+# Filled in by load_browser() / load_reporting() so that a stage only imports
+# what it needs (post-processing never loads Playwright).
+PlaywrightError = PlaywrightTimeoutError = sync_playwright = None
+pd = np = get_display = arabic_reshaper = openpyxl = None
+colors = A4 = landscape = getSampleStyleSheet = ParagraphStyle = TA_CENTER = None
+mm = pdfmetrics = TTFont = None
+LongTable = Paragraph = SimpleDocTemplate = Spacer = TableStyle = None
 
-REQUIRED_PACKAGES = [
-    "playwright",
-    "pandas",
-    "openpyxl",
-    "reportlab",
-    "arabic-reshaper",
-    "python-bidi",
-]
+# reportlab.lib.units.mm, needed before reportlab is loaded.
+MM = 72 / 25.4
 
 
-def ensure_package(package_name: str) -> None:
-    if importlib.util.find_spec(package_name) is None:
+def ensure_package(package_name: str, module_name: str | None = None) -> None:
+    if importlib.util.find_spec(module_name or package_name) is None:
         subprocess.check_call([sys.executable, "-m", "pip", "install", package_name])
 
 
-for pkg in REQUIRED_PACKAGES:
-    ensure_package(pkg)
+def ensure_packages(packages: dict[str, str]) -> None:
+    """Install missing packages, skipping the probe once it passed for this Python.
+
+    Successful checks are remembered in DEPENDENCY_STAMP per interpreter, so
+    later runs do not look the packages up again.
+    """
+    try:
+        stamp = json.loads(DEPENDENCY_STAMP.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        stamp = {}
+    checked = set(stamp.get(sys.executable, []))
+    missing = [name for name in packages if name not in checked]
+    if not missing:
+        return
+
+    for name in missing:
+        ensure_package(name, packages[name])
+    stamp[sys.executable] = sorted(checked | set(missing))
+    try:
+        DEPENDENCY_STAMP.write_text(json.dumps(stamp, indent=2), encoding="utf-8")
+    except OSError:
+        pass
 
 
-try:
-    playwright_sync_api = importlib.import_module("playwright.sync_api")
+def load_browser() -> None:
+    """Import Playwright's sync API into this module's globals."""
+    global PlaywrightError, PlaywrightTimeoutError, sync_playwright
+    if sync_playwright is not None:
+        return
+    ensure_packages(BROWSER_PACKAGES)
+    try:
+        playwright_sync_api = importlib.import_module("playwright.sync_api")
+    except Exception as exc:
+        raise RuntimeError(
+            "Could not import Playwright. Try: pip install playwright ; python -m playwright install chrome"
+        ) from exc
     PlaywrightError = playwright_sync_api.Error
     PlaywrightTimeoutError = playwright_sync_api.TimeoutError
     sync_playwright = playwright_sync_api.sync_playwright
-except Exception as exc:
-    raise RuntimeError(
-        "Could not import Playwright. Try: pip install playwright ; python -m playwright install chrome"
-    ) from exc
-
-
-pd = importlib.import_module("pandas")
-bidi_algorithm = importlib.import_module("bidi.algorithm")
-get_display = bidi_algorithm.get_display
-arabic_reshaper = importlib.import_module("arabic_reshaper")
-
-colors = importlib.import_module("reportlab.lib.colors")
-pagesizes = importlib.import_module("reportlab.lib.pagesizes")
-A4 = pagesizes.A4
-landscape = pagesizes.landscape
-getSampleStyleSheet = importlib.import_module(
-    "reportlab.lib.styles"
-).getSampleStyleSheet
-ParagraphStyle = importlib.import_module("reportlab.lib.styles").ParagraphStyle
-TA_CENTER = importlib.import_module("reportlab.lib.enums").TA_CENTER
-mm = importlib.import_module("reportlab.lib.units").mm
-pdfmetrics = importlib.import_module("reportlab.pdfbase.pdfmetrics")
-TTFont = importlib.import_module("reportlab.pdfbase.ttfonts").TTFont
-platypus = importlib.import_module("reportlab.platypus")
-LongTable = platypus.LongTable
-Paragraph = platypus.Paragraph
-SimpleDocTemplate = platypus.SimpleDocTemplate
-Spacer = platypus.Spacer
-TableStyle = platypus.TableStyle
+
+
+def load_companion(name: str):
+    """Import a sibling module (async_engine, course_db) that uses ``main``.
+
+    Run as ``python main.py`` this module is ``__main__``; registering it as
+    ``main`` first stops the companion's ``import main`` from loading a second
+    copy with its own settings, WAIT_STATS and Playwright globals.
+    """
+    sys.modules.setdefault("main", sys.modules[__name__])
+    return importlib.import_module(name)
+
+
+def load_reporting() -> None:
+    """Import pandas, reportlab and the RTL shaping libraries into this module's globals."""
+    global pd, np, get_display, arabic_reshaper, openpyxl
+    global colors, A4, landscape, getSampleStyleSheet, ParagraphStyle, TA_CENTER
+    global mm, pdfmetrics, TTFont
+    global LongTable, Paragraph, SimpleDocTemplate, Spacer, TableStyle
+    if pd is not None:
+        return
+    ensure_packages(REPORT_PACKAGES)
+
+    bidi_algorithm = importlib.import_module("bidi.algorithm")
+    get_display = bidi_algorithm.get_display
+    arabic_reshaper = importlib.import_module("arabic_reshaper")
+    openpyxl = importlib.import_module("openpyxl")
+    np = importlib.import_module("numpy")
+
+    colors = importlib.import_module("reportlab.lib.colors")
+    pagesizes = importlib.import_module("reportlab.lib.pagesizes")
+    A4 = pagesizes.A4
+    landscape = pagesizes.landscape
+    styles = importlib.import_module("reportlab.lib.styles")
+    getSampleStyleSheet = styles.getSampleStyleSheet
+    ParagraphStyle = styles.ParagraphStyle
+    TA_CENTER = importlib.import_module("reportlab.lib.enums").TA_CENTER
+    mm = importlib.import_module("reportlab.lib.units").mm
+    pdfmetrics = importlib.import_module("reportlab.pdfbase.pdfmetrics")
+    TTFont = importlib.import_module("reportlab.pdfbase.ttfonts").TTFont
+    platypus = importlib.import_module("reportlab.platypus")
+    LongTable = platypus.LongTable
+    Paragraph = platypus.Paragraph
+    SimpleDocTemplate = platypus.SimpleDocTemplate
+    Spacer = platypus.Spacer
+    TableStyle = platypus.TableStyle
+    # Set last: it doubles as the "already loaded" flag.
+    pd = importlib.import_module("pandas")
 
 
 TARGET_URL = (
-    "https://eserv.iau.ir/EServices/handleCourseClassSearchAction.do"
+    f"{BASE_URL}/EServices/handleCourseClassSearchAction.do"
     "?parameter%28menuItem%29=0_0"
     "&dispatch=selectStudentParameter"
     "&subject=CourseClass"
@@ -95,7 +197,15 @@ TARGET_URL = (
     "&_H2__=18"
     "&_H1__=1386"
 )
-START_URL = "https://eserv.iau.ir/EServices/startAction.do"
+START_URL = f"{BASE_URL}/EServices/startAction.do"
+
+# Resource types the extractor never reads; --lean aborts them after login.
+LEAN_BLOCKED_RESOURCE_TYPES = frozenset(
+    {"image", "media", "font", "stylesheet", "texttrack", "manifest"}
+)
+# Let through whatever their type: the site's own scripts drive the menu
+# tree (cache?a=menu) and the search form's submit and paging handlers.
+LEAN_ALLOWED_URL_RE = re.compile(r"/EServices/[^?#]*\.js(?:[?#]|$)|cache\?a=menu", re.I)
 
 MEANINGFUL_COLUMNS = [
     "كد درس",
@@ -125,6 +235,77 @@ MEANINGFUL_COLUMNS = [
 GROUP_LEVEL_TEXT = "ارائه در سطح گروه آموزشی"
 FACULTY_LEVEL_TEXT = "ارائه در سطح دانشکده"
 
+# Faculty code and columns that make up the specialized/general reports.
+REPORT_FACULTY_FILTER = "143"
+REPORT_COLUMNS = [
+    "كد درس",
+    "نام درس",
+    "نوع درس",
+    "تعداد واحد نظري",
+    "تعداد واحد عملي",
+    "كد ارائه کلاس درس",
+    "نام كلاس درس",
+    "زمانبندي تشکيل کلاس",
+    "استاد",
+    "حداكثر ظرفيت",
+    "زمان امتحان",
+    "مكان برگزاري",
+    "مقطع ارائه درس",
+]
+
+# Reports built when there is no reports.json. Each report keeps the rows
+# matching all of its filters ("equals" or "contains", a string or a list of
+# alternatives, compared on the stripped cell text), shows ``columns``, sorted
+# by ``sort`` with Persian collation, and is written as courses_<name> plus
+# "<file>.xlsx" / "<file>.pdf".
+DEFAULT_REPORT_SPECS = [
+    {
+        "name": "specialized",
+        "title": "لیست دروس تخصصی",
+        "filters": {
+            "دانشکده": {"contains": REPORT_FACULTY_FILTER},
+            "سطح ارائه": {"equals": GROUP_LEVEL_TEXT},
+        },
+        "columns": REPORT_COLUMNS,
+        "sort": ["نام درس"],
+        "palette": "green",
+    },
+    {
+        "name": "general",
+        "title": "لیست دروس عمومی",
+        "filters": {
+            "دانشکده": {"contains": REPORT_FACULTY_FILTER},
+            "سطح ارائه": {"equals": FACULTY_LEVEL_TEXT},
+        },
+        "columns": REPORT_COLUMNS,
+        "sort": ["نام درس"],
+        "palette": "blue",
+    },
+]
+REPORT_FILTER_OPERATORS = {"equals", "contains"}
+
+# Highly repetitive columns stored dictionary-encoded in the datasets.
+CATEGORY_COLUMNS = [
+    "نوع درس",
+    "مقطع ارائه درس",
+    "نوع ارائه",
+    "سطح ارائه",
+    "گروه آموزشی",
+    "دانشکده",
+    "واحد",
+    "استان",
+]
+
+# Fields compared between runs for the change report.
+DELTA_FIELDS = [
+    "حداكثر ظرفيت",
+    "تعداد ثبت نامي تاکنون",
+    "استاد",
+    "ساير اساتيد",
+    "زمانبندي تشکيل کلاس",
+    "زمان امتحان",
+]
+
 FONT_CANDIDATES = [
     SCRIPT_DIR / "B_Nazanin_Bold.ttf",
     Path(r"C:\Windows\Fonts\arial.ttf"),
@@ -132,10 +313,18 @@ FONT_CANDIDATES = [
 ]
 
 
-def normalize_text(value) -> str:
+def is_missing(value) -> bool:
     if value is None:
-        return ""
-    if pd.isna(value):
+        return True
+    if isinstance(value, float):
+        return math.isnan(value)
+    # pd.NA / NaT only exist if pandas was loaded.
+    pandas = sys.modules.get("pandas")
+    return pandas is not None and pandas.isna(value) is True
+
+
+def normalize_text(value) -> str:
+    if is_missing(value):
         return ""
     return str(value).strip().replace("_", "-")
 
@@ -144,8 +333,106 @@ def shape_persian(value) -> str:
     text = normalize_text(value)
     if not text:
         return ""
-    reshaped = arabic_reshaper.reshape(text)
-    return get_display(reshaped)
+    return SHAPING_CACHE.shape(text)
+
+
+@functools.lru_cache(maxsize=None)
+def wrap_pattern(width: int) -> re.Pattern:
+    return re.compile(rf".{{1,{width}}}(?:\s+|$)")
+
+
+def wrap_lines(text: str, wrap_chars: int | None) -> list[str]:
+    split_lines = [line for line in text.splitlines() if line.strip()]
+    if not split_lines:
+        split_lines = [text]
+
+    lines = []
+    for line in split_lines:
+        if wrap_chars and len(line) > wrap_chars:
+            parts = [p for p in wrap_pattern(wrap_chars).findall(line + " ") if p.strip()]
+            if parts:
+                lines.extend([p.strip() for p in parts])
+            else:
+                lines.append(line)
+        else:
+            lines.append(line)
+    return lines
+
+
+class ShapingCache:
+    """Bounded LRU of reshaped/bidi-reordered text shared by all PDF cells.
+
+    Course listings repeat the same instructors, schedules and labels on
+    every page, so most cells are shaped once and then looked up.
+    """
+
+    def __init__(self, maxsize: int = 50000) -> None:
+        self.maxsize = maxsize
+        self.entries: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(self, key, compute):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+        value = compute()
+        with self.lock:
+            self.entries[key] = value
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def shape(self, text: str) -> str:
+        return self.lookup(
+            ("shape", text), lambda: get_display(arabic_reshaper.reshape(text))
+        )
+
+    def shaped_lines(
+        self,
+        text: str,
+        wrap_chars: int | None = None,
+        reverse_visual_lines: bool = False,
+    ) -> tuple[str, ...]:
+        """Wrapped, shaped lines of ``text`` in visual order."""
+
+        def compute() -> tuple[str, ...]:
+            shaped = [
+                get_display(arabic_reshaper.reshape(line.strip())).strip()
+                for line in wrap_lines(text, wrap_chars)
+                if line
+            ]
+            if reverse_visual_lines and len(shaped) > 1:
+                shaped.reverse()
+            return tuple(shaped)
+
+        return self.lookup((text, wrap_chars, reverse_visual_lines), compute)
+
+    def stats(self) -> dict:
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+
+SHAPING_CACHE = ShapingCache()
 
 
 PERSIAN_ALPHA_ORDER = {
@@ -157,71 +444,102 @@ PERSIAN_ALPHA_ORDER = {
 }
 
 
+SORT_REPLACEMENTS = {
+    "ي": "ی",
+    "ى": "ی",
+    "ئ": "ی",
+    "ك": "ک",
+    "ة": "ه",
+    "ۀ": "ه",
+    "ؤ": "و",
+    "أ": "ا",
+    "إ": "ا",
+    "ٱ": "ا",
+    "آ": "ا",
+    "۰": "0",
+    "۱": "1",
+    "۲": "2",
+    "۳": "3",
+    "۴": "4",
+    "۵": "5",
+    "۶": "6",
+    "۷": "7",
+    "۸": "8",
+    "۹": "9",
+    "٠": "0",
+    "١": "1",
+    "٢": "2",
+    "٣": "3",
+    "٤": "4",
+    "٥": "5",
+    "٦": "6",
+    "٧": "7",
+    "٨": "8",
+    "٩": "9",
+    "\u200c": " ",
+    "\u200f": "",
+    "\u200e": "",
+}
+
+# One str.translate pass does every replacement and drops the diacritics.
+SORT_TRANSLATION = str.maketrans(SORT_REPLACEMENTS)
+SORT_TRANSLATION.update(
+    dict.fromkeys(
+        [
+            *range(0x064B, 0x0660),
+            0x0670,
+            *range(0x06D6, 0x06EE),
+        ]
+    )
+)
+WHITESPACE_RE = re.compile(r"\s+")
+
+
+class CollationTable(dict):
+    """str.translate table mapping each character to one collation codepoint.
+
+    Digits sort first, then PERSIAN_ALPHA_ORDER letters, then everything else
+    by codepoint, so a key is just a string compared codepoint by codepoint.
+    """
+
+    OTHER_OFFSET = 0x40
+
+    def __init__(self) -> None:
+        super().__init__({ord(str(digit)): digit for digit in range(10)})
+        for char, rank in PERSIAN_ALPHA_ORDER.items():
+            self[ord(char)] = 0x0F + rank
+
+    def __missing__(self, code: int) -> int:
+        value = min(code + self.OTHER_OFFSET, sys.maxunicode)
+        self[code] = value
+        return value
+
+
+COLLATION_TABLE = CollationTable()
+
+
 def normalize_persian_for_sort(value) -> str:
     text = normalize_text(value)
     if not text:
         return ""
+    return WHITESPACE_RE.sub(" ", text.translate(SORT_TRANSLATION)).strip()
 
-    replacements = {
-        "ي": "ی",
-        "ى": "ی",
-        "ئ": "ی",
-        "ك": "ک",
-        "ة": "ه",
-        "ۀ": "ه",
-        "ؤ": "و",
-        "أ": "ا",
-        "إ": "ا",
-        "ٱ": "ا",
-        "آ": "ا",
-        "۰": "0",
-        "۱": "1",
-        "۲": "2",
-        "۳": "3",
-        "۴": "4",
-        "۵": "5",
-        "۶": "6",
-        "۷": "7",
-        "۸": "8",
-        "۹": "9",
-        "٠": "0",
-        "١": "1",
-        "٢": "2",
-        "٣": "3",
-        "٤": "4",
-        "٥": "5",
-        "٦": "6",
-        "٧": "7",
-        "٨": "8",
-        "٩": "9",
-        "\u200c": " ",
-        "\u200f": "",
-        "\u200e": "",
-    }
-    for src, dst in replacements.items():
-        text = text.replace(src, dst)
 
-    text = re.sub(r"[\u064B-\u065F\u0670\u06D6-\u06ED]", "", text)
-    text = re.sub(r"\s+", " ", text).strip()
-    return text
+def persian_sort_key(value) -> str:
+    return normalize_persian_for_sort(value).translate(COLLATION_TABLE)
 
 
-def persian_sort_key(value) -> str:
-    text = normalize_persian_for_sort(value)
-    if not text:
-        return ""
+def persian_collation_keys(series):
+    """Integer sort keys for a whole Series; use as ``sort_values(key=...)``.
 
-    chunks = []
-    for char in text:
-        if char.isdigit():
-            chunks.append(f"0{int(char):03d}")
-            continue
-        rank = PERSIAN_ALPHA_ORDER.get(char)
-        if rank is not None:
-            chunks.append(f"1{rank:03d}")
-        else:
-            chunks.append(f"9{ord(char):04d}")
-    return "".join(chunks)
+    Each distinct value is normalized and keyed once, then the distinct keys
+    are ranked so every row gets a small integer (equal keys, equal rank).
+    """
+    codes, uniques = pd.factorize(series.astype(object).where(series.notna(), ""))
+    unique_keys = [persian_sort_key(value) for value in uniques]
+    key_ranks = {key: rank for rank, key in enumerate(sorted(set(unique_keys)))}
+    ranks = pd.Index([key_ranks[key] for key in unique_keys])
+    return pd.Series(ranks.take(codes), index=series.index)
 
 
 def normalize_header_key(value) -> str:
@@ -240,37 +558,15 @@ def rtl_paragraph(
     style,
     wrap_chars: int | None = None,
     reverse_visual_lines: bool = False,
-) -> Paragraph:
+) -> "Paragraph":
     text = normalize_text(value)
     if not text:
         return Paragraph("", style)
 
-    split_lines = [line for line in text.splitlines() if line.strip()]
-    if not split_lines:
-        split_lines = [text]
-
-    lines = []
-    for line in split_lines:
-        if wrap_chars and len(line) > wrap_chars:
-            parts = [
-                p
-                for p in re.findall(rf".{{1,{wrap_chars}}}(?:\s+|$)", line + " ")
-                if p.strip()
-            ]
-            if parts:
-                lines.extend([p.strip() for p in parts])
-            else:
-                lines.append(line)
-        else:
-            lines.append(line)
-
-    shaped_lines = [shape_persian(line).strip() for line in lines if line]
+    shaped_lines = SHAPING_CACHE.shaped_lines(text, wrap_chars, reverse_visual_lines)
     if not shaped_lines:
         return Paragraph("", style)
 
-    if reverse_visual_lines and len(shaped_lines) > 1:
-        shaped_lines = list(reversed(shaped_lines))
-
     paragraph_text = "<br/>".join(
         line.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
         for line in shaped_lines
@@ -294,15 +590,146 @@ def register_font() -> str:
     raise RuntimeError("No suitable Persian-supporting font found.")
 
 
+# Landscape A4 minus the 5 mm side margins.
+REPORT_TABLE_WIDTH = (297 - 10) * MM * 0.995
+CELL_PADDING = 6
+CELL_VPADDING = 8
+
+
+def plan_column_widths(
+    df,
+    font_name: str,
+    font_size: float = 8,
+    table_width: float = REPORT_TABLE_WIDTH,
+    sample_size: int = 400,
+    quantile: float = 0.9,
+    min_width: float = 12 * MM,
+) -> tuple[list[float], list[int]]:
+    """Column widths proportional to each column's measured text width.
+
+    Each column wants room for the ``quantile`` width of a sample of its
+    distinct values on one line (and at least its longest header word). The
+    wants are scaled to ``table_width`` with a floor of ``min_width``. Also
+    returns a wrap width in characters per column to match.
+    """
+    wanted = []
+    char_widths = []
+    for col in df.columns:
+        texts = [normalize_text(value) for value in df[col].unique()[:sample_size]]
+        texts = [text for text in texts if text]
+        widths = sorted(
+            pdfmetrics.stringWidth(SHAPING_CACHE.shape(text), font_name, font_size)
+            for text in texts
+        )
+        natural = widths[int(quantile * (len(widths) - 1))] if widths else 0.0
+        header_word = max(
+            (
+                pdfmetrics.stringWidth(SHAPING_CACHE.shape(word), font_name, font_size)
+                for word in normalize_text(col).split()
+            ),
+            default=0.0,
+        )
+        wanted.append(max(natural, header_word) + CELL_PADDING)
+        total_chars = sum(len(text) for text in texts)
+        char_widths.append(sum(widths) / total_chars if total_chars else font_size / 2)
+
+    scale = table_width / max(1.0, sum(wanted))
+    col_widths = [max(min_width, width * scale) for width in wanted]
+    overflow = sum(col_widths) - table_width
+    slack = sum(width - min_width for width in col_widths)
+    if overflow > 0 and slack > 0:
+        col_widths = [
+            width - overflow * (width - min_width) / slack for width in col_widths
+        ]
+
+    wrap_chars = [
+        max(6, int((width - CELL_PADDING) / char_width))
+        for width, char_width in zip(col_widths, char_widths)
+    ]
+    return col_widths, wrap_chars
+
+
+def cell_layout(lines: tuple[str, ...], style, max_width: float) -> tuple[bool, int]:
+    """(fits as a plain one-line string, estimated rendered line count)."""
+    widths = [pdfmetrics.stringWidth(line, style.fontName, style.fontSize) for line in lines]
+    if len(widths) == 1 and widths[0] <= max_width:
+        return True, 1
+    # Overlong lines get some room for Paragraph breaking on word boundaries.
+    return False, sum(
+        1 if width <= max_width else math.ceil(width / (max_width * 0.9))
+        for width in widths
+    )
+
+
+def build_body_rows(
+    df,
+    style,
+    wrap_chars: int | list[int],
+    col_widths: list[float],
+    padding: float = CELL_PADDING,
+) -> tuple[list[list], list[int]]:
+    """Table cells for ``df``, built a column at a time, and lines per row.
+
+    A cell whose shaped text is a single line narrow enough for its column
+    stays a plain string; only cells that need wrapping become Paragraphs.
+    The line counts let callers hand LongTable fixed row heights.
+    """
+    if isinstance(wrap_chars, int):
+        wrap_chars = [wrap_chars] * len(df.columns)
+
+    columns = []
+    row_lines = [1] * len(df)
+    for col, col_width, col_wrap in zip(df.columns, col_widths, wrap_chars):
+        max_width = col_width - padding
+        layouts: dict[str, tuple[bool, int]] = {}
+        cells = []
+        for row_index, value in enumerate(df[col].tolist()):
+            text = normalize_text(value)
+            if not text:
+                cells.append("")
+                continue
+            lines = SHAPING_CACHE.shaped_lines(text, col_wrap)
+            if text not in layouts:
+                layouts[text] = cell_layout(lines, style, max_width)
+            plain, count = layouts[text]
+            row_lines[row_index] = max(row_lines[row_index], count)
+            if plain:
+                cells.append(lines[0])
+                continue
+            cells.append(rtl_paragraph(text, style, col_wrap))
+        columns.append(cells)
+    return [list(row) for row in zip(*columns)], row_lines
+
+
+def draw_page_number(canvas, number: int, font_name: str) -> None:
+    canvas.saveState()
+    canvas.setFont(font_name, 7)
+    canvas.drawCentredString(landscape(A4)[0] / 2, 2.5 * mm, str(number))
+    canvas.restoreState()
+
+
 def dataframe_to_pdf(
     df,
     pdf_path: Path,
-    title: str,
+    title: str | None,
     font_name: str,
     header_bg_color,
     stripe_bg_color,
     grid_color,
-) -> None:
+    number_pages: bool = True,
+    col_widths: list[float] | None = None,
+    wrap_chars: list[int] | None = None,
+    fixed_row_heights: bool = False,
+) -> int:
+    """Render ``df`` as a landscape table PDF and return its page count.
+
+    Chunks of a larger report pass ``title=None`` after the first one and
+    ``number_pages=False`` so numbers can be stamped after merging, plus the
+    report's planned ``col_widths``/``wrap_chars`` so all chunks line up.
+    Without them every column gets the same width. ``fixed_row_heights``
+    gives LongTable precomputed body row heights so it does not re-measure
+    cells while splitting pages.
+    """
     df = df.fillna("")
 
     doc = SimpleDocTemplate(
@@ -352,7 +779,12 @@ def dataframe_to_pdf(
         normalize_header_key("زمانبندی تشکیل کلاس"),
     }
 
-    table_data = []
+    if col_widths is None:
+        col_width = REPORT_TABLE_WIDTH / max(1, len(df.columns))
+        col_widths = [col_width] * len(df.columns)
+    if wrap_chars is None:
+        wrap_chars = 14 if len(df.columns) >= 10 else 24
+
     header_row = [
         rtl_paragraph(
             col,
@@ -362,21 +794,18 @@ def dataframe_to_pdf(
         )
         for col in df.columns
     ]
-    table_data.append(header_row)
+    body_rows, row_lines = build_body_rows(df, body_style, wrap_chars, col_widths)
+    table_data = [header_row] + body_rows
 
-    wrap_chars = 14 if len(df.columns) >= 10 else 24
-    for _, row in df.iterrows():
-        row_vals = [
-            rtl_paragraph(row[col], body_style, wrap_chars) for col in df.columns
+    row_heights = None
+    if fixed_row_heights:
+        row_heights = [None] + [
+            lines * body_style.leading + CELL_VPADDING for lines in row_lines
         ]
-        table_data.append(row_vals)
 
-    usable_width = landscape(A4)[0] - 10 * mm
-    table_width = usable_width * 0.995
-    col_width = table_width / max(1, len(df.columns))
-    col_widths = [col_width] * len(df.columns)
-
-    table = LongTable(table_data, colWidths=col_widths, repeatRows=1)
+    table = LongTable(
+        table_data, colWidths=col_widths, rowHeights=row_heights, repeatRows=1
+    )
     table.hAlign = "CENTER"
     table.setStyle(
         TableStyle(
@@ -397,126 +826,578 @@ def dataframe_to_pdf(
         )
     )
 
-    elements = [Paragraph(shape_persian(title), title_style), Spacer(1, 3 * mm), table]
-    doc.build(elements)
+    elements = [table]
+    if title:
+        elements = [Paragraph(shape_persian(title), title_style), Spacer(1, 3 * mm), table]
+
+    def on_page(canvas, page_doc) -> None:
+        if number_pages:
+            draw_page_number(canvas, canvas.getPageNumber(), font_name)
+
+    doc.build(elements, onFirstPage=on_page, onLaterPages=on_page)
+    return doc.page
+
+
+# (header, stripe) colours per report; grid is shared.
+REPORT_PALETTES = {
+    "green": ("#14532d", "#dcfce7"),
+    "blue": ("#1e3a8a", "#dbeafe"),
+}
+REPORT_GRID_COLOR = "#374151"
+# Reports longer than this are split into row chunks rendered by separate
+# workers and merged with pypdf.
+PDF_CHUNK_ROWS = 2000
+
+worker_font_name: str | None = None
+
+
+def worker_font() -> str:
+    """Register the report font once per process."""
+    global worker_font_name
+    if worker_font_name is None:
+        worker_font_name = register_font()
+    return worker_font_name
+
+
+def render_pdf_part(
+    df,
+    pdf_path: Path,
+    title: str | None,
+    palette: tuple[str, str],
+    number_pages: bool,
+    layout: dict,
+) -> dict:
+    """Process-pool entry point: render one report or chunk of one."""
+    load_reporting()
+    before = SHAPING_CACHE.stats()
+    pages = dataframe_to_pdf(
+        df,
+        pdf_path,
+        title,
+        worker_font(),
+        colors.HexColor(palette[0]),
+        colors.HexColor(palette[1]),
+        colors.HexColor(REPORT_GRID_COLOR),
+        number_pages=number_pages,
+        **layout,
+    )
+    after = SHAPING_CACHE.stats()
+    return {
+        "pages": pages,
+        "hits": after["hits"] - before["hits"],
+        "misses": after["misses"] - before["misses"],
+    }
+
+
+def merge_pdf_parts(parts: list[Path], pdf_path: Path) -> None:
+    """Concatenate chunk PDFs and stamp continuous page numbers."""
+    pypdf = importlib.import_module("pypdf")
+    canvas_module = importlib.import_module("reportlab.pdfgen.canvas")
+    font_name = worker_font()
+
+    writer = pypdf.PdfWriter()
+    for part in parts:
+        writer.append(str(part))
+
+    overlay_buffer = io.BytesIO()
+    overlay = canvas_module.Canvas(overlay_buffer, pagesize=landscape(A4))
+    for number in range(1, len(writer.pages) + 1):
+        draw_page_number(overlay, number, font_name)
+        overlay.showPage()
+    overlay.save()
+    overlay_pages = pypdf.PdfReader(overlay_buffer).pages
+    for page, stamp in zip(writer.pages, overlay_pages):
+        page.merge_page(stamp)
+
+    with open(pdf_path, "wb") as handle:
+        writer.write(handle)
+
+
+def render_reports(
+    reports: list[dict],
+    workers: int | None = None,
+    chunk_rows: int = PDF_CHUNK_ROWS,
+    layout: str = "planned",
+) -> None:
+    """Render report PDFs on a process pool, one task per report or row chunk.
+
+    Each report dict has ``df``, ``path``, ``title`` and ``palette``. With
+    one worker, or if a pool cannot be started, everything renders in-process.
+    ``layout`` is ``equal`` (same width for every column), ``planned``
+    (widths from plan_column_widths) or ``fixed`` (planned plus fixed row
+    heights); widths are planned once per report so chunks line up.
+    """
+    tasks = []
+    for report in reports:
+        df, path = report["df"], report["path"]
+        report_layout = {}
+        if layout in {"planned", "fixed"} and len(df.columns):
+            col_widths, wrap_chars = plan_column_widths(df.fillna(""), worker_font())
+            report_layout = {
+                "col_widths": col_widths,
+                "wrap_chars": wrap_chars,
+                "fixed_row_heights": layout == "fixed",
+            }
+        report["parts"] = []
+        if len(df) > chunk_rows:
+            for index, start in enumerate(range(0, len(df), chunk_rows)):
+                part_path = path.with_name(f"{path.stem}.part{index}.pdf")
+                report["parts"].append(part_path)
+                tasks.append(
+                    (
+                        df.iloc[start : start + chunk_rows],
+                        part_path,
+                        report["title"] if start == 0 else None,
+                        report["palette"],
+                        False,
+                        report_layout,
+                    )
+                )
+        else:
+            tasks.append(
+                (df, path, report["title"], report["palette"], True, report_layout)
+            )
+
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    results = None
+    if workers > 1:
+        try:
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            ) as pool:
+                futures = [pool.submit(render_pdf_part, *task) for task in tasks]
+                results = [future.result() for future in futures]
+        except (OSError, BrokenProcessPool) as exc:
+            print(f"PDF worker pool unavailable ({exc}); rendering in-process.")
+    if results is None:
+        results = [render_pdf_part(*task) for task in tasks]
+
+    for report in reports:
+        if report["parts"]:
+            merge_pdf_parts(report["parts"], report["path"])
+            for part in report["parts"]:
+                part.unlink(missing_ok=True)
+
+    hits = sum(result["hits"] for result in results)
+    misses = sum(result["misses"] for result in results)
+    print(
+        f"Rendered {len(reports)} PDFs as {len(tasks)} tasks on {max(workers, 1)} "
+        f"worker(s); shaping cache {hits} hits, {misses} misses."
+    )
+
+
+def normalize_report_spec(spec) -> dict:
+    """Validate one report definition and fill in its defaults."""
+    name = str(spec.get("name", "")) if isinstance(spec, dict) else ""
+    if not re.fullmatch(r"\w+", name) or name == "raw":
+        raise RuntimeError(
+            f"Each report needs a 'name' of letters, digits or _ other than 'raw': {spec!r}"
+        )
+    filters = spec.get("filters") or {}
+    for column, condition in filters.items():
+        if (
+            not isinstance(condition, dict)
+            or not condition
+            or set(condition) - REPORT_FILTER_OPERATORS
+        ):
+            raise RuntimeError(
+                f"Report {name!r}: filter on {column} must use "
+                f"{' / '.join(sorted(REPORT_FILTER_OPERATORS))}."
+            )
+    palette = spec.get("palette", "green")
+    if isinstance(palette, str):
+        if palette not in REPORT_PALETTES:
+            raise RuntimeError(
+                f"Report {name!r}: palette must be one of {', '.join(REPORT_PALETTES)} "
+                "or a [header, stripe] colour pair."
+            )
+        palette = REPORT_PALETTES[palette]
+    sort = spec.get("sort") or []
+    title = spec.get("title") or name
+    return {
+        "name": name,
+        "title": title,
+        "file": spec.get("file") or title,
+        "filters": filters,
+        "columns": list(spec.get("columns") or REPORT_COLUMNS),
+        "sort": [sort] if isinstance(sort, str) else list(sort),
+        "palette": list(palette),
+    }
+
+
+def load_report_specs(path: Path | None = None) -> list[dict]:
+    """Reports from ``path`` (default: reports.json next to main.py, if present).
+
+    The file holds a list of reports, or ``{"reports": [...]}``; ``.yaml``
+    files are read with PyYAML. Without a file DEFAULT_REPORT_SPECS is used.
+    """
+    if path is None:
+        path = SCRIPT_DIR / REPORT_SPEC_NAME
+        if not path.exists():
+            return [normalize_report_spec(spec) for spec in DEFAULT_REPORT_SPECS]
+    text = Path(path).read_text(encoding="utf-8")
+    if Path(path).suffix.lower() in {".yaml", ".yml"}:
+        ensure_packages({"PyYAML": "yaml"})
+        data = importlib.import_module("yaml").safe_load(text)
+    else:
+        data = json.loads(text)
+    if isinstance(data, dict):
+        data = data.get("reports")
+    if not isinstance(data, list) or not data:
+        raise RuntimeError(f"{path} must list at least one report.")
+    specs = [normalize_report_spec(spec) for spec in data]
+    names = [spec["name"] for spec in specs]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise RuntimeError(f"Duplicate report names in {path}: {', '.join(duplicates)}")
+    return specs
+
+
+def filter_text(value) -> str:
+    return "" if is_missing(value) else str(value).strip()
+
+
+def filter_matches(operator: str, text: str, expected) -> bool:
+    alternatives = expected if isinstance(expected, list) else [expected]
+    alternatives = [str(item).strip() for item in alternatives]
+    if operator == "equals":
+        return text in alternatives
+    return any(item in text for item in alternatives)
+
+
+def row_matches_report(row: dict, spec: dict) -> bool:
+    return all(
+        filter_matches(operator, filter_text(row.get(column)), expected)
+        for column, condition in spec["filters"].items()
+        for operator, expected in condition.items()
+    )
+
+
+def evaluate_report_specs(df, specs: list[dict]) -> list:
+    """One DataFrame per spec, built in a single pass over ``df``.
+
+    Every filter column is factorized once and each distinct condition is
+    evaluated on that column's unique values only, then mapped back to the
+    rows; the reports a row belongs to are kept as one boolean column per
+    spec. Specs sharing a sort key share one sort of the rows any of them
+    keeps, and each report is cut from that order with its column.
+    """
+    df = df.reset_index(drop=True)
+    factorized: dict[str, tuple] = {}
+    conditions: dict[tuple, object] = {}
+    everything = np.ones(len(df), dtype=bool)
+    membership = np.zeros((len(df), len(specs)), dtype=bool)
+    for spec_index, spec in enumerate(specs):
+        mask = everything
+        for column, condition in spec["filters"].items():
+            if column not in df.columns:
+                raise RuntimeError(
+                    f"Report {spec['name']!r} filters on {column}, which is not in the data."
+                )
+            if column not in factorized:
+                codes, uniques = pd.factorize(df[column], use_na_sentinel=False)
+                factorized[column] = (codes, [filter_text(value) for value in uniques])
+            codes, texts = factorized[column]
+            for operator, expected in condition.items():
+                key = (column, operator, json.dumps(expected, ensure_ascii=False))
+                if key not in conditions:
+                    hits = [filter_matches(operator, text, expected) for text in texts]
+                    conditions[key] = np.array(hits, dtype=bool)[codes]
+                mask = mask & conditions[key]
+        membership[:, spec_index] = mask
+
+    by_sort: dict[tuple, list[int]] = {}
+    for spec_index, spec in enumerate(specs):
+        sort_columns = tuple(col for col in spec["sort"] if col in df.columns)
+        by_sort.setdefault(sort_columns, []).append(spec_index)
+
+    results: list = [None] * len(specs)
+    for sort_columns, spec_indexes in by_sort.items():
+        positions = df.index[membership[:, spec_indexes].any(axis=1)]
+        if sort_columns:
+            positions = (
+                df.loc[positions, list(sort_columns)]
+                .sort_values(by=list(sort_columns), kind="stable", key=persian_collation_keys)
+                .index
+            )
+        member = membership[positions.to_numpy()]
+        for spec_index in spec_indexes:
+            columns = [col for col in specs[spec_index]["columns"] if col in df.columns]
+            rows = positions[member[:, spec_index]]
+            results[spec_index] = df.loc[rows, columns].fillna("").reset_index(drop=True)
+    return results
 
 
 def postprocess_excel_to_pdfs(
     source_excel: Path,
-) -> tuple[Path, Path, Path, Path, int, int]:
-    df = pd.read_excel(source_excel)
+    pdf_workers: int | None = None,
+    pdf_layout: str = "planned",
+    excel: bool = True,
+    report_specs: list[dict] | None = None,
+) -> list[dict]:
+    """Rebuild the reports from an existing raw export (``--from-excel``)."""
+    load_reporting()
+    return postprocess_dataframe_to_pdfs(
+        pd.read_excel(source_excel), pdf_workers, pdf_layout, excel, report_specs
+    )
 
+
+def postprocess_dataframe_to_pdfs(
+    df,
+    pdf_workers: int | None = None,
+    pdf_layout: str = "planned",
+    excel: bool = True,
+    report_specs: list[dict] | None = None,
+) -> list[dict]:
+    """Build, store and render every report of ``report_specs``.
+
+    Returns one dict per report with its ``name``, ``title``, ``rows``,
+    ``list`` (the xlsx view, or the dataset when ``excel`` is off) and ``pdf``.
+    """
+    load_reporting()
     existing = [col for col in MEANINGFUL_COLUMNS if col in df.columns]
     if len(existing) < 16:
         raise RuntimeError(
             "Input Excel does not look like expected course export columns."
         )
-    df = df[existing].copy()
-
-    if "دانشکده" not in df.columns or "سطح ارائه" not in df.columns:
-        raise RuntimeError("Required columns دانشکده or سطح ارائه are missing.")
-
-    filtered = df[df["دانشکده"].astype(str).str.contains("143", na=False)].copy()
-    group_df = filtered[
-        filtered["سطح ارائه"].astype(str).str.strip() == GROUP_LEVEL_TEXT
-    ].copy()
-    faculty_df = filtered[
-        filtered["سطح ارائه"].astype(str).str.strip() == FACULTY_LEVEL_TEXT
-    ].copy()
-
-    base_cols = [
-        "كد درس",
-        "نام درس",
-        "نوع درس",
-        "تعداد واحد نظري",
-        "تعداد واحد عملي",
-        "كد ارائه کلاس درس",
-        "نام كلاس درس",
-        "زمانبندي تشکيل کلاس",
-        "استاد",
-        "ساير اساتيد",
-        "حداكثر ظرفيت",
-        "تعداد ثبت نامي تاکنون",
-        "زمان امتحان",
-        "مكان برگزاري",
-        "مقطع ارائه درس",
-        "نوع ارائه",
-    ]
-    keep_after_drop = [
-        col
-        for col in base_cols
-        if col not in {"ساير اساتيد", "تعداد ثبت نامي تاکنون", "نوع ارائه"}
-    ]
-
-    group_df = group_df[[c for c in keep_after_drop if c in group_df.columns]].copy()
-    faculty_df = faculty_df[
-        [c for c in keep_after_drop if c in faculty_df.columns]
-    ].copy()
-
-    if "نام درس" in group_df.columns:
-        group_df = group_df.sort_values(
-            by="نام درس", kind="stable", key=lambda s: s.map(persian_sort_key)
+    df = df[existing]
+    specs = report_specs or load_report_specs()
+
+    reports = []
+    pdf_jobs = []
+    for spec, report_df in zip(specs, evaluate_report_specs(df, specs)):
+        list_path = write_dataset(spec["name"], report_df)
+        if excel:
+            list_path = write_excel_view(report_df, OUTPUT_DIR / f"{spec['file']}.xlsx")
+        pdf_path = OUTPUT_DIR / f"{spec['file']}.pdf"
+        reports.append(
+            {
+                "name": spec["name"],
+                "title": spec["title"],
+                "rows": len(report_df),
+                "list": list_path,
+                "pdf": pdf_path,
+            }
         )
-    if "نام درس" in faculty_df.columns:
-        faculty_df = faculty_df.sort_values(
-            by="نام درس", kind="stable", key=lambda s: s.map(persian_sort_key)
+        pdf_jobs.append(
+            {
+                "df": reverse_dataframe_columns(report_df),
+                "path": pdf_path,
+                "title": spec["title"],
+                "palette": tuple(spec["palette"]),
+            }
         )
 
-    group_df = group_df.fillna("").reset_index(drop=True)
-    faculty_df = faculty_df.fillna("").reset_index(drop=True)
-
-    group_df = reverse_dataframe_columns(group_df)
-    faculty_df = reverse_dataframe_columns(faculty_df)
-
-    font_name = register_font()
-    out_dir = SCRIPT_DIR
-    group_excel = out_dir / SPECIALIZED_EXCEL_NAME
-    faculty_excel = out_dir / GENERAL_EXCEL_NAME
-    group_pdf = out_dir / "لیست دروس تخصصی.pdf"
-    faculty_pdf = out_dir / "لیست دروس عمومی.pdf"
-
-    group_df.to_excel(group_excel, index=False)
-    faculty_df.to_excel(faculty_excel, index=False)
-
-    green_header = colors.HexColor("#14532d")
-    green_stripe = colors.HexColor("#dcfce7")
-    blue_header = colors.HexColor("#1e3a8a")
-    blue_stripe = colors.HexColor("#dbeafe")
-    dark_gray_grid = colors.HexColor("#374151")
-
-    dataframe_to_pdf(
-        group_df,
-        group_pdf,
-        "لیست دروس تخصصی",
-        font_name,
-        green_header,
-        green_stripe,
-        dark_gray_grid,
-    )
-    dataframe_to_pdf(
-        faculty_df,
-        faculty_pdf,
-        "لیست دروس عمومی",
-        font_name,
-        blue_header,
-        blue_stripe,
-        dark_gray_grid,
+    render_reports(pdf_jobs, workers=pdf_workers, layout=pdf_layout)
+    return reports
+
+
+def safe_file_name(text: str) -> str:
+    name = re.sub(r'[\\/:*?"<>|\x00-\x1f]+', "-", str(text)).strip(" .-")
+    return name[:120] or "-"
+
+
+def partition_hash(df, *extra) -> str:
+    """Content hash of one fan-out partition plus anything shaping its files."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([list(df.columns), *extra], ensure_ascii=False).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def render_fanout_partition(
+    df,
+    excel_path: Path | None,
+    pdf_path: Path,
+    title: str,
+    palette: tuple[str, str],
+    layout: str,
+) -> dict:
+    """Process-pool entry point: the Excel view and PDF of one partition."""
+    load_reporting()
+    pdf_path.parent.mkdir(parents=True, exist_ok=True)
+    if excel_path is not None:
+        write_excel_view(df, excel_path)
+    df = reverse_dataframe_columns(df)
+    report_layout = {}
+    if layout in {"planned", "fixed"} and len(df.columns):
+        col_widths, wrap_chars = plan_column_widths(df, worker_font())
+        report_layout = {
+            "col_widths": col_widths,
+            "wrap_chars": wrap_chars,
+            "fixed_row_heights": layout == "fixed",
+        }
+    return render_pdf_part(df, pdf_path, title, palette, True, report_layout)
+
+
+def fanout_partitions(df, levels: list[str], report_columns: list[str]):
+    """``(key, title, palette, frame)`` per unit and faculty/group.
+
+    The table is cleaned and sorted by course name once; groupby keeps that
+    order inside every partition.
+    """
+    keys = [FANOUT_LEVELS[level] for level in levels]
+    missing = [col for col in keys if col not in df.columns]
+    if missing:
+        raise RuntimeError(f"Cannot fan out: column(s) {', '.join(missing)} missing.")
+    unit = ["واحد"] if "واحد" in df.columns else []
+    columns = [col for col in report_columns if col in df.columns]
+    source = df[list(dict.fromkeys(columns + keys + unit))].astype(object).fillna("")
+    if "نام درس" in source.columns:
+        source = source.sort_values(by="نام درس", kind="stable", key=persian_collation_keys)
+
+    for level, key in zip(levels, keys):
+        palette = REPORT_PALETTES["green" if level == "faculty" else "blue"]
+        for values, part in source.groupby(unit + [key], sort=True):
+            values = values if isinstance(values, tuple) else (values,)
+            name = str(values[-1]).strip() or "-"
+            unit_name = str(values[0]).strip() if unit else ""
+            folder = Path(safe_file_name(unit_name)) if unit else Path()
+            title = f"{key}: {name}" + (f" ({unit_name})" if unit_name else "")
+            yield (
+                str(folder / key / safe_file_name(name)),
+                title,
+                palette,
+                part[columns].reset_index(drop=True),
+            )
+
+
+def fanout_reports(
+    df,
+    levels: list[str] | None = None,
+    workers: int | None = None,
+    layout: str = "planned",
+    excel: bool = True,
+    force: bool = False,
+) -> dict:
+    """Excel + PDF per faculty and per group of every unit, on a process pool.
+
+    Partitions whose content hash matches the previous run's are skipped, and
+    files of partitions that no longer exist are removed. At most two tasks
+    per worker are queued at a time, so only a bounded number of partitions
+    is pickled and in flight.
+    """
+    load_reporting()
+    started = time.perf_counter()
+    out_dir = OUTPUT_DIR / FANOUT_DIR_NAME
+    manifest_path = out_dir / FANOUT_MANIFEST_NAME
+    previous = {}
+    if manifest_path.exists():
+        try:
+            previous = json.loads(manifest_path.read_text(encoding="utf-8"))
+        except ValueError:
+            previous = {}
+
+    manifest: dict[str, dict] = {}
+    tasks = []
+    skipped = 0
+    for key, title, palette, part in fanout_partitions(
+        df, levels or list(FANOUT_LEVELS), REPORT_COLUMNS
+    ):
+        digest = partition_hash(part, title, palette, layout, excel)
+        pdf_path = out_dir / f"{key}.pdf"
+        excel_path = out_dir / f"{key}.xlsx" if excel else None
+        manifest[key] = {"hash": digest, "rows": len(part)}
+        outputs = [pdf_path] + ([excel_path] if excel_path else [])
+        if (
+            not force
+            and previous.get(key, {}).get("hash") == digest
+            and all(path.exists() for path in outputs)
+        ):
+            skipped += 1
+            continue
+        tasks.append((key, (part, excel_path, pdf_path, title, palette, layout)))
+    partitioned = time.perf_counter()
+    print(
+        f"Fan-out: {len(manifest)} partitions ({skipped} unchanged) "
+        f"in {partitioned - started:.1f} s; rendering {len(tasks)}."
     )
 
-    return (
-        group_excel,
-        faculty_excel,
-        group_pdf,
-        faculty_pdf,
-        len(group_df),
-        len(faculty_df),
+    done = rows_done = pages = 0
+
+    def report_progress(key: str, result: dict) -> None:
+        nonlocal done, rows_done, pages
+        done += 1
+        rows_done += manifest[key]["rows"]
+        pages += result["pages"]
+        elapsed = max(time.perf_counter() - partitioned, 1e-9)
+        print(
+            f"[{done}/{len(tasks)}] {key} ({manifest[key]['rows']} rows, "
+            f"{result['pages']} pages)  {done / elapsed:.1f} reports/s, "
+            f"{rows_done / elapsed:.0f} rows/s"
+        )
+
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    pending = list(reversed(tasks))
+    running: dict = {}
+    if workers > 1:
+        try:
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            ) as pool:
+                while pending or running:
+                    while pending and len(running) < workers * 2:
+                        task = pending.pop()
+                        running[pool.submit(render_fanout_partition, *task[1])] = task
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        key = running[future][0]
+                        result = future.result()
+                        del running[future]
+                        report_progress(key, result)
+        except (OSError, BrokenProcessPool) as exc:
+            print(f"Fan-out worker pool unavailable ({exc}); rendering in-process.")
+            pending.extend(running.values())
+    while pending:
+        key, args = pending.pop()
+        report_progress(key, render_fanout_partition(*args))
+
+    removed = remove_stale_partitions(out_dir, set(previous) - set(manifest))
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path.write_text(
+        json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8"
+    )
+    total = time.perf_counter() - started
+    print(
+        f"Fan-out done in {total:.1f} s: {len(tasks)} rendered ({pages} pages, "
+        f"{rows_done} rows), {skipped} unchanged, {removed} stale file(s) removed, "
+        f"{max(workers, 1)} worker(s). Files in {out_dir}"
     )
+    return {
+        "partitions": len(manifest),
+        "rendered": len(tasks),
+        "skipped": skipped,
+        "removed": removed,
+        "seconds": total,
+    }
 
 
+def remove_stale_partitions(out_dir: Path, keys: set[str]) -> int:
+    """Delete the files of partitions that are gone, and folders left empty."""
+    removed = 0
+    for key in sorted(keys):
+        if not (out_dir / key).resolve().is_relative_to(out_dir.resolve()):
+            continue
+        for suffix in (".pdf", ".xlsx"):
+            path = out_dir / f"{key}{suffix}"
+            if path.exists():
+                path.unlink()
+                removed += 1
+        folder = (out_dir / key).parent
+        while folder != out_dir and folder.is_dir() and not any(folder.iterdir()):
+            folder.rmdir()
+            folder = folder.parent
+    return removed
+
+
+# Returns { headers, rows, pageInfo, layout } where rows are arrays in header
+# order. Pass the previous call's layout back in to skip the header search
+# when the results table is still in the same place.
 EXTRACT_TABLE_JS = r"""
-() => {
+(cachedLayout) => {
     const clean = (txt) => (txt || '').replace(/\u00a0/g, ' ').replace(/\s+/g, ' ').trim();
     const norm = (s) => clean(s).replace(/ي/g, 'ی').replace(/ك/g, 'ک');
+    const cellText = (c) => c.innerText || c.textContent || '';
 
     const meaningful = [
         'كد درس','نام درس','نوع درس','تعداد واحد نظري','تعداد واحد عملي','كد ارائه کلاس درس',
@@ -525,70 +1406,97 @@ EXTRACT_TABLE_JS = r"""
         'گروه آموزشی','دانشکده','واحد','استان'
     ];
     const meaningfulNorm = meaningful.map(norm);
+    const meaningfulSet = new Set(meaningfulNorm);
+
+    const allRows = document.getElementsByTagName('tr');
 
-    let best = null;
-    const tables = [...document.querySelectorAll('table')];
-    for (const table of tables) {
-        const rows = [...table.querySelectorAll('tr')];
-        for (const row of rows) {
-            const cells = [...row.querySelectorAll('th,td')].map((c) => norm(c.innerText || c.textContent || ''));
-            if (cells.length < 12) continue;
-            const matchCount = meaningfulNorm.filter((h) => cells.includes(h)).length;
-            if (matchCount < 10) continue;
-            const score = matchCount * 100 - Math.abs(cells.length - 23);
-            if (!best || score > best.score) {
-                best = { table, row, cells, score };
+    const fromCache = () => {
+        if (!cachedLayout) return null;
+        const row = allRows[cachedLayout.rowIndex];
+        if (!row || row.cells.length !== cachedLayout.cellCount) return null;
+        for (let c = 0; c < cachedLayout.columnIndexes.length; c++) {
+            const cell = row.cells[cachedLayout.columnIndexes[c]];
+            if (!cell || norm(cellText(cell)) !== cachedLayout.headersNorm[c]) return null;
+        }
+        return { row, layout: cachedLayout };
+    };
+
+    const scan = () => {
+        let best = null;
+        for (let r = 0; r < allRows.length; r++) {
+            const row = allRows[r];
+            if (row.cells.length < 12) continue;
+            const cells = [...row.cells].map((c) => norm(cellText(c)));
+            const found = new Set();
+            for (const cell of cells) {
+                if (meaningfulSet.has(cell)) found.add(cell);
             }
+            if (found.size < 10) continue;
+            const score = found.size * 100 - Math.abs(cells.length - 23);
+            if (!best || score > best.score) best = { row, rowIndex: r, cells, score };
         }
-    }
-
-    if (!best) return { headers: [], rows: [], pageInfo: '' };
-
-    const rawHeadersNorm = best.cells;
-    const rawHeadersText = [...best.row.querySelectorAll('th,td')].map((c) => clean(c.innerText || c.textContent || ''));
-    const indexMap = new Map();
-    for (let i = 0; i < rawHeadersNorm.length; i++) {
-        if (!indexMap.has(rawHeadersNorm[i])) indexMap.set(rawHeadersNorm[i], i);
-    }
+        if (!best) return null;
 
-    const headers = [];
-    const headerIndexes = [];
-    for (let i = 0; i < meaningfulNorm.length; i++) {
-        const n = meaningfulNorm[i];
-        if (indexMap.has(n)) {
-            headerIndexes.push(indexMap.get(n));
-            headers.push(rawHeadersText[indexMap.get(n)] || meaningful[i]);
+        const indexMap = new Map();
+        for (let i = 0; i < best.cells.length; i++) {
+            if (!indexMap.has(best.cells[i])) indexMap.set(best.cells[i], i);
         }
-    }
-
-    if (headers.length < 10) return { headers: [], rows: [], pageInfo: '' };
-
+        const headers = [];
+        const headersNorm = [];
+        const columnIndexes = [];
+        for (let i = 0; i < meaningfulNorm.length; i++) {
+            const idx = indexMap.get(meaningfulNorm[i]);
+            if (idx === undefined) continue;
+            columnIndexes.push(idx);
+            headersNorm.push(meaningfulNorm[i]);
+            headers.push(clean(cellText(best.row.cells[idx])) || meaningful[i]);
+        }
+        if (headers.length < 10) return null;
+        return {
+            row: best.row,
+            layout: {
+                rowIndex: best.rowIndex,
+                cellCount: best.row.cells.length,
+                columnIndexes,
+                headers,
+                headersNorm,
+            },
+        };
+    };
+
+    const bodyText = clean(document.body ? document.body.textContent : '');
+    const pageInfoMatch = bodyText.match(/نتايج\s*جستجو\s*\(\s*ركورد\s*\d+\s*تا\s*\d+\s*از\s*\d+\s*ركورد\s*\)/);
+    const pageInfo = pageInfoMatch ? pageInfoMatch[0] : '';
+
+    const located = fromCache() || scan();
+    if (!located) return { headers: [], rows: [], pageInfo, layout: null };
+
+    const { row: headerRow, layout } = located;
+    const table = headerRow.closest('table');
+    const tableRows = table ? table.rows : [];
+    const columnIndexes = layout.columnIndexes;
     const dataRows = [];
-    const allRows = [...best.table.querySelectorAll('tr')];
-    const headerPos = allRows.indexOf(best.row);
-
-    for (let i = headerPos + 1; i < allRows.length; i++) {
-        const tr = allRows[i];
-        const cellsRaw = [...tr.querySelectorAll('td')].map((c) => clean(c.innerText || c.textContent || ''));
-        if (cellsRaw.some((v) => /نتايج\s*جستجو|کلیه\s*حقوق/i.test(v))) continue;
+    let started = false;
+    for (const tr of tableRows) {
+        if (!started) {
+            started = tr === headerRow;
+            continue;
+        }
+        const cells = tr.cells;
+        if (/نتايج\s*جستجو|کلیه\s*حقوق/.test(tr.textContent || '')) continue;
 
-        const obj = {};
+        const values = new Array(columnIndexes.length);
         let nonEmpty = 0;
-        for (let c = 0; c < headerIndexes.length; c++) {
-            const idx = headerIndexes[c];
-            const key = headers[c];
-            const value = idx < cellsRaw.length ? (cellsRaw[idx] || '') : '';
-            obj[key] = value;
+        for (let c = 0; c < columnIndexes.length; c++) {
+            const cell = cells[columnIndexes[c]];
+            const value = cell ? clean(cellText(cell)) : '';
+            values[c] = value;
             if (value) nonEmpty += 1;
         }
-        if (nonEmpty >= 4) dataRows.push(obj);
+        if (nonEmpty >= 4) dataRows.push(values);
     }
 
-	const bodyText = clean(document.body ? document.body.innerText : '');
-	const pageInfoMatch = bodyText.match(/نتايج\s*جستجو\s*\(\s*ركورد\s*\d+\s*تا\s*\d+\s*از\s*\d+\s*ركورد\s*\)/);
-	const pageInfo = pageInfoMatch ? pageInfoMatch[0] : '';
-
-	return { headers, rows: dataRows, pageInfo };
+    return { headers: layout.headers, rows: dataRows, pageInfo, layout };
 }
 """
 
@@ -624,57 +1532,349 @@ CLICK_NEXT_PAGE_JS = r"""
 """
 
 
-def wait_for_login(page) -> None:
-    safe_goto(page, "https://eserv.iau.ir")
-    print("\nLogin in the opened Chrome window, then press Enter here...")
-    input()
+SEARCH_CONTROLS_JS = r"""
+() => {
+    const submit = document.querySelector('#submitBtn');
+    const rowCount = document.querySelector("select[name='parameter(rowCount)']");
+    const hasCourseSearchTitle = (document.body?.innerText || '').includes('جستجوي كلاس درس');
+    return !!submit || !!rowCount || hasCourseSearchTitle;
+}
+"""
 
 
-def safe_goto(page, url: str, timeout_ms: int = 45000) -> None:
-    try:
-        page.goto(url, wait_until="domcontentloaded", timeout=timeout_ms)
-        return
-    except PlaywrightError as exc:
-        message = str(exc)
-        interrupted = "interrupted by another navigation" in message
-        same_target = url in message or url.rstrip("/") in (page.url or "").rstrip("/")
-        if interrupted and same_target:
-            try:
-                page.wait_for_load_state("domcontentloaded", timeout=timeout_ms)
-            except PlaywrightTimeoutError:
-                pass
-            return
-        raise
+# Search page signals used as wait conditions: the form's controls (or its
+# URL) are present, and the result banner reports 100 rows per page.
+SEARCH_FORM_READY_JS = r"""
+() => {
+    const url = (location.href || '').toLowerCase();
+    if (url.includes('courseclass') || url.includes('psearchaction.do')) return true;
+    if (document.querySelector("#submitBtn, select[name='parameter(rowCount)'], input[value='جستجو']")) return true;
+    if ([...document.querySelectorAll('button')].some((b) => (b.textContent || '').includes('جستجو'))) return true;
+    return (document.body?.innerText || '').includes('جستجوي كلاس درس');
+}
+"""
 
 
-def is_session_expired(page) -> bool:
+ROW_COUNT_100_JS = r"""
+() => /ركورد\s*\d+\s*تا\s*100\s*از/.test(document.body ? document.body.textContent : '')
+"""
+
+
+RESULT_SUMMARY_JS = r"""
+() => {
+    const t = (document.body?.innerText || '');
+    const m = t.match(/نتايج\s*جستجو\s*\([^\)]*\)/);
+    return m ? m[0] : '';
+}
+"""
+
+
+CLICK_SEARCH_JS = r"""
+() => {
+    const btn = document.querySelector('#submitBtn');
+    if (btn) { btn.click(); return true; }
+    const byValue = document.querySelector("input[value='جستجو']");
+    if (byValue) { byValue.click(); return true; }
+    return false;
+}
+"""
+
+
+FORCE_ROW_COUNT_100_JS = r"""
+() => {
+    const select = document.querySelector("select[name='parameter(rowCount)']");
+    if (select) {
+        select.value = '100';
+        select.dispatchEvent(new Event('change', { bubbles: true }));
+    }
+}
+"""
+
+
+# Resolves once the result banner differs from the previous page and the
+# results table holds as many data rows as the banner announces.
+PAGE_READY_JS = r"""
+(previousInfo) => {
+	const clean = (txt) => (txt || '').replace(/\u00a0/g, ' ').replace(/\s+/g, ' ').trim();
+	const text = clean(document.body ? document.body.textContent : '');
+	const match = text.match(/نتايج\s*جستجو\s*\(\s*ركورد\s*(\d+)\s*تا\s*(\d+)\s*از\s*\d+\s*ركورد\s*\)/);
+	if (!match) return false;
+	if (previousInfo && match[0] === previousInfo) return false;
+	const expected = Number(match[2]) - Number(match[1]) + 1;
+	if (!(expected > 0)) return true;
+	let rowCount = 0;
+	for (const tr of document.querySelectorAll('tr')) {
+		if (tr.cells.length >= 12) rowCount += 1;
+	}
+	return rowCount - 1 >= expected;
+}
+"""
+
+
+class WaitStats:
+    """Time spent blocked on the browser, per kind of wait, against wall time.
+
+    ``reset()`` starts the clock (after login, so the user's typing is not
+    counted); ``summary()`` splits the elapsed time into waiting and working.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self.lock:
+            self.started = time.perf_counter()
+            self.waits: dict[str, list] = {}
+
+    @contextmanager
+    def waiting(self, label: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                entry = self.waits.setdefault(label, [0, 0.0])
+                entry[0] += 1
+                entry[1] += elapsed
+
+    def summary(self) -> str:
+        with self.lock:
+            total = time.perf_counter() - self.started
+            waits = sorted(self.waits.items(), key=lambda item: -item[1][1])
+        waited = sum(seconds for _, (_, seconds) in waits)
+        detail = ", ".join(
+            f"{label} {seconds:.1f} s/{count}x" for label, (count, seconds) in waits
+        )
+        return (
+            f"Browser waits: {waited:.1f} s of {total:.1f} s"
+            f"{f' ({detail})' if detail else ''}; {max(total - waited, 0.0):.1f} s working."
+        )
+
+
+WAIT_STATS = WaitStats()
+
+
+class Ask:
+    """Yielded by navigation steps: show ``message`` and wait for Enter."""
+
+    def __init__(self, message: str) -> None:
+        self.message = message
+
+
+class SessionExpiredError(RuntimeError):
+    """The site logged the session out where nobody is there to log in again."""
+
+
+class PageRows:
+    """Yielded by ``scrape_steps`` for every result page not collected yet.
+
+    The driver records the page and sends back False to stop the walk.
+    """
+
+    def __init__(
+        self, page_info: str, extracted: dict, number: int, latency: float
+    ) -> None:
+        self.page_info = page_info
+        self.extracted = extracted
+        self.number = number
+        self.latency = latency
+
+
+def run_steps(steps, on_rows=None):
+    """Run navigation ``steps`` on the sync Playwright API and return their result.
+
+    The ``*_steps`` generators below are the navigation of both engines. They
+    yield every Playwright call and get its result sent back: with the sync
+    API the call has already run, so the yielded value is the result, while
+    ``async_engine.run_steps`` awaits it. ``Ask`` prompts on the terminal and
+    ``PageRows`` goes to ``on_rows``.
+    """
+    try:
+        request = next(steps)
+        while True:
+            if isinstance(request, Ask):
+                print(request.message)
+                input()
+                request = steps.send(None)
+            elif isinstance(request, PageRows):
+                request = steps.send(True if on_rows is None else on_rows(request))
+            else:
+                request = steps.send(request)
+    except StopIteration as stop:
+        return stop.value
+
+
+def pause_steps(page, ms: float, label: str = "fixed sleep"):
+    """``page.wait_for_timeout`` that is counted in WAIT_STATS."""
+    with WAIT_STATS.waiting(label):
+        yield page.wait_for_timeout(ms)
+
+
+def pause(page, ms: float, label: str = "fixed sleep") -> None:
+    run_steps(pause_steps(page, ms, label))
+
+
+def wait_for_condition_steps(
+    page, script: str, arg=None, timeout_ms: int = 15000, label: str = "condition"
+):
+    """Wait until ``script`` returns truthy in the page, re-checking on DOM changes.
+
+    Clicks here often submit a form, so the wait may be torn down by the
+    navigation; it is re-armed on the new document until the deadline, after
+    a pause that grows with each failure. The Playwright error is raised once
+    CONDITION_RETRY_LIMIT attempts have failed.
+    """
+    deadline = time.time() + (timeout_ms / 1000)
+    failures = 0
+    with WAIT_STATS.waiting(label):
+        while True:
+            remaining_ms = int((deadline - time.time()) * 1000)
+            if remaining_ms <= 0:
+                return False
+            try:
+                yield page.wait_for_function(
+                    script, arg=arg, polling="mutation", timeout=remaining_ms
+                )
+                return True
+            except PlaywrightTimeoutError:
+                return False
+            except PlaywrightError:
+                failures += 1
+                if failures >= CONDITION_RETRY_LIMIT:
+                    raise
+            yield page.wait_for_timeout(min(50 * failures, 500, remaining_ms))
+
+
+def wait_for_login_steps(page, session_name: str = ""):
+    yield from safe_goto_steps(page, BASE_URL)
+    label = f" [{session_name}]" if session_name else ""
+    yield Ask(f"\nLogin in the opened Chrome window{label}, then press Enter here...")
+
+
+def wait_for_login(page) -> None:
+    run_steps(wait_for_login_steps(page))
+
+
+class ResourceBlocker:
+    """``context.route`` filter for --lean, counting what it aborts by type."""
+
+    def __init__(self, origin: str = BASE_URL) -> None:
+        self.host = urlsplit(origin).netloc.lower()
+        self.lock = threading.Lock()
+        self.blocked: dict[str, int] = {}
+
+    def should_block(self, request) -> bool:
+        url, resource_type = request.url, request.resource_type
+        if LEAN_ALLOWED_URL_RE.search(url):
+            return False
+        if resource_type in LEAN_BLOCKED_RESOURCE_TYPES or (
+            # Third-party scripts (analytics, widgets) are not needed either.
+            resource_type == "script"
+            and urlsplit(url).netloc.lower() != self.host
+        ):
+            with self.lock:
+                self.blocked[resource_type] = self.blocked.get(resource_type, 0) + 1
+            return True
+        return False
+
+    def handle(self, route):
+        # Returned so that the async API awaits it.
+        if self.should_block(route.request):
+            return route.abort("blockedbyclient")
+        return route.continue_()
+
+    def summary(self) -> str:
+        with self.lock:
+            blocked = sorted(self.blocked.items(), key=lambda item: -item[1])
+        detail = ", ".join(f"{kind} {count}" for kind, count in blocked)
+        return (
+            f"Lean mode blocked {sum(count for _, count in blocked)} requests"
+            f"{f' ({detail})' if detail else ''}."
+        )
+
+
+def open_lean_session_steps(
+    playwright, browser, context, page, blocker: ResourceBlocker
+):
+    """Carry the logged-in session into a headless browser filtered by ``blocker``.
+
+    The login stays headed and unfiltered since the user works in it; its
+    cookies move over through ``storage_state``. Returns the new
+    ``(browser, context, page)``.
+    """
+    if not HEADLESS:
+        storage_state = yield context.storage_state()
+        yield context.close()
+        yield browser.close()
+        browser = yield playwright.chromium.launch(
+            channel=BROWSER_CHANNEL or None, headless=True
+        )
+        context = yield browser.new_context(storage_state=storage_state)
+        page = yield context.new_page()
+    yield context.route("**/*", blocker.handle)
+    return browser, context, page
+
+
+def open_lean_session(playwright, browser, context, page, blocker: ResourceBlocker):
+    return run_steps(
+        open_lean_session_steps(playwright, browser, context, page, blocker)
+    )
+
+
+def safe_goto_steps(page, url: str, timeout_ms: int = 45000):
+    try:
+        yield page.goto(url, wait_until="domcontentloaded", timeout=timeout_ms)
+        return
+    except PlaywrightError as exc:
+        message = str(exc)
+        interrupted = "interrupted by another navigation" in message
+        same_target = url in message or url.rstrip("/") in (page.url or "").rstrip("/")
+        if not (interrupted and same_target):
+            raise
+    try:
+        yield page.wait_for_load_state("domcontentloaded", timeout=timeout_ms)
+    except PlaywrightTimeoutError:
+        pass
+
+
+def is_session_expired_steps(page):
     url = (page.url or "").lower()
     if "loginpage.jsp" in url or "/login" in url:
         return True
     try:
         login_inputs = page.locator("input[type='password'], input[name*='password']")
-        if login_inputs.count() > 0:
+        if (yield login_inputs.count()) > 0:
             return True
     except Exception:
         pass
     return False
 
 
-def get_menu_frame(page, timeout_ms: int = 15000):
-    deadline = time.time() + (timeout_ms / 1000)
-    while time.time() < deadline:
-        for frame in page.frames:
-            frame_url = (frame.url or "").lower()
-            if "cache?a=menu" in frame_url:
-                return frame
-        page.wait_for_timeout(250)
-    return None
+def is_menu_frame(frame) -> bool:
+    return "cache?a=menu" in (frame.url or "").lower()
+
+
+def get_menu_frame_steps(page, timeout_ms: int = 15000):
+    for frame in page.frames:
+        if is_menu_frame(frame):
+            return frame
+    with WAIT_STATS.waiting("menu frame"):
+        try:
+            return (
+                yield page.wait_for_event(
+                    "framenavigated", predicate=is_menu_frame, timeout=timeout_ms
+                )
+            )
+        except PlaywrightTimeoutError:
+            return None
 
 
-def open_course_search_from_menu(page) -> bool:
+def open_course_search_from_menu_steps(page):
     # Retry because menu iframe and items can load asynchronously.
     for _ in range(6):
-        menu_frame = get_menu_frame(page, timeout_ms=4000)
+        menu_frame = yield from get_menu_frame_steps(page, timeout_ms=4000)
         if menu_frame is None:
             continue
 
@@ -682,180 +1882,115 @@ def open_course_search_from_menu(page) -> bool:
             planning_section = menu_frame.get_by_text(
                 "برنامه ريزي آموزشي نيمسال تحصيلي", exact=False
             )
-            if planning_section.count() > 0:
-                planning_section.first.click(timeout=3000)
-                page.wait_for_timeout(500)
+            if (yield planning_section.count()) > 0:
+                yield planning_section.first.click(timeout=3000)
         except Exception:
             pass
 
         try:
+            # Appears once the planning section has expanded.
             course_search = menu_frame.get_by_text(
                 "جستجوي كلاس درسهای ارائه شده", exact=False
-            )
-            if course_search.count() > 0:
-                course_search.first.click(timeout=4000)
-                page.wait_for_timeout(1800)
-                if is_on_course_search_page(page) or wait_for_search_controls(
-                    page, 6000
-                ):
-                    return True
+            ).first
+            with WAIT_STATS.waiting("menu item"):
+                yield course_search.wait_for(state="visible", timeout=3000)
+            yield course_search.click(timeout=4000)
+            if (yield from wait_for_search_controls_steps(page, 8000)):
+                return True
         except Exception:
             pass
 
-        page.wait_for_timeout(600)
-
     return False
 
 
-def is_on_course_search_page(page) -> bool:
+def is_on_course_search_page_steps(page):
     try:
         url = (page.url or "").lower()
         if "courseclass" in url or "psearchaction.do" in url:
             return True
 
-        has_controls = page.evaluate(
-            r"""
-            () => {
-                const submit = document.querySelector('#submitBtn');
-                const rowCount = document.querySelector("select[name='parameter(rowCount)']");
-                const hasCourseSearchTitle = (document.body?.innerText || '').includes('جستجوي كلاس درس');
-                return !!submit || !!rowCount || hasCourseSearchTitle;
-            }
-            """
-        )
+        has_controls = yield page.evaluate(SEARCH_CONTROLS_JS)
         return bool(has_controls)
     except Exception:
         return False
 
 
-def wait_for_search_controls(page, timeout_ms: int) -> bool:
-    deadline = time.time() + (timeout_ms / 1000)
-    while time.time() < deadline:
-        try:
-            if is_on_course_search_page(page):
-                return True
-            if page.locator("#submitBtn").count() > 0:
-                return True
-            if page.locator("button:has-text('جستجو')").count() > 0:
-                return True
-            if page.locator("input[value='جستجو']").count() > 0:
-                return True
-        except Exception:
-            pass
-        page.wait_for_timeout(250)
-    return False
+def wait_for_search_controls_steps(page, timeout_ms: int):
+    return (
+        yield from wait_for_condition_steps(
+            page, SEARCH_FORM_READY_JS, timeout_ms=timeout_ms, label="search form"
+        )
+    )
 
 
-def force_open_course_search(page) -> None:
+def force_open_course_search_steps(page):
     # Prefer dashboard menu navigation (more stable than direct deep-link URL).
-    safe_goto(page, START_URL)
-
-    if open_course_search_from_menu(page):
-        try:
-            page.wait_for_timeout(2000)
-            if is_on_course_search_page(page):
-                return
-            if wait_for_search_controls(page, 12000):
-                return
-            return
-        except PlaywrightTimeoutError:
-            pass
+    yield from safe_goto_steps(page, START_URL)
 
-    try:
-        if is_on_course_search_page(page):
-            return
-        if wait_for_search_controls(page, 5000):
-            return
+    # Both only succeed once the search form is on the page.
+    if (yield from open_course_search_from_menu_steps(page)) or (
+        yield from wait_for_search_controls_steps(page, 5000)
+    ):
         return
-    except PlaywrightTimeoutError:
-        pass
 
     # Fallback if menu route fails.
-    safe_goto(page, TARGET_URL)
+    yield from safe_goto_steps(page, TARGET_URL)
 
-    if open_course_search_from_menu(page):
-        page.wait_for_timeout(1800)
-    if not is_on_course_search_page(page):
+    if (yield from open_course_search_from_menu_steps(page)):
+        return
+    if not (yield from is_on_course_search_page_steps(page)):
         raise RuntimeError(
             "Could not open course search page via menu or fallback URL."
         )
 
 
-def get_result_summary(page) -> str:
+def get_result_summary_steps(page):
     try:
-        summary = page.evaluate(
-            r"""
-            () => {
-                const t = (document.body?.innerText || '');
-                const m = t.match(/نتايج\s*جستجو\s*\([^\)]*\)/);
-                return m ? m[0] : '';
-            }
-            """
-        )
+        summary = yield page.evaluate(RESULT_SUMMARY_JS)
         return (summary or "").strip()
     except Exception:
         return ""
 
 
-def click_search_button(page) -> bool:
+def click_search_button_steps(page):
     for selector in ["#submitBtn", "button:has-text('جستجو')", "input[value='جستجو']"]:
         try:
             loc = page.locator(selector)
-            if loc.count() > 0:
-                loc.first.click()
+            if (yield loc.count()) > 0:
+                yield loc.first.click()
                 return True
         except Exception:
             pass
 
     try:
-        return bool(
-            page.evaluate(
-                r"""
-                () => {
-                    const btn = document.querySelector('#submitBtn');
-                    if (btn) { btn.click(); return true; }
-                    const byValue = document.querySelector("input[value='جستجو']");
-                    if (byValue) { byValue.click(); return true; }
-                    return false;
-                }
-                """
-            )
-        )
+        return bool((yield page.evaluate(CLICK_SEARCH_JS)))
     except Exception:
         return False
 
 
-def ensure_row_count_100(page) -> str:
+def ensure_row_count_100_steps(page):
     last_summary = ""
     for _ in range(5):
         try:
             row_count_select = page.locator("select[name='parameter(rowCount)']")
-            if row_count_select.count() > 0:
-                row_count_select.first.select_option("100")
+            if (yield row_count_select.count()) > 0:
+                yield row_count_select.first.select_option("100")
         except Exception:
             pass
 
-        if not click_search_button(page):
-            page.wait_for_timeout(800)
+        if not (yield from click_search_button_steps(page)):
+            yield from wait_for_search_controls_steps(page, 2000)
             continue
 
-        page.wait_for_timeout(2200)
-        last_summary = get_result_summary(page)
+        yield from wait_for_condition_steps(
+            page, ROW_COUNT_100_JS, timeout_ms=8000, label="rowCount=100"
+        )
+        last_summary = yield from get_result_summary_steps(page)
         if re.search(r"ركورد\s*\d+\s*تا\s*100\s*از", last_summary):
             return last_summary
 
         try:
-            page.evaluate(
-                r"""
-                () => {
-                    const select = document.querySelector("select[name='parameter(rowCount)']");
-                    if (select) {
-                        select.value = '100';
-                        select.dispatchEvent(new Event('change', { bubbles: true }));
-                    }
-                }
-                """
-            )
+            yield page.evaluate(FORCE_ROW_COUNT_100_JS)
         except Exception:
             pass
 
@@ -863,40 +1998,49 @@ def ensure_row_count_100(page) -> str:
 
 
 def set_row_count_100_and_search(page) -> None:
-    ensure_row_count_100(page)
+    run_steps(ensure_row_count_100_steps(page))
 
 
-def wait_for_results(page) -> None:
+def wait_for_results_steps(page, ask_login: bool = True):
+    """Open the course search through the menu and search with 100 rows per page.
+
+    An expired session prompts for a new login, or raises
+    ``SessionExpiredError`` without ``ask_login``.
+    """
     for _ in range(2):
-        force_open_course_search(page)
-        if is_on_course_search_page(page):
+        yield from force_open_course_search_steps(page)
+        if (yield from is_on_course_search_page_steps(page)) or (
+            yield from wait_for_search_controls_steps(page, 1500)
+        ):
             break
-        page.wait_for_timeout(1500)
 
-    if is_session_expired(page):
-        print("Session expired. Please login again, then press Enter...")
-        input()
-        force_open_course_search(page)
+    if (yield from is_session_expired_steps(page)):
+        if not ask_login:
+            raise SessionExpiredError("Session expired; log in again and restart.")
+        yield Ask("Session expired. Please login again, then press Enter...")
+        yield from force_open_course_search_steps(page)
 
-    if not is_on_course_search_page(page):
-        try:
-            if not wait_for_search_controls(page, 30000):
-                raise PlaywrightTimeoutError("Timed out waiting for search controls")
-        except PlaywrightTimeoutError:
-            raise RuntimeError("Could not open course search page (جستجوي كلاس درس).")
-
-    if not is_on_course_search_page(page):
+    if not (yield from is_on_course_search_page_steps(page)) and not (
+        yield from wait_for_search_controls_steps(page, 30000)
+    ):
         raise RuntimeError("Could not open course search page (جستجوي كلاس درس).")
 
-    search_clicked = click_search_button(page)
+    yield from submit_search_steps(page)
+
 
-    if not search_clicked:
+def submit_search_steps(page):
+    """Click جستجو on the open search form and make sure 100 rows are shown."""
+    previous_summary = yield from get_result_summary_steps(page)
+    if not (yield from click_search_button_steps(page)):
         raise RuntimeError("Could not find/click search button (جستجو) on the page.")
 
-    page.wait_for_timeout(2000)
+    yield from wait_for_page_change_steps(page, previous_summary, timeout_ms=15000)
+    yield from search_100_rows_steps(page)
 
-    # Force 100 rows per page and verify.
-    summary = ensure_row_count_100(page)
+
+def search_100_rows_steps(page):
+    """Search with 100 rows per page and verify the result banner."""
+    summary = yield from ensure_row_count_100_steps(page)
 
     print(f"Result summary after rowCount=100: {summary or 'N/A'}")
     if not re.search(r"ركورد\s*\d+\s*تا\s*100\s*از", summary):
@@ -905,64 +2049,194 @@ def wait_for_results(page) -> None:
         )
 
 
-def scrape_all_pages(page) -> list[dict]:
-    collected_rows: list[dict] = []
-    seen_pages: set[str] = set()
-    empty_pages = 0
-    last_page_info = ""
+def wait_for_results(page) -> None:
+    run_steps(wait_for_results_steps(page))
+
+
+def refresh_results_steps(page):
+    """Search again for the next monitor cycle without prompting.
+
+    The results page keeps the search form, so it is re-submitted in place
+    (back on page 1); only a page that lost the form goes back through the
+    menu.
+    """
+    if (yield from is_session_expired_steps(page)):
+        raise SessionExpiredError("Session expired; log in again and restart.")
+    if (yield from is_on_course_search_page_steps(page)):
+        yield from search_100_rows_steps(page)
+    else:
+        yield from wait_for_results_steps(page, ask_login=False)
+
+
+def expected_rows_from_page_info(page_info: str) -> int | None:
+    if not page_info:
+        return None
+    match = re.search(r"ركورد\s*(\d+)\s*تا\s*(\d+)\s*از", page_info)
+    if not match:
+        return None
+    start_num = int(match.group(1))
+    end_num = int(match.group(2))
+    if end_num < start_num:
+        return None
+    return (end_num - start_num) + 1
+
+
+def extract_page_steps(page, layout_cache: dict):
+    extracted = yield page.evaluate(EXTRACT_TABLE_JS, layout_cache.get("layout"))
+    if extracted.get("layout"):
+        layout_cache["layout"] = extracted["layout"]
+    return extracted
+
+
+def rows_as_dicts(extracted: dict) -> list[dict]:
+    headers = extracted.get("headers") or []
+    return [dict(zip(headers, values)) for values in extracted.get("rows") or []]
+
+
+def is_page_complete(extracted: dict, previous_page_info: str = "") -> bool:
+    page_info = (extracted.get("pageInfo") or "").strip()
+    row_count = len(extracted.get("rows") or [])
+    if previous_page_info and page_info == previous_page_info:
+        return False
+    expected_rows = expected_rows_from_page_info(page_info)
+    if expected_rows is not None:
+        return row_count >= expected_rows
+    return row_count > 0
+
+
+def wait_for_page_change_steps(
+    page, previous_page_info: str = "", timeout_ms: int = 35000
+):
+    return (
+        yield from wait_for_condition_steps(
+            page, PAGE_READY_JS, previous_page_info, timeout_ms, label="result page"
+        )
+    )
 
-    def expected_rows_from_page_info(page_info: str) -> int | None:
-        if not page_info:
-            return None
-        match = re.search(r"ركورد\s*(\d+)\s*تا\s*(\d+)\s*از", page_info)
-        if not match:
-            return None
-        start_num = int(match.group(1))
-        end_num = int(match.group(2))
-        if end_num < start_num:
-            return None
-        return (end_num - start_num) + 1
-
-    def extract_with_retry(previous_page_info: str = "") -> dict:
-        best_extracted = {"headers": [], "rows": [], "pageInfo": ""}
-        best_row_count = -1
-        deadline = time.time() + 35
-        while time.time() < deadline:
-            extracted_local = page.evaluate(EXTRACT_TABLE_JS)
-            page_info_local = (extracted_local.get("pageInfo") or "").strip()
-            rows_local = extracted_local.get("rows") or []
-            row_count_local = len(rows_local)
-
-            if row_count_local > best_row_count:
-                best_row_count = row_count_local
-                best_extracted = extracted_local
-
-            if previous_page_info and page_info_local == previous_page_info:
-                page.wait_for_timeout(350)
-                continue
 
-            expected_rows = expected_rows_from_page_info(page_info_local)
+def print_page_latency_summary(latencies: list[float]) -> None:
+    if not latencies:
+        return
+    ordered = sorted(latencies)
+    median = ordered[len(ordered) // 2]
+    print(
+        f"Page latency over {len(ordered)} pages: "
+        f"mean {sum(ordered) / len(ordered) * 1000:.0f} ms, "
+        f"median {median * 1000:.0f} ms, "
+        f"max {ordered[-1] * 1000:.0f} ms, "
+        f"total {sum(ordered):.1f} s"
+    )
+
+
+def extract_with_retry_steps(page, layout_cache: dict, previous_page_info: str = ""):
+    best_extracted = {"headers": [], "rows": [], "pageInfo": "", "layout": None}
+    best_row_count = -1
+    deadline = time.time() + 35
+    while time.time() < deadline:
+        extracted = yield from extract_page_steps(page, layout_cache)
+        row_count = len(extracted.get("rows") or [])
+
+        if row_count > best_row_count:
+            best_row_count = row_count
+            best_extracted = extracted
 
-            if expected_rows is not None:
-                if row_count_local >= expected_rows:
-                    return extracted_local
-            elif row_count_local > 0:
-                return extracted_local
+        if is_page_complete(extracted, previous_page_info):
+            return extracted
 
-            page.wait_for_timeout(350)
+        yield from pause_steps(page, 350, "poll")
 
-        return best_extracted
+    return best_extracted
 
+
+def extract_when_ready_steps(
+    page, layout_cache: dict, previous_page_info: str = "", wait_mode: str = "event"
+):
+    if wait_mode == "event" and (
+        yield from wait_for_page_change_steps(page, previous_page_info)
+    ):
+        try:
+            extracted = yield from extract_page_steps(page, layout_cache)
+            if is_page_complete(extracted, previous_page_info):
+                return extracted
+        except PlaywrightError:
+            pass
+    return (yield from extract_with_retry_steps(page, layout_cache, previous_page_info))
+
+
+def extract_when_ready(
+    page, layout_cache: dict, previous_page_info: str = "", wait_mode: str = "event"
+) -> dict:
+    return run_steps(
+        extract_when_ready_steps(page, layout_cache, previous_page_info, wait_mode)
+    )
+
+
+def record_page(
+    collected_rows: list[dict], checkpoint, page_info: str, rows: list[dict]
+) -> int:
+    if checkpoint is not None:
+        checkpoint.append(page_info, rows)
+        return checkpoint.row_count
+    collected_rows.extend(rows)
+    return len(collected_rows)
+
+
+def scrape_steps(
+    page,
+    wait_mode: str = "event",
+    known_pages: set[str] | None = None,
+    checkpoint=None,
+):
+    """Walk the result pages in the browser by clicking "صفحه بعد".
+
+    Every page whose banner is not in ``known_pages`` (or the checkpoint) is
+    yielded as ``PageRows``; the others are stepped over. A resumed
+    ``checkpoint`` jumps straight to its first missing page, and a new one
+    gets the next-page request template recorded.
+    """
+    seen_pages: set[str] = set()
+    known_pages = set(known_pages or ())
+    empty_pages = 0
+    last_page_info = ""
+    page_latencies: list[float] = []
+    # The results table sits in the same place on every page, so its location
+    # is found once and reused until it stops matching.
+    layout_cache: dict = {}
+    captured: list[tuple[int, dict]] = []
+
+    if checkpoint is not None:
+        known_pages |= checkpoint.known_pages
+        resume_page = checkpoint.first_missing_page()
+        if resume_page and resume_page > 1 and checkpoint.template:
+            if (
+                yield from jump_to_page_steps(
+                    page,
+                    checkpoint.template,
+                    resume_page,
+                    checkpoint.page_size,
+                    layout_cache,
+                )
+            ):
+                print(f"Resumed at result page {resume_page}.")
+            else:
+                print("Could not jump to the first missing page; stepping through.")
+
+    page_started = time.perf_counter()
     while True:
-        if is_session_expired(page):
+        if (yield from is_session_expired_steps(page)):
             print(
                 "Session expired during scraping. Stopping and saving collected rows."
             )
+            if checkpoint is not None:
+                print("Log in again and run with --resume to continue.")
             break
 
-        extracted = extract_with_retry(last_page_info)
+        extracted = yield from extract_when_ready_steps(
+            page, layout_cache, last_page_info, wait_mode
+        )
+        page_latency = time.perf_counter() - page_started
+        page_latencies.append(page_latency)
         page_info = (extracted.get("pageInfo") or "").strip()
-        rows = extracted.get("rows") or []
 
         if page_info and page_info in seen_pages:
             break
@@ -970,95 +2244,1944 @@ def scrape_all_pages(page) -> list[dict]:
             seen_pages.add(page_info)
             last_page_info = page_info
 
-        collected_rows.extend(rows)
-        print(f"Collected rows: {len(collected_rows)}")
-
-        if rows:
-            empty_pages = 0
+        if page_info and page_info in known_pages:
+            print(f"Skipping already collected page: {page_info}")
         else:
-            empty_pages += 1
-            if empty_pages >= 3:
-                raise RuntimeError(
-                    "No rows extracted for 3 consecutive pages. Stopping to avoid bad export."
-                )
+            if extracted.get("rows"):
+                empty_pages = 0
+            else:
+                empty_pages += 1
+                if empty_pages >= 3:
+                    raise RuntimeError(
+                        "No rows extracted for 3 consecutive pages. Stopping to avoid bad export."
+                    )
+
+            found = PageRows(page_info, extracted, len(page_latencies), page_latency)
+            if (yield found) is False:
+                break
 
-        is_disabled = bool(page.evaluate(NEXT_PAGE_DISABLED_JS))
-        if is_disabled:
+        if (yield page.evaluate(NEXT_PAGE_DISABLED_JS)):
             break
 
-        clicked = bool(page.evaluate(CLICK_NEXT_PAGE_JS))
+        page_started = time.perf_counter()
+        bounds = page_info_bounds(page_info)
+        if checkpoint is not None and checkpoint.template is None and bounds:
+            # Record two consecutive next-page requests so a later --resume
+            # can jump straight to a page.
+            next_page = (bounds[0] - 1) // (bounds[1] - bounds[0] + 1) + 2
+            clicked, request = yield from capture_next_page_request_steps(page)
+            if request is not None:
+                if captured and captured[-1][0] != next_page - 1:
+                    captured.clear()
+                captured.append((next_page, request))
+                if len(captured) == 2:
+                    template = build_page_template(
+                        captured[0][1], captured[1][1], base_page=next_page
+                    )
+                    if template is not None:
+                        checkpoint.set_template(template)
+        else:
+            clicked = bool((yield page.evaluate(CLICK_NEXT_PAGE_JS)))
         if not clicked:
             break
 
-        # Wait for next page data to be fully rendered before next extraction pass.
-        page.wait_for_timeout(600)
+        if wait_mode == "poll":
+            # Wait for next page data to be fully rendered before next extraction pass.
+            yield from pause_steps(page, 600, "poll")
+
+    print_page_latency_summary(page_latencies)
+
+
+def scrape_all_pages(
+    page,
+    wait_mode: str = "event",
+    known_pages: set[str] | None = None,
+    checkpoint=None,
+    on_page=None,
+) -> list[dict]:
+    """Walk the result pages in the browser by clicking "صفحه بعد".
+
+    Pages whose banner is in ``known_pages`` are stepped over without
+    collecting their rows again. With a ``checkpoint`` each page is appended
+    to it as soon as it is extracted instead of being kept in memory (the
+    returned list is then empty), and a resumed checkpoint jumps straight to
+    its first missing page. ``on_page(page_info, rows)`` likewise receives
+    each page instead of the returned list and may return False to stop.
+    """
+    collected_rows: list[dict] = []
 
+    def on_rows(found: PageRows):
+        rows = rows_as_dicts(found.extracted)
+        if on_page is not None:
+            return on_page(found.page_info, rows)
+        total_rows = record_page(collected_rows, checkpoint, found.page_info, rows)
+        print(
+            f"Collected rows: {total_rows} "
+            f"(page {found.number} ready in {found.latency * 1000:.0f} ms)"
+        )
+        return True
+
+    run_steps(scrape_steps(page, wait_mode, known_pages, checkpoint), on_rows)
     return collected_rows
 
 
-def save_excel(rows: list[dict]) -> Path:
-    output_path = SCRIPT_DIR / RAW_EXCEL_NAME
+def clean_cell_text(value: str) -> str:
+    return re.sub(r"\s+", " ", value.replace("\xa0", " ")).strip()
+
+
+def norm_cell_text(value: str) -> str:
+    return clean_cell_text(value).replace("ي", "ی").replace("ك", "ک")
+
+
+class ResultsHTMLParser(HTMLParser):
+    """Collects every table row's cell texts, keyed by innermost table."""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.tables: list[list[list[str]]] = []
+        self.text_parts: list[str] = []
+        self._table_stack: list[list[list[str]]] = []
+        self._cell: list[str] | None = None
+        self._cell_stack: list[list[str] | None] = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs) -> None:
+        if tag in ("script", "style"):
+            self._skip_depth += 1
+        elif tag == "table":
+            table: list[list[str]] = []
+            self.tables.append(table)
+            self._table_stack.append(table)
+            self._cell_stack.append(self._cell)
+            self._cell = None
+        elif tag == "tr" and self._table_stack:
+            self._close_cell()
+            self._table_stack[-1].append([])
+        elif tag in ("td", "th") and self._table_stack:
+            self._close_cell()
+            if not self._table_stack[-1]:
+                self._table_stack[-1].append([])
+            self._cell = []
+        elif tag == "br":
+            self._add_text("\n")
+
+    def handle_endtag(self, tag) -> None:
+        if tag in ("script", "style"):
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag == "table" and self._table_stack:
+            self._close_cell()
+            self._table_stack.pop()
+            self._cell = self._cell_stack.pop()
+        elif tag in ("td", "th", "tr"):
+            self._close_cell()
+
+    def handle_data(self, data) -> None:
+        if not self._skip_depth:
+            self._add_text(data)
+
+    def _add_text(self, text: str) -> None:
+        self.text_parts.append(text)
+        if self._cell is not None:
+            self._cell.append(text)
+
+    def _close_cell(self) -> None:
+        if self._cell is not None and self._table_stack and self._table_stack[-1]:
+            self._table_stack[-1][-1].append(clean_cell_text("".join(self._cell)))
+        self._cell = None
+
+
+def parse_results_html(html_text: str) -> dict:
+    """Python counterpart of EXTRACT_TABLE_JS for a raw result page."""
+    parser = ResultsHTMLParser()
+    parser.feed(html_text)
+    parser.close()
+
+    body_text = clean_cell_text(" ".join(parser.text_parts))
+    page_info_match = re.search(
+        r"نتايج\s*جستجو\s*\(\s*ركورد\s*\d+\s*تا\s*\d+\s*از\s*\d+\s*ركورد\s*\)",
+        body_text,
+    )
+    page_info = page_info_match.group(0) if page_info_match else ""
+    empty = {"headers": [], "rows": [], "pageInfo": page_info}
+
+    meaningful_norm = [norm_cell_text(col) for col in MEANINGFUL_COLUMNS]
+    meaningful_set = set(meaningful_norm)
+
+    best = None
+    for table in parser.tables:
+        for row_index, cells in enumerate(table):
+            if len(cells) < 12:
+                continue
+            normed = [norm_cell_text(cell) for cell in cells]
+            found = meaningful_set.intersection(normed)
+            if len(found) < 10:
+                continue
+            score = len(found) * 100 - abs(len(normed) - 23)
+            if best is None or score > best[0]:
+                best = (score, table, row_index, normed)
+    if best is None:
+        return empty
+
+    _, table, header_pos, normed = best
+    index_map: dict[str, int] = {}
+    for index, cell in enumerate(normed):
+        index_map.setdefault(cell, index)
+
+    headers = []
+    column_indexes = []
+    for wanted, wanted_norm in zip(MEANINGFUL_COLUMNS, meaningful_norm):
+        if wanted_norm in index_map:
+            index = index_map[wanted_norm]
+            column_indexes.append(index)
+            headers.append(table[header_pos][index] or wanted)
+    if len(headers) < 10:
+        return empty
+
+    footer_pattern = re.compile(r"نتايج\s*جستجو|کلیه\s*حقوق")
+    rows = []
+    for cells in table[header_pos + 1 :]:
+        if any(footer_pattern.search(cell) for cell in cells):
+            continue
+        values = [cells[index] if index < len(cells) else "" for index in column_indexes]
+        if sum(1 for value in values if value) >= 4:
+            rows.append(values)
+
+    return {"headers": headers, "rows": rows, "pageInfo": page_info}
+
+
+def capture_next_page_request_steps(page, timeout_ms: int = 15000):
+    """Click "صفحه بعد" and record the request the browser sends for it.
+
+    Returns whether the button was clicked and the captured request, if any.
+    """
+    sent = []
+
+    def record(request) -> None:
+        if request.resource_type in {"document", "xhr", "fetch"}:
+            sent.append(request)
+
+    page.on("request", record)
+    try:
+        try:
+            clicked = bool((yield page.evaluate(CLICK_NEXT_PAGE_JS)))
+        except PlaywrightError:
+            return False, None
+        deadline = time.time() + timeout_ms / 1000
+        while clicked and not sent and time.time() < deadline:
+            yield from pause_steps(page, 25, "next-page request")
+    finally:
+        page.remove_listener("request", record)
+    if not sent:
+        return clicked, None
+    request = sent[0]
+    return True, {
+        "url": request.url,
+        "method": request.method,
+        "post_data": request.post_data,
+        "content_type": request.headers.get("content-type", ""),
+    }
+
+
+def capture_next_page_request(
+    page, timeout_ms: int = 15000
+) -> tuple[bool, dict | None]:
+    return run_steps(capture_next_page_request_steps(page, timeout_ms))
+
+
+def request_fields(captured: dict) -> list[str]:
+    if captured["post_data"] is not None:
+        return captured["post_data"].split("&")
+    return urlsplit(captured["url"]).query.split("&")
+
+
+def build_page_template(first: dict, second: dict, base_page: int = 3) -> dict | None:
+    """Work out which form field advances between two next-page requests.
+
+    ``first`` and ``second`` are the requests for pages ``base_page - 1`` and
+    ``base_page``. Fields are kept as raw ``name=value`` strings so the site's
+    own URL encoding is preserved when the request is replayed.
+    """
+    if first["method"] != second["method"]:
+        return None
+    if urlsplit(first["url"])._replace(query="") != urlsplit(second["url"])._replace(
+        query=""
+    ):
+        return None
+
+    first_fields = request_fields(first)
+    second_fields = request_fields(second)
+    if len(first_fields) != len(second_fields):
+        return None
+
+    advancing = []
+    for index, (a, b) in enumerate(zip(first_fields, second_fields)):
+        if a == b:
+            continue
+        name_a, _, value_a = a.partition("=")
+        name_b, _, value_b = b.partition("=")
+        if name_a != name_b or not value_a.isdigit() or not value_b.isdigit():
+            return None
+        step = int(value_b) - int(value_a)
+        if step <= 0:
+            return None
+        advancing.append((index, name_b, int(value_b), step))
+
+    if not advancing:
+        return None
+    return {
+        **second,
+        "fields": second_fields,
+        "advancing": advancing,
+        "base_page": base_page,
+    }
+
+
+def build_page_request(template: dict, page_number: int) -> tuple[str, str | None]:
+    fields = list(template["fields"])
+    offset = page_number - template["base_page"]
+    for index, name, base_value, step in template["advancing"]:
+        fields[index] = f"{name}={base_value + offset * step}"
+    body = "&".join(fields)
+    if template["post_data"] is not None:
+        return template["url"], body
+    return urlsplit(template["url"])._replace(query=body).geturl(), None
+
+
+def fetch_page_http(request_context, template: dict, page_number: int) -> dict:
+    url, body = build_page_request(template, page_number)
+    headers = {}
+    if template["content_type"]:
+        headers["Content-Type"] = template["content_type"]
+    response = request_context.fetch(
+        url, method=template["method"], data=body, headers=headers, timeout=45000
+    )
+    if not response.ok:
+        raise RuntimeError(f"HTTP {response.status} for result page {page_number}")
+    charset_match = re.search(
+        r"charset=([\w-]+)", response.headers.get("content-type", ""), re.I
+    )
+    charset = charset_match.group(1) if charset_match else "utf-8"
+    return parse_results_html(response.body().decode(charset, errors="replace"))
+
+
+def page_info_bounds(page_info: str) -> tuple[int, int, int] | None:
+    match = re.search(r"ركورد\s*(\d+)\s*تا\s*(\d+)\s*از\s*(\d+)", page_info or "")
+    if not match:
+        return None
+    return int(match.group(1)), int(match.group(2)), int(match.group(3))
+
+
+def page_number_of(page_info: str, page_size: int = 0) -> int | None:
+    """1-based page number of a result banner.
+
+    Without ``page_size`` the banner's own range is taken as the page size,
+    which is only right for full pages: the short last page needs the size
+    of the pages before it.
+    """
+    bounds = page_info_bounds(page_info)
+    if bounds is None or bounds[1] < bounds[0]:
+        return None
+    page_size = page_size or bounds[1] - bounds[0] + 1
+    return (bounds[0] - 1) // page_size + 1
+
+
+class ScrapeCheckpoint:
+    """Append-only JSONL record of scraped result pages.
+
+    Every line holds one page (its banner, first row number and rows) and is
+    flushed to disk as soon as the page is extracted. Only a small index of
+    byte offsets is kept in memory, so memory stays flat however many
+    classes are offered while scraping. The export still reads every row
+    back, since the reports sort and filter the whole table. A
+    ``{"template": ...}`` line stores the next-page request so a resumed
+    run can jump straight to the first missing page.
+    """
+
+    def __init__(self, path: Path, resume: bool = False) -> None:
+        self.path = path
+        self.offsets: dict[int, int] = {}
+        self.known_pages: set[str] = set()
+        self.template: dict | None = None
+        self.row_count = 0
+        self.page_size = 0
+        self.total = 0
+        self._lock = threading.Lock()
+        if resume and path.exists():
+            self._load_index()
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(b"")
+        self._handle = path.open("ab")
+
+    def _load_index(self) -> None:
+        valid_size = 0
+        with self.path.open("rb") as handle:
+            while True:
+                offset = handle.tell()
+                line = handle.readline()
+                if not line:
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A crash mid-write leaves a partial last line; drop it.
+                    break
+                if not line.endswith(b"\n"):
+                    break
+                valid_size = handle.tell()
+                if "template" in record:
+                    self.template = record["template"]
+                else:
+                    self._index_page(record["page_info"], offset, len(record["rows"]))
+        with self.path.open("r+b") as handle:
+            handle.truncate(valid_size)
+        if self.offsets:
+            print(
+                f"Checkpoint {self.path.name}: {len(self.offsets)} pages, "
+                f"{self.row_count} rows already collected."
+            )
+
+    def _index_page(self, page_info: str, offset: int, row_count: int) -> None:
+        bounds = page_info_bounds(page_info)
+        if bounds is not None:
+            start = bounds[0]
+            self.page_size = self.page_size or (bounds[1] - bounds[0] + 1)
+            self.total = bounds[2]
+        else:
+            start = 10**12 + len(self.offsets)
+        if start in self.offsets:
+            return
+        self.offsets[start] = offset
+        self.known_pages.add(page_info)
+        self.row_count += row_count
+
+    def _write(self, record: dict) -> int:
+        line = json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n"
+        offset = self._handle.tell()
+        self._handle.write(line)
+        self._handle.flush()
+        os.fsync(self._handle.fileno())
+        return offset
+
+    def append(self, page_info: str, rows: list[dict]) -> None:
+        with self._lock:
+            if page_info and page_info in self.known_pages:
+                return
+            offset = self._write({"page_info": page_info, "rows": rows})
+            self._index_page(page_info, offset, len(rows))
+
+    def set_template(self, template: dict) -> None:
+        with self._lock:
+            self.template = template
+            self._write({"template": template})
+
+    def has_page(self, page_number: int) -> bool:
+        if not self.page_size:
+            return False
+        return (page_number - 1) * self.page_size + 1 in self.offsets
+
+    def first_missing_page(self) -> int | None:
+        if not self.page_size:
+            return 1 if not self.offsets else None
+        last_page = -(-self.total // self.page_size)
+        for page_number in range(1, last_page + 1):
+            if not self.has_page(page_number):
+                return page_number
+        return None
+
+    def iter_rows(self):
+        """Yield every stored row in page order, reading one page at a time."""
+        with self._lock:
+            self._handle.flush()
+            offsets = [self.offsets[start] for start in sorted(self.offsets)]
+        with self.path.open("rb") as handle:
+            for offset in offsets:
+                handle.seek(offset)
+                yield from json.loads(handle.readline())["rows"]
+
+    def close(self) -> None:
+        self._handle.close()
+
+    def __enter__(self) -> "ScrapeCheckpoint":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def jump_to_page_steps(
+    page, template: dict, page_number: int, page_size: int, layout_cache: dict
+):
+    """Open ``page_number`` directly by rewriting the next-page request."""
+    url, body = build_page_request(template, page_number)
+    current = yield from extract_page_steps(page, layout_cache)
+    current = (current.get("pageInfo") or "").strip()
+    target_path = urlsplit(template["url"]).path
+
+    def matches(request_url: str) -> bool:
+        return urlsplit(request_url).path == target_path
+
+    def rewrite(route):
+        # Returned so that the async API awaits it.
+        if body is None:
+            return route.continue_(url=url)
+        return route.continue_(url=url, post_data=body)
+
+    yield page.route(matches, rewrite, times=1)
+    try:
+        changed = bool((yield page.evaluate(CLICK_NEXT_PAGE_JS))) and (
+            yield from wait_for_page_change_steps(page, current)
+        )
+    except PlaywrightError:
+        changed = False
+    yield page.unroute(matches, rewrite)
+    if not changed:
+        return False
+
+    landed = yield from extract_page_steps(page, layout_cache)
+    landed = (landed.get("pageInfo") or "").strip()
+    return page_number_of(landed, page_size) == page_number
+
+
+def bootstrap_http_paging(page, wait_mode: str = "event", checkpoint=None) -> dict:
+    """Walk the first three result pages in the browser and learn the paging.
+
+    The two next-page submissions tell which form field advances per page.
+    Returns the rows and banners collected so far plus, when paging could be
+    derived, the request ``template``, ``page_size`` and ``total``. ``done``
+    is set when the results fit on the pages already walked.
+    """
+    state = {
+        "rows": [],
+        "known_pages": set(checkpoint.known_pages if checkpoint else ()),
+        "headers": [],
+        "template": None,
+        "done": False,
+        "reason": "",
+    }
+    layout_cache: dict = {}
+    captured: list[dict] = []
+    last_page_info = ""
+
+    for _ in range(3):
+        extracted = extract_when_ready(page, layout_cache, last_page_info, wait_mode)
+        page_info = (extracted.get("pageInfo") or "").strip()
+        if not page_info or page_info == last_page_info:
+            state["reason"] = "no result banner"
+            return state
+        last_page_info = page_info
+        state["headers"] = extracted.get("headers") or []
+        if page_info not in state["known_pages"]:
+            total_rows = record_page(
+                state["rows"], checkpoint, page_info, rows_as_dicts(extracted)
+            )
+            state["known_pages"].add(page_info)
+            print(f"Collected rows: {total_rows}")
+
+        if page.evaluate(NEXT_PAGE_DISABLED_JS):
+            state["done"] = True
+            return state
+        if len(captured) == 2:
+            break
+        _, request = capture_next_page_request(page)
+        if request is None:
+            state["reason"] = "next-page request not captured"
+            return state
+        captured.append(request)
+
+    template = build_page_template(captured[0], captured[1])
+    bounds = page_info_bounds(last_page_info)
+    if template is None or bounds is None:
+        state["reason"] = "could not derive the paging field"
+        return state
+
+    start_row, end_row, total = bounds
+    state["template"] = template
+    state["page_size"] = end_row - start_row + 1
+    state["total"] = total
+    state["last_page"] = -(-total // state["page_size"])
+    if checkpoint is not None and checkpoint.template is None:
+        checkpoint.set_template(template)
+    return state
+
+
+def is_expected_http_page(extracted: dict, page_number: int, paging: dict) -> bool:
+    page_size = paging["page_size"]
+    expected_start = (page_number - 1) * page_size + 1
+    expected_rows = min(page_size, paging["total"] - expected_start + 1)
+    bounds = page_info_bounds(extracted["pageInfo"])
+    return (
+        bounds is not None
+        and bounds[0] == expected_start
+        and extracted["headers"] == paging["headers"]
+        and len(extracted["rows"]) == expected_rows
+    )
+
+
+def pending_page_numbers(paging: dict, checkpoint=None) -> list[int]:
+    return [
+        page_number
+        for page_number in range(4, paging["last_page"] + 1)
+        if checkpoint is None or not checkpoint.has_page(page_number)
+    ]
+
+
+def scrape_all_pages_http(page, wait_mode: str = "event", checkpoint=None) -> list[dict]:
+    """Read result pages with plain HTTP requests on the browser's session.
+
+    Pages after the bootstrap are requested through ``context.request``
+    (sharing the session cookies) and parsed in Python. Anything unexpected
+    falls back to the DOM scraper. With a resumed ``checkpoint`` only the
+    missing pages are requested.
+    """
+    paging = bootstrap_http_paging(page, wait_mode, checkpoint)
+    collected_rows = paging["rows"]
+    known_pages = paging["known_pages"]
+
+    def fall_back(reason: str) -> list[dict]:
+        print(f"HTTP fast path unavailable ({reason}); continuing in the browser.")
+        return collected_rows + scrape_all_pages(
+            page, wait_mode=wait_mode, known_pages=known_pages, checkpoint=checkpoint
+        )
+
+    if paging["done"]:
+        return collected_rows
+    if paging["template"] is None:
+        return fall_back(paging["reason"])
+
+    request_context = page.context.request
+    page_numbers = pending_page_numbers(paging, checkpoint)
+    started = time.perf_counter()
+
+    for page_number in page_numbers:
+        try:
+            extracted = fetch_page_http(request_context, paging["template"], page_number)
+        except Exception as exc:
+            return fall_back(str(exc))
+        if not is_expected_http_page(extracted, page_number, paging):
+            return fall_back(f"unexpected content on page {page_number}")
+
+        known_pages.add(extracted["pageInfo"])
+        total_rows = record_page(
+            collected_rows, checkpoint, extracted["pageInfo"], rows_as_dicts(extracted)
+        )
+        print(f"Collected rows: {total_rows} (HTTP page {page_number})")
+
+    elapsed = time.perf_counter() - started
+    if page_numbers:
+        print(
+            f"Fetched {len(page_numbers)} pages over HTTP in {elapsed:.1f} s "
+            f"({len(page_numbers) / elapsed if elapsed else 0:.1f} pages/s)"
+        )
+    return collected_rows
+
+
+class AdaptiveConcurrency:
+    """Shared limit on in-flight page requests for the parallel workers.
+
+    The limit is halved and a growing pause is added when a request fails,
+    and it creeps back up to ``max_workers`` after a run of successes.
+    """
+
+    def __init__(self, max_workers: int) -> None:
+        self.max_workers = max(1, max_workers)
+        self.limit = self.max_workers
+        self.active = 0
+        self.successes = 0
+        self.pause = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self.active >= self.limit:
+                self._cond.wait()
+            self.active += 1
+            pause = self.pause
+        if pause:
+            time.sleep(pause)
+
+    def release(self, ok: bool) -> None:
+        with self._cond:
+            self.active -= 1
+            if ok:
+                self.successes += 1
+                self.pause = self.pause / 2 if self.pause > 0.1 else 0.0
+                if self.successes >= self.limit * 2 and self.limit < self.max_workers:
+                    self.limit += 1
+                    self.successes = 0
+            else:
+                self.successes = 0
+                self.limit = max(1, self.limit // 2)
+                self.pause = min(10.0, max(0.5, self.pause * 2))
+                print(
+                    f"Server struggling; concurrency -> {self.limit}, "
+                    f"pause {self.pause:.1f} s"
+                )
+            self._cond.notify_all()
+
+
+class SessionResponse:
+    """The parts of a Playwright ``APIResponse`` that ``fetch_page_http`` reads."""
+
+    def __init__(self, status: int, headers: dict, payload: bytes) -> None:
+        self.status = status
+        self.ok = 200 <= status < 300
+        self.headers = headers
+        self.payload = payload
+
+    def body(self) -> bytes:
+        return self.payload
+
+
+class SessionHTTPClient:
+    """Keep-alive HTTP client that sends a browser session's cookies.
+
+    Answers ``fetch`` like Playwright's request context, so a parallel page
+    worker needs no Playwright driver of its own. Redirects are not followed:
+    a session bounced to the login page shows up as a failed request.
+    """
+
+    def __init__(self, storage_state: dict, user_agent: str = "") -> None:
+        self.cookies = storage_state.get("cookies", [])
+        self.user_agent = user_agent
+        self.connections: dict[tuple[str, str], http.client.HTTPConnection] = {}
+
+    def cookie_header(self, url: str) -> str:
+        parts = urlsplit(url)
+        host, path = parts.hostname or "", parts.path or "/"
+        pairs = []
+        for cookie in self.cookies:
+            domain = cookie.get("domain", "").lstrip(".")
+            if host != domain and not host.endswith("." + domain):
+                continue
+            if not path.startswith(cookie.get("path") or "/"):
+                continue
+            if cookie.get("secure") and parts.scheme != "https":
+                continue
+            pairs.append(f"{cookie['name']}={cookie['value']}")
+        return "; ".join(pairs)
+
+    def fetch(
+        self,
+        url: str,
+        method: str = "GET",
+        data: str | None = None,
+        headers: dict | None = None,
+        timeout: float = 30000,
+    ) -> SessionResponse:
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        connection = self.connections.get(key)
+        if connection is None:
+            factory = (
+                http.client.HTTPSConnection
+                if parts.scheme == "https"
+                else http.client.HTTPConnection
+            )
+            connection = self.connections[key] = factory(parts.netloc, timeout=timeout / 1000)
+        request_headers = dict(headers or {})
+        cookie = self.cookie_header(url)
+        if cookie:
+            request_headers["Cookie"] = cookie
+        if self.user_agent:
+            request_headers["User-Agent"] = self.user_agent
+        target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        try:
+            connection.request(
+                method,
+                target,
+                body=data.encode("utf-8") if data is not None else None,
+                headers=request_headers,
+            )
+            response = connection.getresponse()
+            payload = response.read()
+        except (OSError, http.client.HTTPException):
+            # Reconnect on the next request.
+            connection.close()
+            raise
+        return SessionResponse(
+            response.status,
+            {name.lower(): value for name, value in response.getheaders()},
+            payload,
+        )
+
+    def dispose(self) -> None:
+        for connection in self.connections.values():
+            connection.close()
+        self.connections.clear()
+
+
+def parallel_page_worker(
+    client: SessionHTTPClient,
+    paging: dict,
+    jobs: "queue.Queue[list[int]]",
+    results: dict,
+    attempts: dict,
+    limiter: AdaptiveConcurrency,
+    checkpoint=None,
+    max_attempts: int = 3,
+) -> None:
+    # Playwright's sync API is bound to the thread that started it, so the
+    # workers replay the page requests over plain HTTP with the session's
+    # cookies, one keep-alive client each.
+    try:
+        while True:
+            try:
+                page_numbers = jobs.get_nowait()
+            except queue.Empty:
+                return
+            for position, page_number in enumerate(page_numbers):
+                limiter.acquire()
+                ok = False
+                extracted = None
+                try:
+                    extracted = fetch_page_http(client, paging["template"], page_number)
+                    ok = is_expected_http_page(extracted, page_number, paging)
+                except Exception:
+                    ok = False
+                finally:
+                    limiter.release(ok)
+
+                if ok:
+                    if checkpoint is not None:
+                        checkpoint.append(extracted["pageInfo"], rows_as_dicts(extracted))
+                        results[page_number] = None
+                    else:
+                        results[page_number] = extracted
+                    continue
+                attempts[page_number] = attempts.get(page_number, 0) + 1
+                if attempts[page_number] < max_attempts:
+                    jobs.put(page_numbers[position:])
+                    break
+                print(f"Giving up on result page {page_number} over HTTP.")
+    finally:
+        client.dispose()
+
+
+def iter_unique_rows(rows, key_column: str = "كد ارائه کلاس درس"):
+    wanted = norm_cell_text(key_column)
+    key_names: dict[str, bool] = {}
+    seen = set()
+    for row in rows:
+        key = ""
+        for name, value in row.items():
+            if name not in key_names:
+                key_names[name] = norm_cell_text(name) == wanted
+            if key_names[name]:
+                key = value
+                break
+        if key:
+            if key in seen:
+                continue
+            seen.add(key)
+        yield row
+
+
+def dedupe_rows(rows, key_column: str = "كد ارائه کلاس درس") -> list[dict]:
+    return list(iter_unique_rows(rows, key_column))
+
+
+def scrape_all_pages_parallel(
+    page,
+    wait_mode: str = "event",
+    workers: int = 4,
+    pages_per_job: int = 5,
+    checkpoint=None,
+) -> list[dict]:
+    """Fetch the remaining result pages concurrently once the total is known.
+
+    Workers share the login through the context's cookies, each on its own
+    ``SessionHTTPClient``, and take ranges of page numbers from a queue.
+    Results are merged in page order and deduplicated by "كد ارائه کلاس درس".
+    With a ``checkpoint`` pages are appended to it as they arrive and the
+    returned list is empty.
+    """
+    paging = bootstrap_http_paging(page, wait_mode, checkpoint)
+    collected_rows = paging["rows"]
+    known_pages = paging["known_pages"]
+
+    if paging["done"]:
+        return dedupe_rows(collected_rows)
+    if paging["template"] is None:
+        print(
+            f"Parallel paging unavailable ({paging['reason']}); "
+            "continuing in the browser."
+        )
+        return dedupe_rows(
+            collected_rows
+            + scrape_all_pages(
+                page,
+                wait_mode=wait_mode,
+                known_pages=known_pages,
+                checkpoint=checkpoint,
+            )
+        )
+
+    storage_state = page.context.storage_state()
+    user_agent = page.evaluate("() => navigator.userAgent")
+    page_numbers = pending_page_numbers(paging, checkpoint)
+    jobs: queue.Queue[list[int]] = queue.Queue()
+    for index in range(0, len(page_numbers), pages_per_job):
+        jobs.put(page_numbers[index : index + pages_per_job])
+
+    results: dict[int, dict | None] = {}
+    attempts: dict[int, int] = {}
+    limiter = AdaptiveConcurrency(workers)
+    started = time.perf_counter()
+    threads = [
+        threading.Thread(
+            target=parallel_page_worker,
+            args=(
+                SessionHTTPClient(storage_state, user_agent),
+                paging,
+                jobs,
+                results,
+                attempts,
+                limiter,
+                checkpoint,
+            ),
+            daemon=True,
+        )
+        for _ in range(max(1, min(workers, jobs.qsize())))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    for page_number in sorted(results):
+        extracted = results[page_number]
+        if extracted is not None:
+            known_pages.add(extracted["pageInfo"])
+            collected_rows.extend(rows_as_dicts(extracted))
+    print(
+        f"Fetched {len(results)} pages with {workers} workers in {elapsed:.1f} s "
+        f"({len(results) / elapsed if elapsed else 0:.1f} pages/s)"
+    )
+
+    missing = len(page_numbers) - len(results)
+    if missing > 0:
+        print(f"{missing} pages failed over HTTP; collecting them in the browser.")
+        collected_rows += scrape_all_pages(
+            page, wait_mode=wait_mode, known_pages=known_pages, checkpoint=checkpoint
+        )
+    return dedupe_rows(collected_rows)
+
+
+def rows_to_dataframe(rows: list[dict]):
+    """Raw rows as a DataFrame in MEANINGFUL_COLUMNS order."""
+    df = pd.DataFrame(rows)
+    if df.empty:
+        return df
+
+    def norm_col(name: str) -> str:
+        return (
+            re.sub(r"\s+", " ", str(name).strip())
+            .replace("ي", "ی")
+            .replace("ك", "ک")
+        )
+
+    norm_to_real = {norm_col(c): c for c in df.columns}
+    ordered_cols = []
+    for wanted in MEANINGFUL_COLUMNS:
+        key = norm_col(wanted)
+        if key in norm_to_real:
+            ordered_cols.append(norm_to_real[key])
+
+    if ordered_cols:
+        df = df[ordered_cols]
+    return df
+
+
+class StreamingExcelWriter:
+    """Write-only xlsx sheet fed a row or a DataFrame chunk at a time.
+
+    openpyxl's write-only mode spills rows to a temporary file instead of
+    keeping a cell object per value, so memory stays flat however many rows
+    are written. The sheet is right to left with a frozen, styled header, so
+    columns are written in their natural order.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        columns: list[str],
+        sheet_title: str = "Sheet1",
+        header_color: str = "1F2937",
+    ) -> None:
+        self.path = path
+        self.columns = list(columns)
+        self.rows_written = 0
+        self.workbook = openpyxl.Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet(sheet_title)
+        self.sheet.sheet_view.rightToLeft = True
+        self.sheet.freeze_panes = "A2"
+        for index, column in enumerate(self.columns, start=1):
+            letter = openpyxl.utils.get_column_letter(index)
+            self.sheet.column_dimensions[letter].width = min(40, max(10, len(str(column)) + 4))
+
+        header = []
+        for column in self.columns:
+            cell = openpyxl.cell.WriteOnlyCell(self.sheet, value=str(column))
+            cell.font = openpyxl.styles.Font(bold=True, color="FFFFFF")
+            cell.fill = openpyxl.styles.PatternFill("solid", fgColor=header_color)
+            cell.alignment = openpyxl.styles.Alignment(horizontal="center", wrap_text=True)
+            header.append(cell)
+        self.sheet.append(header)
+
+    def append(self, values) -> None:
+        """One row, as a dict keyed on column name or a sequence in column order."""
+        if isinstance(values, dict):
+            values = [values.get(column) for column in self.columns]
+        self.sheet.append([None if is_missing(value) else value for value in values])
+        self.rows_written += 1
+
+    def append_rows(self, rows) -> None:
+        for row in rows:
+            self.append(row)
+
+    def append_frame(self, df, chunk_rows: int = 5000) -> None:
+        for start in range(0, len(df), chunk_rows):
+            chunk = df.iloc[start : start + chunk_rows]
+            for values in chunk.astype(object).itertuples(index=False, name=None):
+                self.append(values)
+
+    def close(self) -> Path:
+        self.workbook.save(self.path)
+        return self.path
+
+    def __enter__(self) -> "StreamingExcelWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            # Finish the sheet's temporary file without writing the workbook.
+            self.sheet.close()
+
+
+def save_excel(rows: list[dict], df=None) -> Path:
+    output_path = OUTPUT_DIR / RAW_EXCEL_NAME
     if not rows:
-        pd.DataFrame([{"message": "No rows found"}]).to_excel(output_path, index=False)
+        with StreamingExcelWriter(output_path, ["message"]) as writer:
+            writer.append(["No rows found"])
     else:
-        df = pd.DataFrame(rows)
+        if df is None:
+            df = rows_to_dataframe(rows)
+        write_excel_view(df, output_path)
+    return output_path
 
-        def norm_col(name: str) -> str:
-            return (
-                re.sub(r"\s+", " ", str(name).strip())
-                .replace("ي", "ی")
-                .replace("ك", "ک")
+
+def dataset_path(name: str) -> Path:
+    return OUTPUT_DIR / f"{DATASET_PREFIX}_{name}.parquet"
+
+
+def dataset_exists(name: str) -> bool:
+    return dataset_path(name).exists()
+
+
+def encode_categories(df):
+    """Copy of ``df`` with CATEGORY_COLUMNS as pandas categoricals."""
+    df = df.copy()
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    return df
+
+
+def write_dataset(name: str, df) -> Path:
+    """Store ``df`` as dataset ``name`` (raw, specialized or general).
+
+    Parquet keeps the categoricals dictionary-encoded.
+    """
+    path = dataset_path(name)
+    encode_categories(df).to_parquet(path, index=False)
+    return path
+
+
+def read_dataset(name: str):
+    path = dataset_path(name)
+    if not path.exists():
+        raise FileNotFoundError(f"Dataset {name!r} not found at {path}.")
+    return pd.read_parquet(path)
+
+
+def write_excel_view(df, path: Path) -> Path:
+    """xlsx view of a dataset on a right-to-left sheet."""
+    with StreamingExcelWriter(path, list(df.columns)) as writer:
+        writer.append_frame(df)
+    return path
+
+
+def export_excel_views(report_specs: list[dict] | None = None) -> list[Path]:
+    """Regenerate the xlsx files from the stored datasets."""
+    load_reporting()
+    views = {"raw": RAW_EXCEL_NAME}
+    for spec in report_specs or load_report_specs():
+        views[spec["name"]] = f"{spec['file']}.xlsx"
+    written = []
+    for name, file_name in views.items():
+        try:
+            df = read_dataset(name)
+        except (FileNotFoundError, ValueError):
+            print(f"No {name} dataset yet; skipping {file_name}.")
+            continue
+        written.append(write_excel_view(df, OUTPUT_DIR / file_name))
+    return written
+
+
+def canonical_rows(rows) -> list[dict]:
+    """Rekey rows on MEANINGFUL_COLUMNS names, whatever ی/ک variant the page used."""
+    canonical_by_norm = {norm_cell_text(col): col for col in MEANINGFUL_COLUMNS}
+    key_map: dict[str, str | None] = {}
+    result = []
+    for row in rows:
+        canonical = {}
+        for name, value in row.items():
+            if name not in key_map:
+                key_map[name] = canonical_by_norm.get(norm_cell_text(name))
+            if key_map[name]:
+                canonical[key_map[name]] = value
+        result.append(canonical)
+    return result
+
+
+def rows_by_offering_code(rows: list[dict]) -> dict[str, dict]:
+    keyed = {}
+    for index, row in enumerate(rows):
+        code = str(row.get("كد ارائه کلاس درس") or "").strip()
+        keyed[code or f"#{index}"] = row
+    return keyed
+
+
+def load_snapshot(path: Path) -> dict[str, dict] | None:
+    if not path.exists():
+        return None
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except ValueError:
+        return None
+
+
+def save_snapshot(path: Path, keyed_rows: dict[str, dict]) -> None:
+    temp_path = path.with_suffix(".tmp")
+    temp_path.write_text(json.dumps(keyed_rows, ensure_ascii=False), encoding="utf-8")
+    temp_path.replace(path)
+
+
+def compute_delta(previous: dict[str, dict], current: dict[str, dict]) -> dict:
+    added = [current[code] for code in current if code not in previous]
+    removed = [previous[code] for code in previous if code not in current]
+    changed = []
+    for code, row in current.items():
+        old_row = previous.get(code)
+        if old_row is None or old_row == row:
+            continue
+        for field in DELTA_FIELDS:
+            old_value = str(old_row.get(field, "") or "")
+            new_value = str(row.get(field, "") or "")
+            if old_value != new_value:
+                changed.append(
+                    {
+                        "كد ارائه کلاس درس": code,
+                        "نام درس": row.get("نام درس", ""),
+                        "فیلد": field,
+                        "مقدار قبلی": old_value,
+                        "مقدار جدید": new_value,
+                    }
+                )
+    # Any difference at all, including columns not listed in DELTA_FIELDS.
+    rows_changed = any(
+        code in previous and previous[code] != row for code, row in current.items()
+    )
+    return {
+        "added": added,
+        "removed": removed,
+        "changed": changed,
+        "any_change": bool(added or removed or rows_changed),
+    }
+
+
+def write_delta_report(delta: dict, path: Path) -> None:
+    sheets = {
+        "اضافه شده": pd.DataFrame(delta["added"]),
+        "حذف شده": pd.DataFrame(delta["removed"]),
+        "تغییر کرده": pd.DataFrame(delta["changed"]),
+    }
+    with pd.ExcelWriter(path) as writer:
+        for sheet_name, frame in sheets.items():
+            if frame.empty:
+                frame = pd.DataFrame([{"message": "No changes"}])
+            frame.to_excel(writer, sheet_name=sheet_name, index=False)
+
+
+def compare_snapshot(rows: list[dict]) -> tuple[dict | None, dict[str, dict]]:
+    """Compare this run's rows with the previous snapshot.
+
+    Returns the delta (None on the first run, with no previous snapshot) and
+    the new snapshot. The caller saves the snapshot only once the outputs are
+    written, so an interrupted export is redone on the next run.
+    """
+    current = rows_by_offering_code(canonical_rows(rows))
+    previous = load_snapshot(OUTPUT_DIR / SNAPSHOT_NAME)
+    if previous is None:
+        return None, current
+
+    delta = compute_delta(previous, current)
+    print(
+        f"Changes since last run: {len(delta['added'])} added, "
+        f"{len(delta['removed'])} removed, {len(delta['changed'])} field changes."
+    )
+    if delta["any_change"]:
+        write_delta_report(delta, OUTPUT_DIR / DELTA_REPORT_NAME)
+        print(f"Change report: {OUTPUT_DIR / DELTA_REPORT_NAME}")
+    return delta, current
+
+
+def reports_fingerprint(rows: list[dict], report_specs: list[dict]) -> str:
+    """Hash of the report definitions and exactly the data they are built from."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps(report_specs, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+    columns = list(
+        dict.fromkeys(col for spec in report_specs for col in spec["columns"] + spec["sort"])
+    )
+    relevant = []
+    for row in canonical_rows(rows):
+        names = [spec["name"] for spec in report_specs if row_matches_report(row, spec)]
+        if names:
+            relevant.append(names + [str(row.get(col, "")) for col in columns])
+    relevant.sort()
+    for values in relevant:
+        digest.update(json.dumps(values, ensure_ascii=False).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def load_manifest() -> dict:
+    manifest_path = OUTPUT_DIR / MANIFEST_NAME
+    if not manifest_path.exists():
+        return {}
+    try:
+        return json.loads(manifest_path.read_text(encoding="utf-8"))
+    except ValueError:
+        return {}
+
+
+def save_manifest(manifest: dict) -> None:
+    (OUTPUT_DIR / MANIFEST_NAME).write_text(
+        json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8"
+    )
+
+
+def parse_count(value) -> int | None:
+    match = re.search(r"\d+", normalize_persian_for_sort(value))
+    return int(match.group(0)) if match else None
+
+
+def free_seats_of(row: dict) -> int | None:
+    capacity = parse_count(row.get("حداكثر ظرفيت"))
+    enrolled = parse_count(row.get("تعداد ثبت نامي تاکنون"))
+    if capacity is None or enrolled is None:
+        return None
+    return capacity - enrolled
+
+
+class SeatMonitor:
+    """Free seats per section across polling cycles.
+
+    Each page's rows are hashed; a page identical to the last cycle's is
+    skipped without looking at its rows. An event is emitted when a section's
+    free seats rise to ``threshold`` or drop below it.
+    """
+
+    def __init__(
+        self,
+        threshold: int = 1,
+        watch: set[str] | None = None,
+        events_path: Path | None = None,
+    ) -> None:
+        self.threshold = threshold
+        self.watch = {code.strip() for code in watch or () if code.strip()}
+        self.events_path = events_path
+        self.page_hashes: dict[str, str] = {}
+        self.free_seats: dict[str, int] = {}
+        self.pages_changed = 0
+        self.pages_skipped = 0
+        self.events = 0
+
+    def is_watched(self, row: dict) -> bool:
+        if not self.watch:
+            return True
+        return (
+            str(row.get("كد ارائه کلاس درس", "")).strip() in self.watch
+            or str(row.get("كد درس", "")).strip() in self.watch
+        )
+
+    def handle_page(self, page_info: str, rows: list[dict]) -> None:
+        digest = hashlib.sha1(
+            json.dumps(rows, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()
+        key = page_info or digest
+        if self.page_hashes.get(key) == digest:
+            self.pages_skipped += 1
+            return
+        self.page_hashes[key] = digest
+        self.pages_changed += 1
+
+        for row in canonical_rows(rows):
+            if not self.is_watched(row):
+                continue
+            code = str(row.get("كد ارائه کلاس درس", "")).strip()
+            free = free_seats_of(row)
+            if not code or free is None:
+                continue
+            previous = self.free_seats.get(code)
+            self.free_seats[code] = free
+            if previous is None:
+                continue
+            if previous < self.threshold <= free:
+                self.emit("seats_available", row, previous, free)
+            elif free < self.threshold <= previous:
+                self.emit("seats_filled", row, previous, free)
+
+    def emit(self, kind: str, row: dict, previous: int, free: int) -> None:
+        self.events += 1
+        event = {
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "event": kind,
+            "كد ارائه کلاس درس": row.get("كد ارائه کلاس درس", ""),
+            "نام درس": row.get("نام درس", ""),
+            "استاد": row.get("استاد", ""),
+            "free_before": previous,
+            "free_now": free,
+        }
+        print(
+            f"[{event['time']}] {kind}: {event['نام درس']} "
+            f"({event['كد ارائه کلاس درس']}) free seats {previous} -> {free}"
+        )
+        if self.events_path is not None:
+            with self.events_path.open("a", encoding="utf-8") as handle:
+                handle.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+
+def monitor_seats(
+    page,
+    interval_s: float = 300.0,
+    threshold: int = 1,
+    watch: set[str] | None = None,
+    wait_mode: str = "event",
+    max_pages: int | None = None,
+    page_delay_ms: int = 0,
+    max_cycles: int | None = None,
+) -> None:
+    """Poll the result pages with the logged-in browser until interrupted.
+
+    Every cycle re-submits the search form in place and walks the pages.
+    Server load is bounded by one tab, at least ``MIN_MONITOR_INTERVAL_S``
+    between cycles, an optional pause after every page and an optional cap on
+    pages per cycle. Failed cycles back off exponentially; an expired session
+    raises ``SessionExpiredError`` instead of waiting for a login.
+    """
+    monitor = SeatMonitor(threshold, watch, OUTPUT_DIR / SEAT_EVENTS_NAME)
+    interval_s = max(MIN_MONITOR_INTERVAL_S, interval_s)
+    failures = 0
+    cycle = 0
+    print(
+        f"Monitoring free seats every {interval_s:.0f} s "
+        f"(threshold {threshold}); press Ctrl+C to stop."
+    )
+
+    while max_cycles is None or cycle < max_cycles:
+        cycle += 1
+        started = time.time()
+        changed_before = monitor.pages_changed
+        skipped_before = monitor.pages_skipped
+        events_before = monitor.events
+        pages_this_cycle = 0
+
+        def on_page(page_info: str, rows: list[dict]) -> bool:
+            nonlocal pages_this_cycle
+            pages_this_cycle += 1
+            monitor.handle_page(page_info, rows)
+            if page_delay_ms:
+                page.wait_for_timeout(page_delay_ms)
+            return max_pages is None or pages_this_cycle < max_pages
+
+        try:
+            run_steps(refresh_results_steps(page))
+            scrape_all_pages(page, wait_mode=wait_mode, on_page=on_page)
+            if run_steps(is_session_expired_steps(page)):
+                raise SessionExpiredError("Session expired; log in again and restart.")
+            failures = 0
+        except SessionExpiredError:
+            raise
+        except (PlaywrightError, RuntimeError) as exc:
+            failures += 1
+            print(f"Monitor cycle {cycle} failed: {exc}")
+
+        elapsed = time.time() - started
+        print(
+            f"Cycle {cycle}: {pages_this_cycle} pages in {elapsed:.1f} s, "
+            f"{monitor.pages_changed - changed_before} changed, "
+            f"{monitor.pages_skipped - skipped_before} unchanged, "
+            f"{monitor.events - events_before} events, "
+            f"{len(monitor.free_seats)} sections tracked."
+        )
+        if max_cycles is not None and cycle >= max_cycles:
+            break
+
+        delay = interval_s * (2 ** min(failures, 4))
+        page.wait_for_timeout(max(0.0, delay - elapsed) * 1000)
+
+
+def export_outputs(
+    rows: list[dict],
+    force: bool = False,
+    pdf_workers: int | None = None,
+    pdf_layout: str = "planned",
+    excel: bool = True,
+    report_specs: list[dict] | None = None,
+) -> tuple[Path, list[dict]]:
+    """Write the datasets and reports, skipping work the last run already did.
+
+    The raw dataset (and its Excel view) is only rewritten when some row
+    changed, and the filtered datasets and PDF reports only when the rows and
+    columns they show changed. ``excel=False`` skips the xlsx views.
+    """
+    load_reporting()
+    report_specs = report_specs or load_report_specs()
+    delta, snapshot = compare_snapshot(rows)
+    df = rows_to_dataframe(rows)
+    raw_dataset = dataset_path("raw")
+    excel_file = OUTPUT_DIR / RAW_EXCEL_NAME
+    rows_unchanged = delta is not None and not delta["any_change"]
+
+    # The raw Excel is a side output only; the reports are built from the
+    # same DataFrame, so it is written while they render.
+    excel_writer = None
+    excel_errors: list[Exception] = []
+    write_raw = force or not rows_unchanged or not dataset_exists("raw")
+    if write_raw and len(df.columns):
+        raw_dataset = write_dataset("raw", df)
+        load_companion("course_db").build_database(rows)
+    if excel and (write_raw or not excel_file.exists()):
+
+        def write_excel() -> None:
+            try:
+                save_excel(rows, df)
+            except Exception as exc:
+                excel_errors.append(exc)
+
+        excel_writer = threading.Thread(target=write_excel, name="raw-excel", daemon=True)
+        excel_writer.start()
+    if not write_raw:
+        print("No rows changed since the last run; keeping the raw dataset.")
+    primary = excel_file if excel else raw_dataset
+
+    try:
+        manifest = load_manifest()
+        fingerprint = (
+            f"{reports_fingerprint(rows, report_specs)}:{pdf_layout}:"
+            f"{'xlsx' if excel else 'data'}"
+        )
+        cached = manifest.get("reports")
+        if (
+            not force
+            and manifest.get("reports_fingerprint") == fingerprint
+            and isinstance(cached, list)
+            and all(
+                Path(report["list"]).exists() and Path(report["pdf"]).exists()
+                for report in cached
+            )
+        ):
+            print("Report rows unchanged since the last run; skipping report output.")
+            reports = [
+                {**report, "list": Path(report["list"]), "pdf": Path(report["pdf"])}
+                for report in cached
+            ]
+        else:
+            reports = postprocess_dataframe_to_pdfs(
+                df, pdf_workers, pdf_layout, excel, report_specs
+            )
+            save_manifest(
+                {
+                    "reports_fingerprint": fingerprint,
+                    "reports": [
+                        {**report, "list": str(report["list"]), "pdf": str(report["pdf"])}
+                        for report in reports
+                    ],
+                }
             )
+    finally:
+        if excel_writer is not None:
+            excel_writer.join()
+    if excel_errors:
+        raise RuntimeError(f"Could not write {excel_file}") from excel_errors[0]
 
-        norm_to_real = {norm_col(c): c for c in df.columns}
-        ordered_cols = []
-        for wanted in MEANINGFUL_COLUMNS:
-            key = norm_col(wanted)
-            if key in norm_to_real:
-                ordered_cols.append(norm_to_real[key])
+    save_snapshot(OUTPUT_DIR / SNAPSHOT_NAME, snapshot)
+    return primary, reports
 
-        if ordered_cols:
-            df = df[ordered_cols]
 
-        df = reverse_dataframe_columns(df)
+def print_report_summary(reports: list[dict]) -> None:
+    for report in reports:
+        print(f"{report['title']}: {report['rows']} rows -> {report['list']}, {report['pdf']}")
 
-        df.to_excel(output_path, index=False)
-    return output_path
 
+def print_export_summary(row_count: int, excel_file: Path, reports: list[dict]) -> None:
+    print(f"\nDone. Exported {row_count} rows to: {excel_file}")
+    print_report_summary(reports)
+
+
+def reprocess_excel(
+    source_excel: Path,
+    pdf_workers: int | None = None,
+    pdf_layout: str = "planned",
+    excel: bool = True,
+    report_specs: list[dict] | None = None,
+) -> None:
+    print(f"Rebuilding reports from {source_excel}...")
+    print_report_summary(
+        postprocess_excel_to_pdfs(source_excel, pdf_workers, pdf_layout, excel, report_specs)
+    )
+
+
+def postprocess_checkpoint(
+    force_outputs: bool = False,
+    pdf_workers: int | None = None,
+    pdf_layout: str = "planned",
+    excel: bool = True,
+    report_specs: list[dict] | None = None,
+) -> None:
+    """Build every output from the rows an earlier ``scrape`` left in the checkpoint."""
+    checkpoint_path = OUTPUT_DIR / CHECKPOINT_NAME
+    if not checkpoint_path.exists():
+        raise RuntimeError(
+            f"{checkpoint_path} not found. Run `python main.py scrape` first, "
+            "or pass --from-excel."
+        )
+    checkpoint = ScrapeCheckpoint(checkpoint_path, resume=True)
+    try:
+        if checkpoint.first_missing_page() is not None:
+            print(
+                "Scrape is incomplete; exporting what was collected. "
+                "Run `python main.py scrape --resume` to fetch the missing pages."
+            )
+        rows = dedupe_rows(checkpoint.iter_rows())
+    finally:
+        checkpoint.close()
+    excel_file, result = export_outputs(
+        rows,
+        force=force_outputs,
+        pdf_workers=pdf_workers,
+        pdf_layout=pdf_layout,
+        excel=excel,
+        report_specs=report_specs,
+    )
+    print_export_summary(len(rows), excel_file, result)
+
+
+def main(
+    command: str = "all",
+    wait_mode: str = "event",
+    fetch_mode: str = "dom",
+    workers: int = 4,
+    engine: str = "sync",
+    resume: bool = False,
+    force_outputs: bool = False,
+    monitor: bool = False,
+    monitor_interval: float = 300.0,
+    seat_threshold: int = 1,
+    watch: list[str] | None = None,
+    monitor_max_pages: int | None = None,
+    monitor_page_delay_ms: int = 0,
+    from_excel: Path | None = None,
+    pdf_workers: int | None = None,
+    pdf_layout: str = "planned",
+    excel: bool = True,
+    report_spec: Path | None = None,
+    fanout_by: list[str] | None = None,
+    lean: bool = False,
+    sessions: list[dict] | None = None,
+) -> None:
+    """Run one stage: ``scrape`` (browser to checkpoint), ``postprocess``
+    (checkpoint or --from-excel to datasets and reports), ``all`` (both),
+    ``export-excel`` (xlsx views of the stored datasets) or ``fanout`` (a
+    report per faculty and group of the raw dataset or --from-excel)."""
+    if command == "fanout":
+        load_reporting()
+        if from_excel is not None:
+            df = pd.read_excel(from_excel)
+        else:
+            try:
+                df = read_dataset("raw")
+            except FileNotFoundError as exc:
+                raise RuntimeError(
+                    f"{exc} Run `python main.py postprocess` first, or pass --from-excel."
+                ) from None
+        fanout_reports(df, fanout_by, pdf_workers, pdf_layout, excel, force_outputs)
+        return
+    report_specs = load_report_specs(report_spec) if command != "scrape" else None
+    if command == "export-excel":
+        for path in export_excel_views(report_specs):
+            print(f"Excel view: {path}")
+        return
+    if from_excel is not None:
+        reprocess_excel(from_excel, pdf_workers, pdf_layout, excel, report_specs)
+        return
+    if command == "postprocess":
+        postprocess_checkpoint(force_outputs, pdf_workers, pdf_layout, excel, report_specs)
+        return
+
+    export = command == "all"
+    conflict = engine_conflict(engine, fetch_mode, monitor, bool(sessions), lean)
+    if conflict:
+        raise ValueError(conflict)
+    if engine == "async":
+        import asyncio
+
+        load_browser()
+        async_engine = load_companion("async_engine")
+        asyncio.run(
+            async_engine.main_async(
+                wait_mode=wait_mode,
+                resume=resume,
+                force_outputs=force_outputs,
+                pdf_workers=pdf_workers,
+                pdf_layout=pdf_layout,
+                export=export,
+                excel=excel,
+                report_specs=report_specs,
+                lean=lean,
+                sessions=sessions,
+            )
+        )
+        return
 
-def main() -> None:
+    load_browser()
     print(f"Starting {PROJECT_NAME}...")
     print("If first run fails, execute once: python -m playwright install chrome")
 
     with sync_playwright() as p:
-        browser = p.chromium.launch(channel="chrome", headless=False)
+        browser = p.chromium.launch(
+            channel=BROWSER_CHANNEL or None, headless=HEADLESS
+        )
         context = browser.new_context()
         page = context.new_page()
 
         wait_for_login(page)
+        blocker = None
+        if lean:
+            blocker = ResourceBlocker()
+            browser, context, page = open_lean_session(p, browser, context, page, blocker)
+        WAIT_STATS.reset()
+        if monitor:
+            try:
+                monitor_seats(
+                    page,
+                    interval_s=monitor_interval,
+                    threshold=seat_threshold,
+                    watch=set(watch or ()),
+                    wait_mode=wait_mode,
+                    max_pages=monitor_max_pages,
+                    page_delay_ms=monitor_page_delay_ms,
+                )
+            except KeyboardInterrupt:
+                print("\nMonitor stopped.")
+            if blocker is not None:
+                print(blocker.summary())
+            context.close()
+            browser.close()
+            return
+
         wait_for_results(page)
-        rows = scrape_all_pages(page)
-        excel_file = save_excel(rows)
-        (
-            group_excel,
-            faculty_excel,
-            group_pdf,
-            faculty_pdf,
-            group_count,
-            faculty_count,
-        ) = postprocess_excel_to_pdfs(excel_file)
-
-        print(f"\nDone. Exported {len(rows)} rows to: {excel_file}")
-        print(f"Specialized Excel: {group_excel}")
-        print(f"General Excel: {faculty_excel}")
-        print(f"Specialized rows: {group_count} -> {group_pdf}")
-        print(f"General rows: {faculty_count} -> {faculty_pdf}")
-        print("Browser stays open for review. Press Enter to close.")
-        input()
+        checkpoint = ScrapeCheckpoint(OUTPUT_DIR / CHECKPOINT_NAME, resume=resume)
+        try:
+            if fetch_mode == "http":
+                scrape_all_pages_http(page, wait_mode=wait_mode, checkpoint=checkpoint)
+            elif fetch_mode == "parallel":
+                scrape_all_pages_parallel(
+                    page, wait_mode=wait_mode, workers=workers, checkpoint=checkpoint
+                )
+            else:
+                scrape_all_pages(page, wait_mode=wait_mode, checkpoint=checkpoint)
+            if checkpoint.first_missing_page() is not None:
+                print(
+                    "Scrape is incomplete; exporting what was collected. "
+                    "Run again with --resume to fetch the missing pages."
+                )
+            rows = dedupe_rows(checkpoint.iter_rows())
+        finally:
+            checkpoint.close()
+        print(WAIT_STATS.summary())
+        if blocker is not None:
+            print(blocker.summary())
+
+        if export:
+            excel_file, result = export_outputs(
+                rows,
+                force=force_outputs,
+                pdf_workers=pdf_workers,
+                pdf_layout=pdf_layout,
+                excel=excel,
+                report_specs=report_specs,
+            )
+            print_export_summary(len(rows), excel_file, result)
+        else:
+            print(f"\nDone. Scraped {len(rows)} rows into {checkpoint.path}")
+            print("Build the outputs with: python main.py postprocess")
+        if not lean:
+            print("Browser stays open for review. Press Enter to close.")
+            input()
 
         context.close()
         browser.close()
 
 
+COMMANDS = ["scrape", "postprocess", "all", "export-excel", "fanout"]
+
+
+def engine_conflict(
+    engine: str,
+    fetch_mode: str,
+    monitor: bool,
+    sessions: bool = False,
+    lean: bool = False,
+) -> str | None:
+    """Why the options cannot run together, or None."""
+    if engine != "async":
+        return "--session needs --engine async." if sessions else None
+    if sessions and lean:
+        return "--lean does not apply to --session scrapes."
+    if monitor:
+        return "--monitor runs on the sync engine only; drop --engine async."
+    if fetch_mode != "dom":
+        return (
+            f"--fetch-mode {fetch_mode} runs on the sync engine only; "
+            "drop --engine async."
+        )
+    return None
+
+
+def session_option(text: str) -> dict:
+    """``NAME[=STATE.json]`` from ``--session`` as ``run_sessions`` keywords."""
+    name, _, state = text.partition("=")
+    if not re.fullmatch(r"\w+", name):
+        raise argparse.ArgumentTypeError(f"session name must be letters, digits or _: {text!r}")
+    return {"name": name, "storage_state": state or None}
+
+
+def parse_args(argv: list[str] | None = None):
+    browser_options = argparse.ArgumentParser(add_help=False)
+    browser_options.add_argument(
+        "--wait-mode",
+        choices=["event", "poll"],
+        default="event",
+        help=(
+            "How to detect the next result page: 'event' waits on the result "
+            "banner and row count, 'poll' uses the fixed sleep and re-extract loop."
+        ),
+    )
+    browser_options.add_argument(
+        "--fetch-mode",
+        choices=["dom", "http", "parallel"],
+        default="dom",
+        help=(
+            "'http' requests result pages directly with the browser session's "
+            "cookies and parses them in Python, falling back to the browser. "
+            "'parallel' does the same with a pool of workers."
+        ),
+    )
+    browser_options.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Maximum concurrent page requests for --fetch-mode parallel.",
+    )
+    browser_options.add_argument(
+        "--engine",
+        choices=["sync", "async"],
+        default="sync",
+        help=(
+            "'async' runs the browser scrape on playwright.async_api and "
+            "processes each page while the next one loads (--fetch-mode dom, "
+            "no --monitor)."
+        ),
+    )
+    browser_options.add_argument(
+        "--session",
+        dest="sessions",
+        action="append",
+        type=session_option,
+        metavar="NAME[=STATE.json]",
+        help=(
+            "With --engine async, scrape this session concurrently with the "
+            "other --session entries into scrape_NAME.jsonl (repeatable). A "
+            "Playwright storage_state file skips the login."
+        ),
+    )
+    browser_options.add_argument(
+        "--lean",
+        action="store_true",
+        help=(
+            "After login, continue in a headless browser that skips images, "
+            "stylesheets, fonts and third-party scripts."
+        ),
+    )
+    browser_options.add_argument(
+        "--resume",
+        action="store_true",
+        help=(
+            f"Continue from {CHECKPOINT_NAME} after a crash or expired session "
+            "instead of starting over."
+        ),
+    )
+    monitor = browser_options.add_argument_group("seat monitor")
+    monitor.add_argument(
+        "--monitor",
+        action="store_true",
+        help="Keep the browser open and poll result pages for seat changes.",
+    )
+    monitor.add_argument(
+        "--monitor-interval",
+        type=float,
+        default=300.0,
+        help=f"Seconds between polling cycles (at least {MIN_MONITOR_INTERVAL_S}).",
+    )
+    monitor.add_argument(
+        "--seat-threshold",
+        type=int,
+        default=1,
+        help="Emit an event when a section's free seats cross this value.",
+    )
+    monitor.add_argument(
+        "--watch",
+        action="append",
+        metavar="CODE",
+        help="Only track this كد درس or كد ارائه کلاس درس (repeatable).",
+    )
+    monitor.add_argument(
+        "--monitor-max-pages",
+        type=int,
+        default=None,
+        help="Read at most this many result pages per cycle.",
+    )
+    monitor.add_argument(
+        "--monitor-page-delay-ms",
+        type=int,
+        default=0,
+        help="Pause after each result page to spread the load on the server.",
+    )
+
+    output_options = argparse.ArgumentParser(add_help=False)
+    output_options.add_argument(
+        "--force-outputs",
+        action="store_true",
+        help="Regenerate Excel/PDF outputs even if the scraped rows did not change.",
+    )
+    output_options.add_argument(
+        "--from-excel",
+        type=Path,
+        metavar="XLSX",
+        help=(
+            "Skip the browser and rebuild the Excel and PDF reports from an "
+            "earlier raw export."
+        ),
+    )
+    output_options.add_argument(
+        "--no-excel",
+        dest="excel",
+        action="store_false",
+        help=(
+            "Only write the datasets and PDFs; build the xlsx files later with "
+            "'export-excel'."
+        ),
+    )
+    output_options.add_argument(
+        "--pdf-workers",
+        type=int,
+        default=None,
+        help="Processes used to render the PDF reports (default: CPU count).",
+    )
+    output_options.add_argument(
+        "--pdf-layout",
+        choices=["equal", "planned", "fixed"],
+        default="planned",
+        help=(
+            "PDF column widths: 'equal' splits the page evenly, 'planned' sizes "
+            "columns by their content, 'fixed' also precomputes row heights."
+        ),
+    )
+    spec_options = argparse.ArgumentParser(add_help=False)
+    spec_options.add_argument(
+        "--report-spec",
+        type=Path,
+        metavar="FILE",
+        help=(
+            f"JSON/YAML file defining the reports (default: {REPORT_SPEC_NAME} next "
+            "to main.py if present, else the specialized/general lists)."
+        ),
+    )
+
+    parser = argparse.ArgumentParser(
+        description=PROJECT_NAME,
+        epilog="Without a command, 'all' is run.",
+    )
+    commands = parser.add_subparsers(
+        dest="command", metavar="{scrape,postprocess,all,export-excel,fanout}"
+    )
+    commands.add_parser(
+        "scrape",
+        parents=[browser_options],
+        help=f"Log in and scrape the result pages into {CHECKPOINT_NAME}.",
+    )
+    commands.add_parser(
+        "postprocess",
+        parents=[output_options, spec_options],
+        help=(
+            f"Build the Excel/PDF outputs from {CHECKPOINT_NAME} (or --from-excel) "
+            "without starting a browser."
+        ),
+    )
+    commands.add_parser(
+        "all",
+        parents=[browser_options, output_options, spec_options],
+        help="Scrape, then build the outputs (the default).",
+    )
+    commands.add_parser(
+        "export-excel",
+        parents=[spec_options],
+        help="Write the xlsx files from the stored datasets.",
+    )
+    fanout = commands.add_parser(
+        "fanout",
+        parents=[output_options],
+        help=(
+            "Write an Excel/PDF report per faculty and per group of every unit "
+            "from the raw dataset (or --from-excel)."
+        ),
+    )
+    fanout.add_argument(
+        "--by",
+        dest="fanout_by",
+        nargs="+",
+        choices=list(FANOUT_LEVELS),
+        default=list(FANOUT_LEVELS),
+        help="Partition levels to write (default: both).",
+    )
+
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or (argv[0] not in COMMANDS and argv[0] not in {"-h", "--help"}):
+        argv.insert(0, "all")
+    args = parser.parse_args(argv)
+    if hasattr(args, "engine"):
+        conflict = engine_conflict(
+            args.engine, args.fetch_mode, args.monitor, bool(args.sessions), args.lean
+        )
+        if conflict:
+            parser.error(conflict)
+    return args
+
+
 if __name__ == "__main__":
-    main()
+    main(**vars(parse_args()))
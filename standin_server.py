@@ -0,0 +1,551 @@
+"""Offline stand-in for the Amoozeshyar (eserv.iau.ir) course-class search.
+
+Serves just enough of the real site for ``main.py`` to run end to end:
+a login page, the dashboard with the ``cache?a=menu`` iframe, the course
+search form and paginated result tables with synthetic rows. Every page
+pulls in a stylesheet, a script, images and a web font like the real one.
+
+Run standalone:
+
+    python standin_server.py --rows 2500 --latency-ms 80
+
+then point the extractor at it with ``AMOOZESHYAR_BASE_URL``.
+"""
+
+import argparse
+import html
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+SESSION_COOKIE = "JSESSIONID"
+
+COLUMNS = [
+    "كد درس",
+    "نام درس",
+    "نوع درس",
+    "تعداد واحد نظري",
+    "تعداد واحد عملي",
+    "كد ارائه کلاس درس",
+    "نام كلاس درس",
+    "زمانبندي تشکيل کلاس",
+    "استاد",
+    "ساير اساتيد",
+    "حداكثر ظرفيت",
+    "تعداد ثبت نامي تاکنون",
+    "زمان امتحان",
+    "مكان برگزاري",
+    "مقطع ارائه درس",
+    "نوع ارائه",
+    "سطح ارائه",
+    "دانشجويان مجاز به اخذ کلاس",
+    "گروه آموزشی",
+    "دانشکده",
+    "واحد",
+    "استان",
+]
+
+COURSE_NAMES = [
+    "رياضي عمومي 1",
+    "رياضي عمومي 2",
+    "فيزيك 1",
+    "برنامه سازي پيشرفته",
+    "ساختمان داده ها",
+    "طراحي الگوريتم ها",
+    "پايگاه داده ها",
+    "سيستم هاي عامل",
+    "شبكه هاي كامپيوتري",
+    "هوش مصنوعي",
+    "معماري كامپيوتر",
+    "مدارهاي منطقي",
+    "زبان تخصصي",
+    "اندیشه اسلامی 1",
+    "ادبيات فارسي",
+    "زبان خارجي عمومي",
+    "تربيت بدني",
+    "آمار و احتمال مهندسي",
+    "معادلات ديفرانسيل",
+    "ریاضیات گسسته",
+]
+
+INSTRUCTORS = [
+    "محمدي علي",
+    "احمدي زهرا",
+    "كريمي رضا",
+    "حسيني مريم",
+    "رضايي حسين",
+    "موسوي فاطمه",
+    "جعفري مهدي",
+    "نوري سارا",
+    "كاظمي امير",
+    "يوسفي نرگس",
+]
+
+WEEKDAYS = ["شنبه", "يكشنبه", "دوشنبه", "سه شنبه", "چهارشنبه", "پنجشنبه"]
+SLOTS = ["08:00-10:00", "10:00-12:00", "13:00-15:00", "15:00-17:00", "17:00-19:00"]
+EXAM_SLOTS = ["08:00-10:00", "10:30-12:30", "13:30-15:30", "16:00-18:00"]
+
+FACULTIES = [
+    "143 - دانشكده فني و مهندسي",
+    "144 - دانشكده علوم پايه",
+    "145 - دانشكده علوم انساني",
+    "146 - دانشكده مديريت",
+]
+
+GROUP_LEVEL_TEXT = "ارائه در سطح گروه آموزشی"
+FACULTY_LEVEL_TEXT = "ارائه در سطح دانشکده"
+LEVELS = [GROUP_LEVEL_TEXT, FACULTY_LEVEL_TEXT, "ارائه در سطح واحد"]
+
+
+def generate_rows(count: int, seed: int = 1403) -> list[dict]:
+    rng = random.Random(seed)
+    rows = []
+    for index in range(count):
+        course_index = rng.randrange(len(COURSE_NAMES))
+        faculty = rng.choice(FACULTIES)
+        faculty_code = faculty.split(" ", 1)[0]
+        capacity = rng.choice([25, 30, 35, 40, 45, 60])
+
+        sessions = []
+        for _ in range(rng.choice([1, 1, 2])):
+            session = f"درس(ت): {rng.choice(WEEKDAYS)} {rng.choice(SLOTS)}"
+            week = rng.random()
+            if week < 0.1:
+                session += " فرد"
+            elif week < 0.2:
+                session += " زوج"
+            sessions.append(session)
+
+        rows.append(
+            {
+                "كد درس": f"{1110000 + course_index * 7:07d}",
+                "نام درس": COURSE_NAMES[course_index],
+                "نوع درس": rng.choice(["نظري", "عملي", "نظري-عملي"]),
+                "تعداد واحد نظري": str(rng.choice([0, 1, 2, 3])),
+                "تعداد واحد عملي": str(rng.choice([0, 0, 1])),
+                "كد ارائه کلاس درس": f"{40000000 + index:08d}",
+                "نام كلاس درس": f"{COURSE_NAMES[course_index]} - گروه {index % 9 + 1}",
+                "زمانبندي تشکيل کلاس": "، ".join(sessions),
+                "استاد": rng.choice(INSTRUCTORS),
+                "ساير اساتيد": rng.choice(["", "", "", rng.choice(INSTRUCTORS)]),
+                "حداكثر ظرفيت": str(capacity),
+                "تعداد ثبت نامي تاکنون": str(rng.randint(0, capacity)),
+                "زمان امتحان": (
+                    f"تاريخ: 1404/10/{rng.randint(10, 28):02d} "
+                    f"ساعت: {rng.choice(EXAM_SLOTS)}"
+                ),
+                "مكان برگزاري": f"ساختمان {rng.randint(1, 4)} - كلاس {rng.randint(101, 420)}",
+                "مقطع ارائه درس": rng.choice(["كارشناسي", "كارشناسي ارشد"]),
+                "نوع ارائه": "عادي",
+                "سطح ارائه": rng.choice(LEVELS),
+                "دانشجويان مجاز به اخذ کلاس": "همه دانشجويان",
+                "گروه آموزشی": f"{faculty_code}1 - گروه آموزشي {faculty_code}",
+                "دانشکده": faculty,
+                "واحد": "واحد تهران شمال",
+                "استان": "تهران",
+            }
+        )
+    return rows
+
+
+def asset_payload(header: str, size: int, seed: int) -> bytes:
+    """``header`` padded to ``size`` bytes with filler that does not compress.
+
+    A header ending in ``/*`` gets the filler as a closed CSS/JS comment.
+    """
+    rng = random.Random(seed)
+    filler = "".join(chr(rng.randrange(32, 127)) for _ in range(max(0, size - len(header))))
+    if header.endswith("/*"):
+        filler = filler[:-2].replace("*/", "**") + "*/"
+    return (header + filler).encode("latin-1")
+
+
+# Static files of the real portal, at roughly their real sizes. Only the
+# script is needed to drive the pages; the rest is what --lean skips.
+ASSETS = {
+    "/eservices/css/eserv.css": (
+        "text/css",
+        asset_payload(
+            "@font-face{font-family:Sahel;src:url(/EServices/fonts/sahel.woff)}"
+            "body{font-family:Sahel,Tahoma}"
+            "table.layout{background:url(/EServices/images/header-bg.png)}/*",
+            48 * 1024,
+            1,
+        ),
+    ),
+    "/eservices/js/eserv.js": (
+        "application/javascript",
+        asset_payload("window.eserv={version:1};/*", 64 * 1024, 2),
+    ),
+    "/eservices/images/logo.png": ("image/png", asset_payload("\x89PNG", 24 * 1024, 3)),
+    "/eservices/images/header-bg.png": (
+        "image/png",
+        asset_payload("\x89PNG", 36 * 1024, 4),
+    ),
+    "/eservices/fonts/sahel.woff": ("font/woff", asset_payload("wOFF", 72 * 1024, 5)),
+}
+ASSET_HEAD = (
+    '<link rel="stylesheet" href="/EServices/css/eserv.css">'
+    '<script src="/EServices/js/eserv.js"></script>'
+)
+ASSET_BODY = '<img src="/EServices/images/logo.png" alt="">'
+
+
+def with_assets(body: str) -> str:
+    return body.replace("</head>", ASSET_HEAD + "</head>", 1).replace(
+        "<body>", "<body>" + ASSET_BODY, 1
+    )
+
+
+def page_info_text(start: int, end: int, total: int) -> str:
+    return f"نتايج جستجو (ركورد {start} تا {end} از {total} ركورد)"
+
+
+class StandInState:
+    def __init__(
+        self,
+        rows: list[dict],
+        latency_ms: int = 0,
+        jitter_ms: int = 0,
+        auto_login: bool = True,
+        assets: bool = True,
+        asset_max_age: int = 0,
+    ) -> None:
+        self.rows = rows
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.auto_login = auto_login
+        self.assets = assets
+        self.asset_max_age = asset_max_age
+        self.sessions: set[str] = set()
+        self.stats = {
+            "requests": 0,
+            "result_pages": 0,
+            "rows_served": 0,
+            "bytes": 0,
+            "asset_requests": 0,
+            "asset_bytes": 0,
+        }
+        self.lock = threading.Lock()
+        self._rng = random.Random(0)
+
+    def new_session(self) -> str:
+        with self.lock:
+            session_id = f"standin{len(self.sessions) + 1:06d}"
+            self.sessions.add(session_id)
+        return session_id
+
+    def delay(self) -> None:
+        if not self.latency_ms and not self.jitter_ms:
+            return
+        with self.lock:
+            jitter = self._rng.uniform(0, self.jitter_ms) if self.jitter_ms else 0
+        time.sleep((self.latency_ms + jitter) / 1000)
+
+    def count(self, key: str, amount: int = 1) -> None:
+        with self.lock:
+            self.stats[key] += amount
+
+
+def render_login_page() -> str:
+    return """<!DOCTYPE html>
+<html dir="rtl"><head><meta charset="utf-8"><title>ورود به سيستم</title></head>
+<body>
+<form method="post" action="/EServices/loginAction.do">
+  <input type="text" name="username">
+  <input type="password" name="password">
+  <input type="submit" value="ورود">
+</form>
+</body></html>"""
+
+
+def render_dashboard() -> str:
+    return """<!DOCTYPE html>
+<html dir="rtl"><head><meta charset="utf-8"><title>آموزشيار</title></head>
+<body>
+<div>سيستم آموزشيار</div>
+<iframe name="menu" src="/EServices/cache?a=menu" width="300" height="600"></iframe>
+</body></html>"""
+
+
+def render_menu() -> str:
+    return """<!DOCTYPE html>
+<html dir="rtl"><head><meta charset="utf-8"></head>
+<body>
+<div onclick="document.getElementById('planning').style.display='block'">برنامه ريزي آموزشي نيمسال تحصيلي</div>
+<div id="planning">
+  <a target="_top" href="/EServices/handleCourseClassSearchAction.do?dispatch=selectStudentParameter&amp;subject=CourseClass">جستجوي كلاس درسهای ارائه شده</a>
+</div>
+</body></html>"""
+
+
+def render_search_page(
+    rows: list[dict] | None,
+    row_count: int,
+    start_row: int,
+) -> str:
+    options = "".join(
+        f'<option value="{n}"{" selected" if n == row_count else ""}>{n}</option>'
+        for n in (10, 20, 50, 100)
+    )
+    parts = [
+        """<!DOCTYPE html>
+<html dir="rtl"><head><meta charset="utf-8"><title>جستجوي كلاس درس</title></head>
+<body>
+<table class="layout" width="100%"><tr><td>
+<h3>جستجوي كلاس درس</h3>
+<form name="searchForm" method="post" action="/EServices/handleCourseClassSearchAction.do">
+  <input type="hidden" name="dispatch" value="search">
+""",
+        f'  <input type="hidden" name="parameter(startRow)" value="{start_row}">\n',
+        f'  <select name="parameter(rowCount)">{options}</select>\n',
+        """  <input id="submitBtn" type="submit" value="جستجو"
+    onclick="this.form['parameter(startRow)'].value='0'">
+</form>
+""",
+    ]
+
+    if rows is not None:
+        total = len(rows)
+        page_rows = rows[start_row : start_row + row_count]
+        end_row = start_row + len(page_rows)
+        banner = page_info_text(start_row + 1 if page_rows else 0, end_row, total)
+        parts.append(f'<div class="pageInfo">{banner}</div>\n')
+
+        parts.append('<table class="results" border="1"><tr><td>رديف</td>')
+        parts.extend(f"<td>{html.escape(col)}</td>" for col in COLUMNS)
+        parts.append("</tr>\n")
+        for offset, row in enumerate(page_rows, start=start_row + 1):
+            parts.append(f"<tr><td>{offset}</td>")
+            parts.extend(f"<td>{html.escape(row.get(col, ''))}</td>" for col in COLUMNS)
+            parts.append("</tr>\n")
+        parts.append(f'<tr><td colspan="{len(COLUMNS) + 1}">{banner}</td></tr>\n')
+        parts.append("</table>\n")
+
+        has_next = end_row < total
+        disabled = "" if has_next else " disabled"
+        parts.append(
+            f'<input type="button" value="صفحه بعد"{disabled} '
+            "onclick=\"var f=document.forms.searchForm;"
+            f"f['parameter(startRow)'].value='{end_row}';f.submit();\">\n"
+        )
+
+    parts.append("</td></tr></table>\n</body></html>")
+    return "".join(parts)
+
+
+def make_handler(state: StandInState):
+    class StandInHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args) -> None:  # noqa: A002
+            pass
+
+        def session_id(self) -> str:
+            for part in (self.headers.get("Cookie") or "").split(";"):
+                name, _, value = part.strip().partition("=")
+                if name == SESSION_COOKIE and value in state.sessions:
+                    return value
+            return ""
+
+        def send_html(self, body: str, status: int = 200, cookie: str = "") -> None:
+            if state.assets:
+                body = with_assets(body)
+            payload = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            if cookie:
+                self.send_header("Set-Cookie", f"{SESSION_COOKIE}={cookie}; Path=/")
+            self.end_headers()
+            self.wfile.write(payload)
+            state.count("bytes", len(payload))
+
+        def send_asset(self, content_type: str, payload: bytes) -> None:
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(payload)))
+            if state.asset_max_age:
+                self.send_header("Cache-Control", f"max-age={state.asset_max_age}")
+            else:
+                self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            self.wfile.write(payload)
+            state.count("bytes", len(payload))
+            state.count("asset_requests")
+            state.count("asset_bytes", len(payload))
+
+        def redirect(self, location: str, cookie: str = "") -> None:
+            self.send_response(302)
+            self.send_header("Location", location)
+            self.send_header("Content-Length", "0")
+            if cookie:
+                self.send_header("Set-Cookie", f"{SESSION_COOKIE}={cookie}; Path=/")
+            self.end_headers()
+
+        def read_form(self) -> dict[str, str]:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length).decode("utf-8") if length else ""
+            return {k: v[-1] for k, v in parse_qs(body).items()}
+
+        def do_GET(self) -> None:
+            self.handle_request({})
+
+        def do_POST(self) -> None:
+            self.handle_request(self.read_form())
+
+        def handle_request(self, form: dict[str, str]) -> None:
+            state.count("requests")
+            parts = urlsplit(self.path)
+            path = parts.path.rstrip("/").lower()
+            query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+            session = self.session_id()
+
+            if state.assets and path in ASSETS:
+                state.delay()
+                self.send_asset(*ASSETS[path])
+                return
+
+            if path in {"", "/eservices/loginpage.jsp"}:
+                cookie = ""
+                if state.auto_login and not session:
+                    cookie = state.new_session()
+                self.send_html(render_login_page(), cookie=cookie)
+                return
+
+            if path == "/eservices/loginaction.do":
+                self.redirect("/EServices/startAction.do", cookie=state.new_session())
+                return
+
+            if not session:
+                self.redirect("/EServices/loginPage.jsp")
+                return
+
+            state.delay()
+
+            if path == "/eservices/startaction.do":
+                self.send_html(render_dashboard())
+            elif path == "/eservices/cache" and query.get("a") == "menu":
+                self.send_html(render_menu())
+            elif path == "/eservices/handlecourseclasssearchaction.do":
+                if form.get("dispatch") != "search":
+                    self.send_html(render_search_page(None, 10, 0))
+                    return
+                row_count = int(form.get("parameter(rowCount)") or 10)
+                start_row = max(0, int(form.get("parameter(startRow)") or 0))
+                state.count("result_pages")
+                state.count(
+                    "rows_served", max(0, min(row_count, len(state.rows) - start_row))
+                )
+                self.send_html(render_search_page(state.rows, row_count, start_row))
+            else:
+                self.send_html("<html><body>Not found</body></html>", status=404)
+
+    return StandInHandler
+
+
+class StandInServer:
+    """Threaded stand-in server that can be started in the background."""
+
+    def __init__(
+        self,
+        rows: int = 1000,
+        latency_ms: int = 0,
+        jitter_ms: int = 0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        seed: int = 1403,
+        auto_login: bool = True,
+        assets: bool = True,
+        asset_max_age: int = 0,
+    ) -> None:
+        self.state = StandInState(
+            generate_rows(rows, seed),
+            latency_ms=latency_ms,
+            jitter_ms=jitter_ms,
+            auto_login=auto_login,
+            assets=assets,
+            asset_max_age=asset_max_age,
+        )
+        self.httpd = ThreadingHTTPServer((host, port), make_handler(self.state))
+        self.httpd.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def stats(self) -> dict:
+        with self.state.lock:
+            return dict(self.state.stats)
+
+    def start(self) -> "StandInServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "StandInServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--latency-ms", type=int, default=0)
+    parser.add_argument("--jitter-ms", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=1403)
+    parser.add_argument(
+        "--require-login",
+        action="store_true",
+        help="Only issue a session after the login form is submitted.",
+    )
+    parser.add_argument(
+        "--no-assets",
+        dest="assets",
+        action="store_false",
+        help="Serve bare pages without the stylesheet, script, images and font.",
+    )
+    parser.add_argument(
+        "--asset-max-age",
+        type=int,
+        default=0,
+        help="Let browsers cache the static files for this many seconds.",
+    )
+    args = parser.parse_args()
+
+    server = StandInServer(
+        rows=args.rows,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        host=args.host,
+        port=args.port,
+        seed=args.seed,
+        auto_login=not args.require_login,
+        assets=args.assets,
+        asset_max_age=args.asset_max_age,
+    )
+    print(f"Stand-in serving {args.rows} rows at {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""A scripted stand-in for the Playwright page the navigation steps drive."""
+
+import main
+
+
+def banner(start: int, end: int, total: int) -> str:
+    return f"نتايج جستجو (ركورد {start} تا {end} از {total} ركورد)"
+
+
+class FakeLocator:
+    def __init__(self, page) -> None:
+        self.page = page
+
+    def count(self):
+        return self.page.result(0)
+
+
+class FakeRequest:
+    resource_type = "document"
+    method = "POST"
+    headers = {"content-type": "application/x-www-form-urlencoded"}
+
+    def __init__(self, start_row: int) -> None:
+        self.url = FakeResultsPage.url
+        self.post_data = f"dispatch=search&parameter(startRow)={start_row}"
+
+
+class FakeResultsPage:
+    """Result pages behind the Playwright calls the navigation steps make.
+
+    With ``is_async`` every call returns a coroutine, as on the async API.
+    """
+
+    url = "https://example.test/EServices/handleCourseClassSearchAction.do"
+
+    def __init__(
+        self, pages: list[dict], is_async: bool = False, failures=()
+    ) -> None:
+        self.pages = pages
+        self.index = 0
+        self.is_async = is_async
+        self.failures = list(failures)
+        self.listeners = []
+        # Index of the page a rewritten (routed) next-page click lands on.
+        self.route_lands_on = None
+        self.routed = False
+        # Result pages served by each later search, in order.
+        self.next_searches: list[list[dict]] = []
+        self.searches = 0
+        self.pauses: list[int] = []
+
+    def result(self, value):
+        if not self.is_async:
+            if isinstance(value, Exception):
+                raise value
+            return value
+
+        async def later():
+            if isinstance(value, Exception):
+                raise value
+            return value
+
+        return later()
+
+    def on(self, event, listener) -> None:
+        self.listeners.append(listener)
+
+    def remove_listener(self, event, listener) -> None:
+        self.listeners.remove(listener)
+
+    def route(self, matcher, handler, times=None):
+        self.routed = True
+        return self.result(None)
+
+    def unroute(self, matcher, handler):
+        return self.result(None)
+
+    def locator(self, selector):
+        return FakeLocator(self)
+
+    def wait_for_function(self, script, arg=None, polling=None, timeout=None):
+        if self.failures:
+            return self.result(self.failures.pop(0))
+        return self.result(True)
+
+    def wait_for_timeout(self, ms):
+        self.pauses.append(ms)
+        return self.result(None)
+
+    def evaluate(self, script, arg=None):
+        if script == main.EXTRACT_TABLE_JS:
+            return self.result({**self.pages[self.index], "layout": None})
+        if script == main.RESULT_SUMMARY_JS:
+            return self.result(self.pages[self.index]["pageInfo"])
+        if script == main.CLICK_SEARCH_JS:
+            self.searches += 1
+            if self.next_searches:
+                self.pages = self.next_searches.pop(0)
+            self.index = 0
+            return self.result(True)
+        if script == main.NEXT_PAGE_DISABLED_JS:
+            return self.result(self.index == len(self.pages) - 1)
+        if script == main.CLICK_NEXT_PAGE_JS:
+            if self.routed:
+                self.routed = False
+                self.index = self.route_lands_on
+            else:
+                self.index += 1
+            page_size = len(self.pages[0]["rows"])
+            for listener in self.listeners:
+                listener(FakeRequest(self.index * page_size))
+            return self.result(True)
+        raise AssertionError(f"unexpected script {script[:40]!r}")
+
+
+def result_pages(sizes: list[int]) -> list[dict]:
+    total = sum(sizes)
+    pages = []
+    start = 1
+    for size in sizes:
+        rows = [[str(start + offset), "x"] for offset in range(size)]
+        pages.append(
+            {
+                "headers": ["كد ارائه کلاس درس", "نام درس"],
+                "rows": rows,
+                "pageInfo": banner(start, start + size - 1, total),
+            }
+        )
+        start += size
+    return pages
+
+
@@ -0,0 +1,161 @@
+import asyncio
+import json
+
+import pytest
+
+import main
+from fake_page import FakeResultsPage, banner, result_pages
+from main import ScrapeCheckpoint, page_info_bounds, page_number_of
+
+main.load_browser()
+
+
+def rows_of(page: dict) -> list[dict]:
+    return main.rows_as_dicts(page)
+
+
+def test_page_info_bounds():
+    assert page_info_bounds(banner(101, 200, 250)) == (101, 200, 250)
+    assert page_info_bounds("no banner") is None
+    assert page_info_bounds("") is None
+
+
+def test_page_number_of_full_pages():
+    assert page_number_of(banner(1, 100, 250)) == 1
+    assert page_number_of(banner(101, 200, 250)) == 2
+
+
+def test_page_number_of_short_last_page_needs_the_page_size():
+    assert page_number_of(banner(201, 250, 250), 100) == 3
+    # Its own 50-row range would put it on page 5.
+    assert page_number_of(banner(201, 250, 250)) == 5
+
+
+def test_page_number_of_unreadable_banner():
+    assert page_number_of("") is None
+    assert page_number_of(banner(10, 5, 20)) is None
+
+
+def test_checkpoint_indexes_pages_and_skips_repeats(tmp_path):
+    pages = result_pages([2, 2, 1])
+    checkpoint = ScrapeCheckpoint(tmp_path / "scrape.jsonl")
+    # Out of order and repeated, as after a resumed walk.
+    for page in (pages[1], pages[0], pages[1], pages[2]):
+        checkpoint.append(page["pageInfo"], rows_of(page))
+
+    assert checkpoint.row_count == 5
+    assert checkpoint.page_size == 2
+    assert checkpoint.total == 5
+    assert checkpoint.first_missing_page() is None
+    assert [row["كد ارائه کلاس درس"] for row in checkpoint.iter_rows()] == [
+        "1",
+        "2",
+        "3",
+        "4",
+        "5",
+    ]
+    checkpoint.close()
+
+
+def test_resume_reloads_the_index_and_drops_a_torn_last_line(tmp_path):
+    path = tmp_path / "scrape.jsonl"
+    pages = result_pages([2, 2, 1])
+    checkpoint = ScrapeCheckpoint(path)
+    checkpoint.append(pages[0]["pageInfo"], rows_of(pages[0]))
+    checkpoint.set_template({"url": "u", "post_data": None})
+    checkpoint.close()
+    with path.open("ab") as handle:
+        handle.write(json.dumps({"page_info": pages[1]["pageInfo"]}).encode()[:20])
+
+    resumed = ScrapeCheckpoint(path, resume=True)
+
+    assert resumed.known_pages == {pages[0]["pageInfo"]}
+    assert resumed.template == {"url": "u", "post_data": None}
+    assert resumed.first_missing_page() == 2
+    assert path.read_bytes().endswith(b"\n")
+    resumed.close()
+
+
+def test_resume_with_no_recorded_template(tmp_path):
+    path = tmp_path / "scrape.jsonl"
+    pages = result_pages([2, 2, 1])
+    checkpoint = ScrapeCheckpoint(path)
+    checkpoint.append(pages[0]["pageInfo"], rows_of(pages[0]))
+    checkpoint.close()
+
+    resumed = ScrapeCheckpoint(path, resume=True)
+
+    assert resumed.template is None
+    assert resumed.first_missing_page() == 2
+    resumed.close()
+
+
+def test_without_resume_the_file_starts_empty(tmp_path):
+    path = tmp_path / "scrape.jsonl"
+    path.write_text('{"page_info": "x", "rows": []}\n', encoding="utf-8")
+
+    checkpoint = ScrapeCheckpoint(path)
+
+    assert checkpoint.first_missing_page() == 1
+    assert path.read_bytes() == b""
+    checkpoint.close()
+
+
+def scrape(page, checkpoint, is_async: bool) -> list[dict]:
+    if not is_async:
+        return main.scrape_all_pages(page, checkpoint=checkpoint)
+    async_engine = pytest.importorskip("async_engine")
+    return asyncio.run(async_engine.scrape_all_pages(page, checkpoint=checkpoint))
+
+
+@pytest.mark.parametrize("is_async", [False, True])
+def test_resumed_scrape_without_template_steps_over_known_pages(tmp_path, is_async):
+    path = tmp_path / "scrape.jsonl"
+    pages = result_pages([2, 2, 1])
+    first = ScrapeCheckpoint(path)
+    first.append(pages[0]["pageInfo"], rows_of(pages[0]))
+    first.close()
+
+    checkpoint = ScrapeCheckpoint(path, resume=True)
+    returned = scrape(FakeResultsPage(pages, is_async), checkpoint, is_async)
+
+    assert returned == []
+    assert checkpoint.row_count == 5
+    assert checkpoint.first_missing_page() is None
+    checkpoint.close()
+    lines = path.read_text(encoding="utf-8").splitlines()
+    page_lines = [line for line in lines if "page_info" in line]
+    assert len(page_lines) == 3
+    # Two next-page clicks were watched, so the paging template is recorded.
+    with ScrapeCheckpoint(path, resume=True) as resumed:
+        assert resumed.template is not None
+
+
+@pytest.mark.parametrize("is_async", [False, True])
+def test_resumed_scrape_jumps_to_a_short_last_page(tmp_path, capsys, is_async):
+    path = tmp_path / "scrape.jsonl"
+    pages = result_pages([2, 2, 1])
+    first = ScrapeCheckpoint(path)
+    for page in pages[:2]:
+        first.append(page["pageInfo"], rows_of(page))
+    requests = [
+        {
+            "url": FakeResultsPage.url,
+            "method": "POST",
+            "post_data": f"parameter(startRow)={start_row}",
+            "content_type": "",
+        }
+        for start_row in (2, 4)
+    ]
+    first.set_template(main.build_page_template(*requests))
+    first.close()
+
+    fake = FakeResultsPage(pages, is_async)
+    fake.route_lands_on = 2
+    checkpoint = ScrapeCheckpoint(path, resume=True)
+    scrape(fake, checkpoint, is_async)
+
+    assert "Resumed at result page 3." in capsys.readouterr().out
+    assert checkpoint.row_count == 5
+    assert checkpoint.first_missing_page() is None
+    checkpoint.close()
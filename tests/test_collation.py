@@ -0,0 +1,56 @@
+import pandas as pd
+
+import main
+from main import normalize_persian_for_sort, persian_collation_keys, persian_sort_key
+
+main.load_reporting()
+
+
+def test_yeh_kaf_and_digit_variants_normalize_alike():
+    assert normalize_persian_for_sort("رياضي  عمومي ۱") == "ریاضی عمومی 1"
+    assert normalize_persian_for_sort("كامپيوتر") == "کامپیوتر"
+    assert normalize_persian_for_sort("اندیشه‌اسلامی") == "اندیشه اسلامی"
+    assert normalize_persian_for_sort(None) == ""
+
+
+def test_sort_key_follows_the_persian_alphabet():
+    # In codepoint order پ, چ and گ would come after ی.
+    names = ["یادگیری", "گرافیک", "پایگاه داده", "آمار", "بافت", "چاپ", "10", "2"]
+    ordered = sorted(names, key=persian_sort_key)
+    assert ordered == [
+        "10",
+        "2",
+        "آمار",
+        "بافت",
+        "پایگاه داده",
+        "چاپ",
+        "گرافیک",
+        "یادگیری",
+    ]
+
+
+def test_variant_spellings_get_equal_keys():
+    assert persian_sort_key("علي") == persian_sort_key("علی")
+    assert persian_sort_key("كريمي") == persian_sort_key("کریمی")
+
+
+def test_unknown_characters_sort_after_persian_letters():
+    assert persian_sort_key("ی") < persian_sort_key("A") < persian_sort_key("€")
+
+
+def test_collation_keys_rank_a_series():
+    series = pd.Series(["ساختمان داده ها", "آمار", None, "ساختمان داده ها", "رياضي"])
+    keys = persian_collation_keys(series)
+
+    assert list(keys.index) == list(series.index)
+    assert keys[0] == keys[3]
+    assert keys[2] < keys[1] < keys[4] < keys[0]
+    ordered = series.sort_values(key=persian_collation_keys, na_position="first")
+    assert ordered.tolist()[1:] == ["آمار", "رياضي", "ساختمان داده ها", "ساختمان داده ها"]
+
+
+def test_collation_table_is_shared_and_grows_lazily():
+    table = main.CollationTable()
+    assert table[ord("0")] == 0
+    assert table[ord("ا")] < table[ord("ی")] < table[ord("A")]
+    assert ord("A") in table
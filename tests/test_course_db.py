@@ -0,0 +1,62 @@
+import sqlite3
+
+import pytest
+
+import course_db
+
+
+def section(offering_code, name, instructor, faculty="143-فنی و مهندسی"):
+    return {
+        "كد درس": "11" + offering_code,
+        "كد ارائه کلاس درس": offering_code,
+        "دانشکده": faculty,
+        "گروه آموزشی": "کامپیوتر",
+        "نام درس": name,
+        "استاد": instructor,
+        "ساير اساتيد": "",
+    }
+
+
+ROWS = [
+    section("3", "یادگیری ماشین", "علي محمدي"),
+    section("1", "ساختمان داده ها", "علی محمدی"),
+    section("2", "پایگاه داده", "رضا كريمي"),
+    section("4", "آمار", "مریم احمدی", faculty="151-علوم پایه"),
+]
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(course_db.build_database(ROWS, tmp_path / "index.sqlite"))
+    yield conn
+    conn.close()
+
+
+def offering_codes(rows):
+    return [row["كد ارائه کلاس درس"] for row in rows]
+
+
+def test_rows_are_ordered_like_the_reports(conn):
+    # By codepoint پ and ی come after س; the reports put پ before س.
+    assert offering_codes(course_db.query(conn)) == ["4", "2", "1", "3"]
+
+
+def test_fts_matches_word_prefixes_across_spellings(conn):
+    assert course_db.has_fts(conn)
+    assert offering_codes(course_db.query(conn, instructor="محمدي")) == ["1", "3"]
+    assert offering_codes(course_db.query(conn, name="داد", instructor="علی")) == ["1"]
+    assert offering_codes(course_db.query(conn, name="پايگاه")) == ["2"]
+
+
+def test_like_fallback_without_fts(conn):
+    conn.execute("DROP TABLE sections_fts")
+    assert not course_db.has_fts(conn)
+    assert offering_codes(course_db.query(conn, instructor="محمدي")) == ["1", "3"]
+    assert offering_codes(course_db.query(conn, name="داده", instructor="كريمي")) == ["2"]
+
+
+def test_code_and_prefix_filters(conn):
+    assert offering_codes(course_db.query(conn, faculty="143")) == ["2", "1", "3"]
+    assert offering_codes(course_db.query(conn, course_code="113")) == ["3"]
+    assert offering_codes(course_db.query(conn, offering_code="4", faculty="143")) == []
+    assert len(course_db.query(conn, limit=2)) == 2
@@ -0,0 +1,44 @@
+import pytest
+
+import main
+
+main.load_reporting()
+
+
+def read_back(path):
+    workbook = main.openpyxl.load_workbook(path)
+    sheet = workbook.active
+    return sheet, [list(row) for row in sheet.iter_rows(values_only=True)]
+
+
+def test_rows_and_frames_round_trip(tmp_path):
+    path = tmp_path / "view.xlsx"
+    df = main.pd.DataFrame({"نام درس": ["آمار", None, "بافت"], "واحد": [3, 2, None]})
+    with main.StreamingExcelWriter(path, ["نام درس", "واحد"], sheet_title="دروس") as writer:
+        writer.append({"واحد": 1, "نام درس": "چاپ", "extra": "ignored"})
+        writer.append(["گرافیک", float("nan")])
+        writer.append_frame(df, chunk_rows=2)
+    assert writer.rows_written == 5
+
+    sheet, rows = read_back(path)
+    assert sheet.title == "دروس"
+    assert sheet.sheet_view.rightToLeft
+    assert sheet.freeze_panes == "A2"
+    assert sheet["A1"].font.bold
+    assert rows == [
+        ["نام درس", "واحد"],
+        ["چاپ", 1],
+        ["گرافیک", None],
+        ["آمار", 3],
+        [None, 2],
+        ["بافت", None],
+    ]
+
+
+def test_failed_write_leaves_no_file(tmp_path):
+    path = tmp_path / "view.xlsx"
+    with pytest.raises(ValueError):
+        with main.StreamingExcelWriter(path, ["a"]) as writer:
+            writer.append([1])
+            raise ValueError("boom")
+    assert not path.exists()
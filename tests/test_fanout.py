@@ -0,0 +1,93 @@
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+import main
+
+main.load_reporting()
+
+
+def courses(groups):
+    return main.pd.DataFrame(
+        {
+            "نام درس": [f"درس {index}" for index in range(len(groups))],
+            "دانشکده": ["فنی"] * len(groups),
+            "گروه آموزشی": groups,
+            "واحد": ["تهران"] * len(groups),
+        }
+    )
+
+
+@pytest.fixture
+def output_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "OUTPUT_DIR", tmp_path)
+    return tmp_path / main.FANOUT_DIR_NAME
+
+
+def fanout(df, **kwargs):
+    return main.fanout_reports(df, ["group"], workers=1, excel=False, **kwargs)
+
+
+def test_unchanged_partitions_are_skipped(output_dir):
+    first = fanout(courses(["برق", "برق", "عمران"]))
+    assert (first["partitions"], first["rendered"], first["skipped"]) == (2, 2, 0)
+    pdf = output_dir / "تهران" / "گروه آموزشی" / "عمران.pdf"
+    assert pdf.exists()
+    rendered_at = pdf.stat().st_mtime_ns
+
+    second = fanout(courses(["برق", "برق", "عمران"]))
+    assert (second["rendered"], second["skipped"]) == (0, 2)
+
+    changed = courses(["برق", "برق", "عمران"])
+    changed.loc[0, "نام درس"] = "درس تازه"
+    third = fanout(changed)
+    assert (third["rendered"], third["skipped"]) == (1, 1)
+    assert pdf.stat().st_mtime_ns == rendered_at
+    assert fanout(changed, force=True)["rendered"] == 2
+
+
+def test_partitions_that_disappear_are_deleted(output_dir):
+    fanout(courses(["برق", "عمران"]))
+    folder = output_dir / "تهران" / "گروه آموزشی"
+    assert sorted(path.name for path in folder.iterdir()) == ["برق.pdf", "عمران.pdf"]
+
+    result = fanout(courses(["برق", "برق"]))
+    assert result["removed"] == 1
+    assert [path.name for path in folder.iterdir()] == ["برق.pdf"]
+
+    moved = courses(["برق"])
+    moved["واحد"] = "شیراز"
+    fanout(moved)
+    assert not (output_dir / "تهران").exists()
+
+
+class BrokenPool:
+    """A process pool whose workers all die."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        self.submitted = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def submit(self, *args):
+        self.submitted += 1
+        future = Future()
+        future.set_exception(BrokenProcessPool("worker died"))
+        return future
+
+
+def test_broken_pool_requeues_partitions_in_process(output_dir, monkeypatch, capsys):
+    monkeypatch.setattr(main, "ProcessPoolExecutor", BrokenPool)
+    result = main.fanout_reports(
+        courses(["برق", "عمران", "مکانیک"]), ["group"], workers=2, excel=False
+    )
+
+    assert result["rendered"] == 3
+    assert "rendering in-process" in capsys.readouterr().out
+    folder = output_dir / "تهران" / "گروه آموزشی"
+    assert len(list(folder.glob("*.pdf"))) == 3
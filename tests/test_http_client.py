@@ -0,0 +1,67 @@
+import pytest
+
+import main
+from standin_server import SESSION_COOKIE, StandInServer
+
+
+def page_request(server, start_row):
+    return {
+        "method": "POST",
+        "url": f"{server.base_url}/EServices/handleCourseClassSearchAction.do",
+        "post_data": (
+            f"dispatch=search&parameter(startRow)={start_row}&parameter(rowCount)=100"
+        ),
+        "content_type": "application/x-www-form-urlencoded",
+    }
+
+
+def session_state(server, session):
+    return {
+        "cookies": [
+            {"name": SESSION_COOKIE, "value": session, "domain": "127.0.0.1", "path": "/"},
+            {"name": "other", "value": "x", "domain": "example.com", "path": "/"},
+        ]
+    }
+
+
+@pytest.fixture
+def server():
+    with StandInServer(rows=250, assets=False) as server:
+        yield server
+
+
+def test_cookie_header_matches_domain_path_and_scheme():
+    client = main.SessionHTTPClient(
+        {
+            "cookies": [
+                {"name": "a", "value": "1", "domain": ".uni.ac.ir", "path": "/"},
+                {"name": "b", "value": "2", "domain": "edu.uni.ac.ir", "path": "/EServices"},
+                {"name": "c", "value": "3", "domain": "uni.ac.ir", "path": "/", "secure": True},
+                {"name": "d", "value": "4", "domain": "other.ir", "path": "/"},
+            ]
+        }
+    )
+    assert client.cookie_header("http://edu.uni.ac.ir/EServices/x.do") == "a=1; b=2"
+    assert client.cookie_header("https://edu.uni.ac.ir/") == "a=1; c=3"
+
+
+def test_pages_are_fetched_on_the_browser_session(server):
+    template = main.build_page_template(page_request(server, 100), page_request(server, 200))
+    client = main.SessionHTTPClient(session_state(server, server.state.new_session()))
+    try:
+        second = main.fetch_page_http(client, template, 2)
+        last = main.fetch_page_http(client, template, 3)
+    finally:
+        client.dispose()
+    assert main.page_info_bounds(second["pageInfo"]) == (101, 200, 250)
+    assert main.page_info_bounds(last["pageInfo"]) == (201, 250, 250)
+    assert len(last["rows"]) == 50
+    assert server.stats["result_pages"] == 2
+
+
+def test_expired_session_fails_instead_of_following_the_login_redirect(server):
+    template = main.build_page_template(page_request(server, 100), page_request(server, 200))
+    client = main.SessionHTTPClient(session_state(server, "expired"))
+    with pytest.raises(RuntimeError, match="HTTP 302"):
+        main.fetch_page_http(client, template, 2)
+    client.dispose()
@@ -0,0 +1,171 @@
+import asyncio
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import main
+from fake_page import FakeResultsPage, banner, result_pages
+
+main.load_browser()
+async_engine = pytest.importorskip("async_engine")
+
+
+def run(steps, is_async: bool, on_rows=None):
+    if not is_async:
+        return main.run_steps(steps, on_rows)
+
+    async_on_rows = None
+    if on_rows is not None:
+
+        async def async_on_rows(found):
+            return on_rows(found)
+
+    return asyncio.run(async_engine.run_steps(steps, async_on_rows))
+
+
+@pytest.mark.parametrize("is_async", [False, True])
+def test_condition_wait_is_rearmed_after_navigation(is_async):
+    page = FakeResultsPage([], is_async, failures=[main.PlaywrightError("navigated")])
+
+    assert run(main.wait_for_condition_steps(page, "() => true"), is_async) is True
+    assert page.failures == []
+    assert page.pauses == [50]
+
+
+@pytest.mark.parametrize("is_async", [False, True])
+def test_condition_wait_gives_up_after_repeated_errors(is_async):
+    errors = [main.PlaywrightError(f"closed {n}") for n in range(main.CONDITION_RETRY_LIMIT)]
+    page = FakeResultsPage([], is_async, failures=errors)
+
+    with pytest.raises(main.PlaywrightError, match="closed"):
+        run(main.wait_for_condition_steps(page, "() => true"), is_async)
+    assert page.failures == []
+    assert page.pauses[:3] == [50, 100, 150]
+    assert max(page.pauses) == 500
+
+
+@pytest.mark.parametrize("is_async", [False, True])
+def test_condition_wait_times_out(is_async):
+    page = FakeResultsPage([], is_async, failures=[main.PlaywrightTimeoutError("late")])
+
+    assert run(main.wait_for_condition_steps(page, "() => true"), is_async) is False
+
+
+@pytest.mark.parametrize("is_async", [False, True])
+def test_scrape_walk_yields_every_page_once(is_async):
+    page = FakeResultsPage(result_pages([2, 2, 1]), is_async)
+    found = []
+
+    run(main.scrape_steps(page), is_async, lambda item: found.append(item))
+
+    assert [item.page_info for item in found] == [
+        banner(1, 2, 5),
+        banner(3, 4, 5),
+        banner(5, 5, 5),
+    ]
+    assert [len(item.extracted["rows"]) for item in found] == [2, 2, 1]
+
+
+@pytest.mark.parametrize("is_async", [False, True])
+def test_scrape_walk_steps_over_known_pages_and_stops_on_false(is_async):
+    page = FakeResultsPage(result_pages([2, 2, 2, 2]), is_async)
+    found = []
+
+    def on_rows(item):
+        found.append(item.page_info)
+        return len(found) < 2
+
+    run(main.scrape_steps(page, known_pages={banner(1, 2, 8)}), is_async, on_rows)
+
+    assert found == [banner(3, 4, 8), banner(5, 6, 8)]
+
+
+def test_ask_prompts_on_the_terminal(monkeypatch, capsys):
+    monkeypatch.setattr("builtins.input", lambda *_: "")
+
+    def steps():
+        yield main.Ask("press Enter")
+        return "done"
+
+    assert main.run_steps(steps()) == "done"
+    assert "press Enter" in capsys.readouterr().out
+
+
+def test_async_engine_follows_a_reloaded_main():
+    # Reload in a child process so this test run keeps its own main module.
+    script = """
+import asyncio, importlib
+import async_engine, main
+importlib.reload(main)
+main.load_browser()
+
+def steps():
+    keep_going = yield main.PageRows("page", [], 1, 0.0)
+    return keep_going
+
+async def on_rows(found):
+    return found.page_info
+
+assert asyncio.run(async_engine.run_steps(steps(), on_rows)) == "page"
+"""
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=Path(main.__file__).parent,
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr
+
+
+def test_prompts_are_serialized_in_every_event_loop(monkeypatch, capsys):
+    monkeypatch.setattr("builtins.input", lambda *_: "")
+
+    async def two_sessions():
+        lock = asyncio.Lock()
+        await asyncio.gather(
+            async_engine.prompt("first", lock), async_engine.prompt("second", lock)
+        )
+
+    asyncio.run(two_sessions())
+    asyncio.run(two_sessions())
+    assert capsys.readouterr().out.split() == ["first", "second", "first", "second"]
+
+
+def test_companions_share_the_script_module():
+    # As under ``python main.py``, main.py is loaded under another name.
+    script = """
+import importlib.util, sys
+spec = importlib.util.spec_from_file_location("app", "main.py")
+app = importlib.util.module_from_spec(spec)
+sys.modules["app"] = app
+spec.loader.exec_module(app)
+app.load_browser()
+assert app.load_companion("async_engine").main is app
+assert sys.modules["main"] is app
+"""
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=Path(main.__file__).parent,
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr
+
+
+def test_session_options():
+    args = main.parse_args(
+        ["scrape", "--engine", "async", "--session", "a=state.json", "--session", "b"]
+    )
+    assert args.sessions == [
+        {"name": "a", "storage_state": "state.json"},
+        {"name": "b", "storage_state": None},
+    ]
+    for argv in (
+        ["scrape", "--session", "a"],
+        ["scrape", "--engine", "async", "--session", "a", "--lean"],
+        ["scrape", "--engine", "async", "--session", "bad name"],
+    ):
+        with pytest.raises(SystemExit):
+            main.parse_args(argv)
@@ -0,0 +1,92 @@
+import pytest
+
+import main
+
+main.load_reporting()
+
+
+@pytest.fixture(scope="module")
+def style():
+    return main.ParagraphStyle("cell", fontName=main.worker_font(), fontSize=8)
+
+
+def test_one_line_cells_stay_plain_strings(style):
+    df = main.pd.DataFrame({"نام درس": ["آمار", None], "استاد": ["الف", ""]})
+    rows, row_lines = main.build_body_rows(df, style, 40, [200, 200])
+
+    shape = main.SHAPING_CACHE.shape
+    assert rows == [[shape("آمار"), shape("الف")], ["", ""]]
+    assert row_lines == [1, 1]
+
+
+def test_long_cells_become_paragraphs_with_line_counts(style):
+    long_text = "مبانی برنامه نویسی کامپیوتر و ساختمان داده ها و الگوریتم ها"
+    df = main.pd.DataFrame({"نام درس": [long_text, "آمار"], "استاد": ["الف", "ب"]})
+    rows, row_lines = main.build_body_rows(df, style, [12, 40], [60, 200])
+
+    assert isinstance(rows[0][0], main.Paragraph)
+    assert isinstance(rows[1][0], str)
+    assert row_lines[0] >= len(main.wrap_lines(long_text, 12)) > 1
+    assert row_lines[1] == 1
+
+
+def test_repeated_values_share_one_layout(style, monkeypatch):
+    calls = []
+    layout = main.cell_layout
+
+    def counting_layout(*args):
+        calls.append(args[0])
+        return layout(*args)
+
+    monkeypatch.setattr(main, "cell_layout", counting_layout)
+    df = main.pd.DataFrame({"استاد": ["الف", "ب", "الف", "الف"]})
+    rows, _ = main.build_body_rows(df, style, 40, [200])
+
+    assert len(calls) == 2
+    assert rows[0] == rows[2] == rows[3]
+
+
+def test_column_widths_follow_content():
+    font = main.worker_font()
+    df = main.pd.DataFrame(
+        {
+            "كد": ["1", "2", "3"],
+            "نام درس": ["مبانی برنامه نویسی", "ساختمان داده ها", "آمار و احتمال مهندسی"],
+            "استاد": ["الف", "ب", "پ"],
+        }
+    )
+    widths, wrap_chars = main.plan_column_widths(df, font, table_width=600, min_width=30)
+
+    assert sum(widths) == pytest.approx(600)
+    assert min(widths) >= 30
+    assert widths[1] > widths[2] and widths[1] > widths[0]
+    assert wrap_chars[1] > wrap_chars[0]
+    assert min(wrap_chars) >= 6
+    assert main.plan_column_widths(df, font, table_width=600, min_width=30) == (
+        widths,
+        wrap_chars,
+    )
+
+
+def test_column_widths_keep_the_floor_when_the_table_is_tight():
+    font = main.worker_font()
+    df = main.pd.DataFrame(
+        {"نام درس": ["مبانی برنامه نویسی کامپیوتر" * 3], "کد": ["1"], "واحد": ["3"]}
+    )
+    widths, _ = main.plan_column_widths(df, font, table_width=200, min_width=40)
+
+    assert widths[1:] == [pytest.approx(40), pytest.approx(40)]
+    assert sum(widths) == pytest.approx(200)
+
+
+def test_column_width_covers_the_longest_header_word():
+    font = main.worker_font()
+    header = "دانشجويان مجاز به اخذ کلاس"
+    df = main.pd.DataFrame({header: ["1", "2"], "نام درس": ["آمار", "بافت"]})
+    widths, _ = main.plan_column_widths(df, font, table_width=1000, min_width=1)
+
+    longest_word = max(
+        main.pdfmetrics.stringWidth(main.SHAPING_CACHE.shape(word), font, 8)
+        for word in header.split()
+    )
+    assert widths[0] >= longest_word
@@ -0,0 +1,131 @@
+import main
+from course_planner import (
+    COURSE_CODE_COLUMN,
+    best_timetables,
+    course_options,
+    iter_timetables,
+    run,
+)
+from course_schedule import EXAM_COLUMN, SCHEDULE_COLUMN
+
+main.load_reporting()
+
+SECTION_COLUMN = "كد ارائه کلاس درس"
+
+
+def section(course, offering, schedule, exam="", capacity=30, enrolled=0):
+    return {
+        COURSE_CODE_COLUMN: course,
+        SECTION_COLUMN: offering,
+        SCHEDULE_COLUMN: schedule,
+        EXAM_COLUMN: exam,
+        "حداكثر ظرفيت": str(capacity),
+        "تعداد ثبت نامي تاکنون": str(enrolled),
+    }
+
+
+def offerings(timetable):
+    return [option.sections[0][SECTION_COLUMN] for option in timetable]
+
+
+def plan(rows, codes, **kwargs):
+    options = course_options(main.pd.DataFrame(rows), codes, **kwargs)
+    return list(options.values())
+
+
+def test_odd_and_even_week_sessions_do_not_clash():
+    options = plan(
+        [
+            section("A", "a1", "درس(ت): دوشنبه 10:00-12:00 فرد"),
+            section("B", "b1", "درس(ت): دوشنبه 10:00-12:00 زوج"),
+            section("C", "c1", "درس(ت): دوشنبه 11:00-12:00"),
+        ],
+        ["A", "B"],
+    )
+    assert [offerings(chosen) for *_, chosen in best_timetables(options)] == [["a1", "b1"]]
+    with_weekly = plan(
+        [
+            section("A", "a1", "درس(ت): دوشنبه 10:00-12:00 فرد"),
+            section("C", "c1", "درس(ت): دوشنبه 11:00-12:00"),
+        ],
+        ["A", "C"],
+    )
+    assert best_timetables(with_weekly) == []
+
+
+def test_exam_date_without_time_blocks_the_day():
+    rows = [
+        section("A", "a1", "درس(ت): شنبه 08:00-10:00", "تاريخ: 1404/10/15"),
+        section("B", "b1", "درس(ت): یکشنبه 08:00-10:00", "تاريخ: 1404/10/15 ساعت: 15:00-17:00"),
+        section("B", "b2", "درس(ت): یکشنبه 10:00-12:00", "تاريخ: 1404/10/16 ساعت: 15:00-17:00"),
+    ]
+    results = best_timetables(plan(rows, ["A", "B"]))
+    assert [offerings(chosen) for *_, chosen in results] == [["a1", "b2"]]
+
+
+def test_ranking_by_fewest_then_total_free_seats():
+    rows = [
+        section("A", "a1", "درس(ت): شنبه 08:00-10:00", enrolled=25),
+        section("A", "a2", "درس(ت): شنبه 10:00-12:00", enrolled=10),
+        section("B", "b1", "درس(ت): شنبه 10:00-12:00", enrolled=20),
+        section("B", "b2", "درس(ت): دوشنبه 10:00-12:00", enrolled=28),
+        section("B", "b3", "درس(ت): سه شنبه 10:00-12:00", enrolled=30),
+    ]
+    options = plan(rows, ["A", "B"])
+    results = best_timetables(options, limit=3)
+    assert [(low, total, offerings(chosen)) for low, total, chosen in results] == [
+        (5, 15, ["a1", "b1"]),
+        (2, 22, ["a2", "b2"]),
+        (2, 7, ["a1", "b2"]),
+    ]
+    assert best_timetables(options, limit=1)[0][:2] == (5, 15)
+    # Full sections are only used when asked for.
+    assert len(plan(rows, ["B"])[0]) == 2
+    assert len(plan(rows, ["B"], include_full=True)[0]) == 3
+
+
+def test_iter_timetables_yields_every_choice():
+    rows = [
+        section("A", "a1", "درس(ت): شنبه 08:00-10:00"),
+        section("A", "a2", "درس(ت): شنبه 10:00-12:00"),
+        section("B", "b1", "درس(ت): شنبه 10:00-12:00"),
+        section("B", "b2", "درس(ت): دوشنبه 10:00-12:00"),
+    ]
+    found = sorted(offerings(chosen) for chosen in iter_timetables(plan(rows, ["A", "B"])))
+    assert found == [["a1", "b1"], ["a1", "b2"], ["a2", "b2"]]
+    assert list(iter_timetables([])) == []
+
+
+def test_same_times_share_one_option():
+    rows = [
+        section("A", "a1", "درس(ت): شنبه 08:00-10:00", enrolled=20),
+        section("A", "a2", "درس(ت): شنبه 08:00-10:00", enrolled=5),
+    ]
+    [[option]] = plan(rows, ["A"])
+    assert [row[SECTION_COLUMN] for row in option.sections] == ["a2", "a1"]
+    assert option.free_seats == 25
+
+
+def test_cli_all_streams_every_timetable(monkeypatch, capsys):
+    rows = [
+        section("A", "a1", "درس(ت): شنبه 08:00-10:00"),
+        section("B", "b1", "درس(ت): شنبه 10:00-12:00"),
+        section("B", "b2", "درس(ت): دوشنبه 10:00-12:00"),
+    ]
+    monkeypatch.setattr(main, "read_dataset", lambda name: main.pd.DataFrame(rows))
+    run(["A", "B", "--all", "--limit", "1"])
+    captured = capsys.readouterr()
+    assert captured.out.count("fewest free seats") == 2
+    assert captured.err.startswith("2 timetable(s)")
+
+
+def test_cli_warns_about_sections_with_unreadable_capacity(monkeypatch, capsys):
+    rows = [
+        section("A", "a1", "درس(ت): شنبه 08:00-10:00"),
+        section("A", "a2", "درس(ت): شنبه 10:00-12:00", capacity=""),
+    ]
+    monkeypatch.setattr(main, "read_dataset", lambda name: main.pd.DataFrame(rows))
+    run(["A"])
+    captured = capsys.readouterr()
+    assert captured.out.count("fewest free seats") == 1
+    assert "1 section(s) without readable seat counts skipped: a2" in captured.err
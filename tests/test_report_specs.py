@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+import main
+from main import evaluate_report_specs, load_report_specs, normalize_report_spec
+
+main.load_reporting()
+
+
+def courses():
+    return main.pd.DataFrame(
+        {
+            "نام درس": ["یادگیری", "آمار", "بافت", None, "پایگاه داده", "چاپ"],
+            "دانشکده": ["143 - فنی", "143 - فنی", "150 - علوم", "143 - فنی", None, "143 - فنی"],
+            "سطح ارائه": ["گروه", "دانشکده", "گروه", "گروه", "گروه", None],
+            "استاد": ["الف", "ب", "پ", "ت", "ث", "ج"],
+        },
+        index=[10, 11, 12, 13, 14, 15],
+    )
+
+
+def spec(name, filters, sort=("نام درس",)):
+    return normalize_report_spec(
+        {"name": name, "filters": filters, "columns": ["نام درس", "استاد"], "sort": list(sort)}
+    )
+
+
+def test_reports_match_row_by_row_filters():
+    df = courses()
+    specs = [
+        spec("faculty", {"دانشکده": {"contains": "143"}, "سطح ارائه": {"equals": "گروه"}}),
+        spec("either", {"سطح ارائه": {"equals": ["گروه", "دانشکده"]}}, sort=()),
+        spec("everything", {}),
+        spec("nothing", {"دانشکده": {"equals": "999"}}),
+    ]
+    frames = evaluate_report_specs(df, specs)
+    records = df.reset_index(drop=True).to_dict("records")
+    for report, frame in zip(specs, frames):
+        expected = [row["استاد"] for row in records if main.row_matches_report(row, report)]
+        assert sorted(frame["استاد"]) == sorted(expected)
+        assert list(frame.columns) == ["نام درس", "استاد"]
+    assert frames[0]["نام درس"].tolist() == ["", "یادگیری"]
+    assert frames[1]["استاد"].tolist() == ["الف", "ب", "پ", "ت", "ث"]
+    assert frames[2]["نام درس"].tolist()[1:] == ["آمار", "بافت", "پایگاه داده", "چاپ", "یادگیری"]
+    assert frames[3].empty
+
+
+def test_more_than_62_reports():
+    df = courses()
+    teachers = df["استاد"].tolist()
+    specs = [
+        spec(f"r{index}", {"استاد": {"equals": teachers[index % len(teachers)]}})
+        for index in range(70)
+    ]
+    frames = evaluate_report_specs(df, specs)
+    assert len(frames) == 70
+    for index, frame in enumerate(frames):
+        assert frame["استاد"].tolist() == [teachers[index % len(teachers)]]
+
+
+def test_missing_filter_column_is_reported():
+    with pytest.raises(RuntimeError, match="not in the data"):
+        evaluate_report_specs(courses(), [spec("bad", {"واحد": {"equals": "x"}})])
+
+
+def test_load_report_specs_accepts_many_reports(tmp_path):
+    path = tmp_path / "reports.json"
+    path.write_text(
+        json.dumps({"reports": [{"name": f"r{index}"} for index in range(70)]}),
+        encoding="utf-8",
+    )
+    specs = load_report_specs(path)
+    assert len(specs) == 70
+    assert specs[0]["title"] == "r0"
+    assert specs[0]["columns"] == main.REPORT_COLUMNS
@@ -0,0 +1,88 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import main
+
+ORIGIN = "https://edu.example.ac.ir"
+
+
+def request(url, resource_type):
+    return SimpleNamespace(url=url, resource_type=resource_type)
+
+
+@pytest.mark.parametrize(
+    ("url", "resource_type", "blocked"),
+    [
+        (f"{ORIGIN}/EServices/logo.png", "image", True),
+        (f"{ORIGIN}/EServices/style.css", "stylesheet", True),
+        (f"{ORIGIN}/fonts/nazanin.woff2", "font", True),
+        (f"{ORIGIN}/EServices/startAction.do", "document", False),
+        (f"{ORIGIN}/EServices/cache?a=menu", "document", False),
+        (f"{ORIGIN}/EServices/scripts/menu.js?v=3", "script", False),
+        (f"{ORIGIN}/static/app.js", "script", False),
+        ("https://analytics.example.com/tag.js", "script", True),
+        (f"{ORIGIN}/EServices/handleCourseClassSearchAction.do", "xhr", False),
+    ],
+)
+def test_allow_and_deny_decisions(url, resource_type, blocked):
+    assert main.ResourceBlocker(ORIGIN).should_block(request(url, resource_type)) is blocked
+
+
+def test_site_scripts_pass_even_when_their_type_is_blocked():
+    blocker = main.ResourceBlocker(ORIGIN)
+    # The allow list is checked before the resource type.
+    assert not blocker.should_block(request(f"{ORIGIN}/EServices/menu.js", "stylesheet"))
+
+
+class FakeRoute:
+    def __init__(self, url, resource_type, is_async=False) -> None:
+        self.request = request(url, resource_type)
+        self.is_async = is_async
+        self.outcome = None
+
+    def finish(self, outcome):
+        self.outcome = outcome
+        if self.is_async:
+
+            async def later():
+                return None
+
+            return later()
+        return None
+
+    def abort(self, error_code=None):
+        return self.finish(("abort", error_code))
+
+    def continue_(self):
+        return self.finish(("continue", None))
+
+
+def test_handle_routes_and_counts_by_type():
+    blocker = main.ResourceBlocker(ORIGIN)
+    routes = [
+        FakeRoute(f"{ORIGIN}/a.png", "image"),
+        FakeRoute(f"{ORIGIN}/b.png", "image"),
+        FakeRoute(f"{ORIGIN}/c.css", "stylesheet"),
+        FakeRoute(f"{ORIGIN}/EServices/startAction.do", "document"),
+    ]
+    for route in routes:
+        blocker.handle(route)
+
+    assert [route.outcome for route in routes] == [
+        ("abort", "blockedbyclient"),
+        ("abort", "blockedbyclient"),
+        ("abort", "blockedbyclient"),
+        ("continue", None),
+    ]
+    assert blocker.summary() == "Lean mode blocked 3 requests (image 2, stylesheet 1)."
+    assert main.ResourceBlocker(ORIGIN).summary() == "Lean mode blocked 0 requests."
+
+
+def test_handle_returns_the_route_call_for_the_async_api():
+    blocker = main.ResourceBlocker(ORIGIN)
+    route = FakeRoute(f"{ORIGIN}/a.png", "image", is_async=True)
+
+    asyncio.run(blocker.handle(route))
+    assert route.outcome == ("abort", "blockedbyclient")
@@ -0,0 +1,46 @@
+from main import MEANINGFUL_COLUMNS, parse_results_html, rows_as_dicts
+from standin_server import COLUMNS, generate_rows, render_search_page
+
+
+def test_parses_rows_and_banner_of_a_result_page():
+    rows = generate_rows(7)
+    extracted = parse_results_html(render_search_page(rows, 5, 5))
+
+    assert extracted["pageInfo"] == "نتايج جستجو (ركورد 6 تا 7 از 7 ركورد)"
+    assert extracted["headers"] == [col for col in MEANINGFUL_COLUMNS if col in COLUMNS]
+    parsed = rows_as_dicts(extracted)
+    assert [row["كد ارائه کلاس درس"] for row in parsed] == [
+        rows[5]["كد ارائه کلاس درس"],
+        rows[6]["كد ارائه کلاس درس"],
+    ]
+    assert parsed[0]["نام درس"] == rows[5]["نام درس"]
+
+
+def test_headers_match_across_yeh_and_kaf_spellings():
+    # The site mixes Arabic ي/ك and Persian ی/ک in its column titles.
+    html_text = render_search_page(generate_rows(2), 10, 0)
+    html_text = html_text.replace("كد درس", "کد درس")
+    html_text = html_text.replace("حداكثر ظرفيت", "حداکثر ظرفیت")
+
+    extracted = parse_results_html(html_text)
+
+    assert "کد درس" in extracted["headers"]
+    assert "حداکثر ظرفیت" in extracted["headers"]
+    assert len(extracted["rows"]) == 2
+
+
+def test_page_without_results_table():
+    extracted = parse_results_html(render_search_page(None, 10, 0))
+
+    assert extracted == {"headers": [], "rows": [], "pageInfo": ""}
+
+
+def test_skips_script_text_and_nested_layout_tables():
+    html_text = render_search_page(generate_rows(3), 10, 0).replace(
+        "<body>", "<body><script>var x = '<td>ignored</td>';</script>", 1
+    )
+
+    extracted = parse_results_html(html_text)
+
+    assert len(extracted["rows"]) == 3
+    assert all("ignored" not in value for row in extracted["rows"] for value in row)
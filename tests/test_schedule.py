@@ -0,0 +1,115 @@
+import main
+from course_schedule import (
+    EXAM_COLUMN,
+    ROOM_COLUMN,
+    SCHEDULE_COLUMN,
+    ScheduleIndex,
+    parse_exam_text,
+    parse_exams,
+    parse_schedule_text,
+    parse_sessions,
+    parse_weekday,
+)
+
+main.load_reporting()
+
+
+def test_schedule_text_with_weeks_and_variants():
+    text = (
+        "درس(ت): دوشنبه 10:00-12:00 فرد، "
+        "درس(ت): يکشنبه ۰۸:۰۰-۰۹:۳۰ زوج، "
+        "درس(ع): سه‌شنبه 14:00-16:00"
+    )
+    assert parse_schedule_text(text) == [
+        (2, 600, 720, True, False),
+        (1, 480, 570, False, True),
+        (3, 840, 960, True, True),
+    ]
+    assert parse_schedule_text(None) == []
+
+
+def test_weekday_names_fold_arabic_yeh_and_spacing():
+    assert parse_weekday("يکشنبه") == parse_weekday("یکشنبه") == 1
+    assert parse_weekday("سه شنبه") == parse_weekday("سه‌شنبه") == 3
+    assert parse_weekday("6") == 6
+
+
+def test_exam_text_date_without_time():
+    assert parse_exam_text("تاريخ: 1404/10/15 ساعت: 10:30-12:30") == (
+        "1404/10/15",
+        14041015,
+        630,
+        750,
+    )
+    assert parse_exam_text("تاريخ: ۱۴۰۴/۱۰/۵") == ("1404/10/05", 14041005, None, None)
+    assert parse_exam_text("") == (None, None, None, None)
+
+
+def test_parse_sessions_expands_rows():
+    df = main.pd.DataFrame(
+        {
+            SCHEDULE_COLUMN: [
+                "درس(ت): شنبه 08:00-10:00، درس(ت): دوشنبه 08:00-10:00",
+                None,
+                "درس(ت): شنبه 08:00-10:00، درس(ت): دوشنبه 08:00-10:00",
+                "درس(ت): چهارشنبه 13:00-15:00 زوج",
+            ]
+        }
+    )
+    sessions = parse_sessions(df)
+    assert sessions["row"].tolist() == [0, 0, 2, 2, 3]
+    assert sessions["weekday"].tolist() == [0, 2, 0, 2, 4]
+    assert sessions["start"].tolist() == [480, 480, 480, 480, 780]
+    assert sessions["end"].tolist() == [600, 600, 600, 600, 900]
+    assert sessions["odd_weeks"].tolist() == [True, True, True, True, False]
+    assert sessions["even_weeks"].tolist() == [True] * 5
+
+
+def test_parse_exams_keeps_index_and_missing_times():
+    df = main.pd.DataFrame(
+        {EXAM_COLUMN: ["تاريخ: 1404/10/15 ساعت: 10:30", "", "تاريخ: 1404/10/16"]},
+        index=[5, 6, 7],
+    )
+    exams = parse_exams(df)
+    assert exams.index.tolist() == [5, 6, 7]
+    assert exams.loc[5, "exam_start"] == 630
+    assert main.pd.isna(exams.loc[5, "exam_end"])
+    assert main.pd.isna(exams.loc[6, "exam_key"])
+    assert exams.loc[7, "exam_date"] == "1404/10/16"
+    assert main.pd.isna(exams.loc[7, "exam_start"])
+
+
+def schedule_frame():
+    return main.pd.DataFrame(
+        {
+            SCHEDULE_COLUMN: [
+                "درس(ت): دوشنبه 10:00-12:00 فرد",
+                "درس(ت): دوشنبه 10:00-12:00 زوج",
+                "درس(ت): دوشنبه 12:00-14:00",
+                "درس(ت): دوشنبه 08:00-10:30",
+                "درس(ت): سه شنبه 10:00-12:00",
+            ],
+            ROOM_COLUMN: ["كلاس 210", "کلاس 210", "کلاس 210", "کلاس 105", ""],
+        }
+    )
+
+
+def test_index_overlap_is_half_open():
+    index = ScheduleIndex.from_dataframe(schedule_frame())
+    assert index.overlapping(2, 10 * 60, 12 * 60) == [0, 1, 3]
+    assert index.overlapping(2, 12 * 60, 13 * 60) == [2]
+    assert index.at(2, 10 * 60 + 30) == [0, 1]
+    assert index.overlapping(5, 0, 24 * 60) == []
+
+
+def test_index_odd_and_even_weeks():
+    index = ScheduleIndex.from_dataframe(schedule_frame())
+    assert index.overlapping(2, 10 * 60, 12 * 60, weeks="odd") == [0, 3]
+    assert index.overlapping(2, 10 * 60, 12 * 60, weeks="even") == [1, 3]
+
+
+def test_index_by_room_folds_kaf_variants():
+    index = ScheduleIndex.from_dataframe(schedule_frame())
+    assert index.overlapping(2, 0, 24 * 60, room="کلاس 210") == [0, 1, 2]
+    assert index.overlapping(2, 0, 24 * 60, room="كلاس 105") == [3]
+    assert index.overlapping(3, 0, 24 * 60, room="کلاس 210") == []
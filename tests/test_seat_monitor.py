@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+import main
+from fake_page import FakeResultsPage, banner
+
+HEADERS = ["كد ارائه کلاس درس", "نام درس", "حداكثر ظرفيت", "تعداد ثبت نامي تاکنون"]
+
+
+def seat_pages(enrolled: list[int], page_size: int = 100) -> list[dict]:
+    rows = [
+        [str(40000000 + index), f"درس {index}", "30", str(count)]
+        for index, count in enumerate(enrolled)
+    ]
+    return [
+        {
+            "headers": HEADERS,
+            "rows": rows[start : start + page_size],
+            "pageInfo": banner(
+                start + 1, min(start + page_size, len(rows)), len(rows)
+            ),
+        }
+        for start in range(0, len(rows), page_size)
+    ]
+
+
+@pytest.fixture
+def events_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "OUTPUT_DIR", tmp_path)
+    monkeypatch.setattr("builtins.input", lambda *_: pytest.fail("monitor prompted"))
+    return tmp_path / main.SEAT_EVENTS_NAME
+
+
+def test_seat_change_emits_an_event(events_path, capsys):
+    full = [30] * 150
+    opened = list(full)
+    opened[120] = 28
+    page = FakeResultsPage(seat_pages(full))
+    page.next_searches = [seat_pages(full), seat_pages(opened)]
+
+    main.monitor_seats(page, interval_s=60, max_cycles=2)
+
+    events = [json.loads(line) for line in events_path.read_text(encoding="utf-8").splitlines()]
+    assert [(event["event"], event["كد ارائه کلاس درس"]) for event in events] == [
+        ("seats_available", "40000120")
+    ]
+    assert (events[0]["free_before"], events[0]["free_now"]) == (0, 2)
+    # Each cycle re-submits the form in place; the unchanged first page is skipped.
+    assert page.searches == 2
+    out = capsys.readouterr().out
+    assert "Cycle 2: 2 pages" in out
+    assert "1 changed, 1 unchanged, 1 events" in out
+
+
+def test_expired_session_stops_the_monitor(events_path):
+    page = FakeResultsPage(seat_pages([30] * 10))
+    page.url = "https://example.test/EServices/loginPage.jsp"
+
+    with pytest.raises(main.SessionExpiredError):
+        main.monitor_seats(page, interval_s=60, max_cycles=3)
+    assert page.searches == 0
@@ -0,0 +1,64 @@
+import main
+from main import ShapingCache
+
+main.load_reporting()
+
+
+def test_lookup_counts_hits_and_misses():
+    cache = ShapingCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return "value"
+
+    assert cache.lookup("key", compute) == "value"
+    assert cache.lookup("key", compute) == "value"
+    assert len(calls) == 1
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+    assert stats["hit_rate"] == 0.5
+
+
+def test_lookup_evicts_least_recently_used():
+    cache = ShapingCache(maxsize=2)
+    cache.lookup("a", lambda: "A")
+    cache.lookup("b", lambda: "B")
+    cache.lookup("a", lambda: "A")
+    cache.lookup("c", lambda: "C")
+    assert list(cache.entries) == ["a", "c"]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_shape_matches_direct_reshaping():
+    cache = ShapingCache()
+    text = "ساختمان داده ها"
+    expected = main.get_display(main.arabic_reshaper.reshape(text))
+    assert cache.shape(text) == expected
+    assert cache.shape(text) is cache.shape(text)
+    assert cache.stats()["misses"] == 1
+
+
+def test_shaped_lines_keyed_by_wrap_and_direction():
+    cache = ShapingCache()
+    text = "مبانی برنامه نویسی کامپیوتر"
+    wrapped = cache.shaped_lines(text, 10)
+    reversed_lines = cache.shaped_lines(text, 10, reverse_visual_lines=True)
+    assert len(wrapped) > 1
+    assert reversed_lines == wrapped[::-1]
+    assert cache.shaped_lines(text) == (cache.shape(text).strip(),)
+    assert cache.stats()["entries"] == 4
+
+
+def test_clear_resets_entries_and_counters():
+    cache = ShapingCache()
+    cache.shape("آمار")
+    cache.shape("آمار")
+    cache.clear()
+    assert cache.stats() == {
+        "entries": 0,
+        "hits": 0,
+        "misses": 0,
+        "evictions": 0,
+        "hit_rate": 0.0,
+    }
@@ -0,0 +1,44 @@
+import pytest
+
+import main
+from standin_server import generate_rows
+
+
+@pytest.fixture
+def output_dir(tmp_path, monkeypatch):
+    main.load_reporting()
+    monkeypatch.setattr(main, "OUTPUT_DIR", tmp_path)
+    return tmp_path
+
+
+def test_snapshot_is_saved_only_after_the_outputs(output_dir, monkeypatch):
+    rows = generate_rows(30)
+
+    def broken_excel(rows, df=None):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(main, "save_excel", broken_excel)
+    with pytest.raises(RuntimeError, match="Could not write"):
+        main.export_outputs(rows, pdf_workers=1)
+    assert not (output_dir / main.SNAPSHOT_NAME).exists()
+
+    monkeypatch.undo()
+    monkeypatch.setattr(main, "OUTPUT_DIR", output_dir)
+    main.export_outputs(rows, pdf_workers=1)
+    assert (output_dir / main.RAW_EXCEL_NAME).exists()
+    assert (output_dir / main.SNAPSHOT_NAME).exists()
+
+
+def test_compare_snapshot_reports_changes_without_saving(output_dir):
+    rows = generate_rows(5)
+    delta, snapshot = main.compare_snapshot(rows)
+    assert delta is None
+    main.save_snapshot(output_dir / main.SNAPSHOT_NAME, snapshot)
+
+    changed = [dict(row) for row in rows[1:]]
+    changed[0]["استاد"] = "استاد جديد"
+    delta, _ = main.compare_snapshot(changed)
+
+    assert delta["any_change"]
+    assert len(delta["removed"]) == 1
+    assert main.load_snapshot(output_dir / main.SNAPSHOT_NAME) == snapshot